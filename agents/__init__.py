@@ -1,37 +1,35 @@
-"""Agent package providing various specialised agents."""
-
-from langgraph.graph import StateGraph, START, MessagesState, END
-
-from .vanilla_agent import VanillaAgent
-from .manual_agent import ManualAgent
-from .maintenance_agent import MaintenanceAgent
-from .dispatcher_agent import DispatcherAgent
-from langgraph.prebuilt import tools_condition
-
-def build_graph(entry_id: str = "dispatcher_agent"):
-    """Build the global multi-agent graph connecting the agent subgraphs starting from the given entry."""
-    VanillaAgent.REGISTRY.clear()
-    VanillaAgent.MEMORY = []
-    VanillaAgent.from_id(entry_id)
-    graph = StateGraph(MessagesState)
-    tool_handovers = dict()
-    tool_handovers["__end__"] = "__end__"
-    for agent_id, agent in VanillaAgent.REGISTRY.items():
-        graph.add_node(agent_id, agent.graph)
-        if agent_id != entry_id:
-            graph.add_edge(agent_id, entry_id)
-            tool_handovers[agent_id] = agent_id
-    graph.add_edge(START, entry_id)
-    graph.add_conditional_edges(
-                            entry_id,
-                            tools_condition,  # Routes to "tools" or "__end__"
-                            tool_handovers
-                        )
-    # graph.add_edge(entry_id, 'manual_agent')
-    # graph.add_edge(entry_id, 'maintenance_agent')
-    # graph.add_edge("tools", entry_id)
-    # graph.add_edge(entry_id, END)
-    return graph.compile()
+"""Agent package providing various specialised agents.
+
+Exports are imported on first use, so modules that only need a light part of
+the package (memory, routing, caching) do not load LangChain and LangGraph.
+"""
+
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .dispatcher_agent import DispatcherAgent
+    from .graph import build_graph
+    from .maintenance_agent import MaintenanceAgent
+    from .manual_agent import ManualAgent
+    from .vanilla_agent import VanillaAgent
+
+_EXPORTS = {
+    "VanillaAgent": ".vanilla_agent",
+    "ManualAgent": ".manual_agent",
+    "MaintenanceAgent": ".maintenance_agent",
+    "DispatcherAgent": ".dispatcher_agent",
+    "build_graph": ".graph",
+}
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
 
 
 __all__ = [
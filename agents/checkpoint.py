@@ -0,0 +1,498 @@
+from __future__ import annotations
+
+"""LangGraph checkpointer persisted through SQLAlchemy.
+
+:class:`SqlAlchemySaver` follows the layout of LangGraph's own savers
+(checkpoints, per-channel blobs and pending writes in separate tables) so a
+checkpoint row only references channel versions and unchanged channels are
+never rewritten. On top of that, list-valued channels such as ``messages``
+are stored as deltas: when a new version extends the previous one, only the
+appended items are written and a full snapshot is taken every
+``snapshot_every`` versions to keep reconstruction chains short. Blobs above
+``compress_min_bytes`` are zlib-compressed, so the cost of a turn stays flat
+as the conversation grows.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from sqlalchemy import (
+    Column,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    and_,
+    create_engine,
+    delete,
+    select,
+)
+
+DEFAULT_SNAPSHOT_EVERY = 32
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+_ZLIB_PREFIX = "zlib+"
+_LAST_VALUES_SIZE = 256
+
+
+def _tables(metadata: MetaData) -> tuple[Table, Table, Table]:
+    checkpoints = Table(
+        "lg_checkpoints",
+        metadata,
+        Column("thread_id", String(128), primary_key=True),
+        Column("checkpoint_ns", String(255), primary_key=True),
+        Column("checkpoint_id", String(64), primary_key=True),
+        Column("parent_checkpoint_id", String(64)),
+        Column("type", String(32)),
+        Column("checkpoint", LargeBinary, nullable=False),
+        Column("metadata_type", String(32)),
+        Column("metadata", LargeBinary, nullable=False),
+    )
+    blobs = Table(
+        "lg_checkpoint_blobs",
+        metadata,
+        Column("thread_id", String(128), primary_key=True),
+        Column("checkpoint_ns", String(255), primary_key=True),
+        Column("channel", String(255), primary_key=True),
+        Column("version", String(64), primary_key=True),
+        Column("type", String(32), nullable=False),
+        Column("blob", LargeBinary),
+        # Set when ``blob`` only holds the items appended to ``base_version``.
+        Column("base_version", String(64)),
+        Column("depth", Integer, nullable=False, default=0),
+    )
+    writes = Table(
+        "lg_checkpoint_writes",
+        metadata,
+        Column("thread_id", String(128), primary_key=True),
+        Column("checkpoint_ns", String(255), primary_key=True),
+        Column("checkpoint_id", String(64), primary_key=True),
+        Column("task_id", String(64), primary_key=True),
+        Column("idx", Integer, primary_key=True, autoincrement=False),
+        Column("channel", String(255), nullable=False),
+        Column("type", String(32)),
+        Column("blob", LargeBinary),
+        Column("task_path", String(255), nullable=False, default=""),
+    )
+    return checkpoints, blobs, writes
+
+
+def _same_item(left: Any, right: Any) -> bool:
+    return left is right or left == right
+
+
+class SqlAlchemySaver(BaseCheckpointSaver[str]):
+    """Checkpoint saver storing delta-encoded, compressed state via SQLAlchemy.
+
+    Example::
+
+        saver = SqlAlchemySaver("sqlite:///checkpoints.db")
+        graph = build_graph(checkpointer=saver)
+        graph.invoke({"messages": [HumanMessage("hi")]},
+                     {"configurable": {"thread_id": "session-1"}})
+    """
+
+    def __init__(
+        self,
+        url_or_engine: Any,
+        *,
+        serde: Optional[SerializerProtocol] = None,
+        snapshot_every: int = DEFAULT_SNAPSHOT_EVERY,
+        compress_min_bytes: int = DEFAULT_COMPRESS_MIN_BYTES,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.engine = (
+            create_engine(url_or_engine, pool_pre_ping=True)
+            if isinstance(url_or_engine, str)
+            else url_or_engine
+        )
+        self.snapshot_every = snapshot_every
+        self.compress_min_bytes = compress_min_bytes
+        self.metadata = MetaData()
+        self.checkpoints, self.blobs, self.writes = _tables(self.metadata)
+        self.metadata.create_all(self.engine)
+        # (thread, ns, channel) -> (version, value, depth) of the last blob
+        # written or read, used as the base for the next delta.
+        self._last_values: OrderedDict[tuple[str, str, str], tuple[str, Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    # serialisation ----------------------------------------------------------
+    def _dump(self, value: Any) -> tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        if len(data) >= self.compress_min_bytes:
+            return _ZLIB_PREFIX + type_, zlib.compress(data, 1)
+        return type_, data
+
+    def _load(self, type_: str, data: Optional[bytes]) -> Any:
+        if type_.startswith(_ZLIB_PREFIX):
+            return self.serde.loads_typed((type_[len(_ZLIB_PREFIX) :], zlib.decompress(data)))
+        return self.serde.loads_typed((type_, data))
+
+    def _remember(self, key: tuple[str, str, str], version: str, value: Any, depth: int) -> None:
+        with self._lock:
+            self._last_values[key] = (version, value, depth)
+            self._last_values.move_to_end(key)
+            while len(self._last_values) > _LAST_VALUES_SIZE:
+                self._last_values.popitem(last=False)
+
+    def _blob_row(self, thread_id: str, ns: str, channel: str, version: str, value: Any) -> dict:
+        key = (thread_id, ns, channel)
+        row = {
+            "thread_id": thread_id,
+            "checkpoint_ns": ns,
+            "channel": channel,
+            "version": str(version),
+            "base_version": None,
+            "depth": 0,
+        }
+        with self._lock:
+            previous = self._last_values.get(key)
+        if (
+            previous is not None
+            and isinstance(value, list)
+            and isinstance(previous[1], list)
+            and previous[2] + 1 < self.snapshot_every
+            and len(value) >= len(previous[1])
+            and all(_same_item(a, b) for a, b in zip(previous[1], value))
+        ):
+            base_version, base_value, depth = previous
+            row["type"], row["blob"] = self._dump(value[len(base_value) :])
+            row.update(base_version=base_version, depth=depth + 1)
+        else:
+            row["type"], row["blob"] = self._dump(value)
+        self._remember(key, str(version), list(value) if isinstance(value, list) else value, row["depth"])
+        return row
+
+    def _load_blobs(self, conn, thread_id: str, ns: str, versions: ChannelVersions) -> dict[str, Any]:
+        values: dict[str, Any] = {}
+        for channel, version in versions.items():
+            value = self._load_channel(conn, thread_id, ns, channel, str(version))
+            if value is not _MISSING:
+                values[channel] = value
+        return values
+
+    def _load_channel(self, conn, thread_id: str, ns: str, channel: str, version: str) -> Any:
+        key = (thread_id, ns, channel)
+        with self._lock:
+            cached = self._last_values.get(key)
+        if cached is not None and cached[0] == version:
+            return list(cached[1]) if isinstance(cached[1], list) else cached[1]
+        chain: list[Any] = []
+        depth = 0
+        current: Optional[str] = version
+        while current is not None:
+            row = conn.execute(
+                select(self.blobs.c.type, self.blobs.c.blob, self.blobs.c.base_version, self.blobs.c.depth).where(
+                    and_(
+                        self.blobs.c.thread_id == thread_id,
+                        self.blobs.c.checkpoint_ns == ns,
+                        self.blobs.c.channel == channel,
+                        self.blobs.c.version == current,
+                    )
+                )
+            ).first()
+            if row is None or row.type == "empty":
+                return _MISSING
+            if not chain:
+                depth = row.depth
+            chain.append(self._load(row.type, row.blob))
+            current = row.base_version
+        value = chain.pop()
+        while chain:
+            value = value + chain.pop()
+        self._remember(key, version, list(value) if isinstance(value, list) else value, depth)
+        return value
+
+    def _tuple(self, conn, row, thread_id: str, ns: str) -> CheckpointTuple:
+        checkpoint: Checkpoint = self._load(row.type, row.checkpoint)
+        writes = conn.execute(
+            select(self.writes).where(
+                and_(
+                    self.writes.c.thread_id == thread_id,
+                    self.writes.c.checkpoint_ns == ns,
+                    self.writes.c.checkpoint_id == row.checkpoint_id,
+                )
+            )
+        ).all()
+        # ``idx`` was mapped through ``WRITES_IDX_MAP`` when stored, so special
+        # writes (errors, interrupts) sort before the regular ones of a task.
+        writes = sorted(writes, key=lambda w: (w.task_id, w.idx))
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": ns,
+                    "checkpoint_id": row.checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(
+                    conn, thread_id, ns, checkpoint["channel_versions"]
+                ),
+            },
+            metadata=self._load(row.metadata_type, row.metadata),
+            pending_writes=[(w.task_id, w.channel, self._load(w.type, w.blob)) for w in writes],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": ns,
+                        "checkpoint_id": row.parent_checkpoint_id,
+                    }
+                }
+                if row.parent_checkpoint_id
+                else None
+            ),
+        )
+
+    # BaseCheckpointSaver API ----------------------------------------------
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        query = select(self.checkpoints).where(
+            and_(self.checkpoints.c.thread_id == thread_id, self.checkpoints.c.checkpoint_ns == ns)
+        )
+        if checkpoint_id := get_checkpoint_id(config):
+            query = query.where(self.checkpoints.c.checkpoint_id == checkpoint_id)
+        else:
+            query = query.order_by(self.checkpoints.c.checkpoint_id.desc()).limit(1)
+        with self.engine.connect() as conn:
+            row = conn.execute(query).first()
+            return self._tuple(conn, row, thread_id, ns) if row is not None else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = select(self.checkpoints)
+        if config is not None:
+            query = query.where(self.checkpoints.c.thread_id == config["configurable"]["thread_id"])
+            if (ns := config["configurable"].get("checkpoint_ns")) is not None:
+                query = query.where(self.checkpoints.c.checkpoint_ns == ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query = query.where(self.checkpoints.c.checkpoint_id == checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            query = query.where(self.checkpoints.c.checkpoint_id < before_id)
+        query = query.order_by(self.checkpoints.c.checkpoint_id.desc())
+        with self.engine.connect() as conn:
+            rows = conn.execute(query).all()
+            for row in rows:
+                if limit is not None and limit <= 0:
+                    break
+                metadata = self._load(row.metadata_type, row.metadata)
+                if filter and not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                if limit is not None:
+                    limit -= 1
+                yield self._tuple(conn, row, row.thread_id, row.checkpoint_ns)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        stripped = checkpoint.copy()
+        values: dict[str, Any] = stripped.pop("channel_values")  # type: ignore[misc]
+        blob_rows = []
+        for channel, version in new_versions.items():
+            if channel in values:
+                blob_rows.append(self._blob_row(thread_id, ns, channel, version, values[channel]))
+            else:
+                blob_rows.append(
+                    {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": ns,
+                        "channel": channel,
+                        "version": str(version),
+                        "type": "empty",
+                        "blob": None,
+                        "base_version": None,
+                        "depth": 0,
+                    }
+                )
+        checkpoint_type, checkpoint_blob = self._dump(stripped)
+        metadata_type, metadata_blob = self._dump(get_checkpoint_metadata(config, metadata))
+        with self.engine.begin() as conn:
+            for row in blob_rows:
+                conn.execute(
+                    delete(self.blobs).where(
+                        and_(
+                            self.blobs.c.thread_id == row["thread_id"],
+                            self.blobs.c.checkpoint_ns == row["checkpoint_ns"],
+                            self.blobs.c.channel == row["channel"],
+                            self.blobs.c.version == row["version"],
+                        )
+                    )
+                )
+            if blob_rows:
+                conn.execute(self.blobs.insert(), blob_rows)
+            conn.execute(
+                delete(self.checkpoints).where(
+                    and_(
+                        self.checkpoints.c.thread_id == thread_id,
+                        self.checkpoints.c.checkpoint_ns == ns,
+                        self.checkpoints.c.checkpoint_id == checkpoint["id"],
+                    )
+                )
+            )
+            conn.execute(
+                self.checkpoints.insert(),
+                {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": ns,
+                    "checkpoint_id": checkpoint["id"],
+                    "parent_checkpoint_id": config["configurable"].get("checkpoint_id"),
+                    "type": checkpoint_type,
+                    "checkpoint": checkpoint_blob,
+                    "metadata_type": metadata_type,
+                    "metadata": metadata_blob,
+                },
+            )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        scope = and_(
+            self.writes.c.thread_id == thread_id,
+            self.writes.c.checkpoint_ns == ns,
+            self.writes.c.checkpoint_id == checkpoint_id,
+            self.writes.c.task_id == task_id,
+        )
+        with self.engine.begin() as conn:
+            existing = set(conn.execute(select(self.writes.c.idx).where(scope)).scalars())
+            for idx, (channel, value) in enumerate(writes):
+                write_idx = WRITES_IDX_MAP.get(channel, idx)
+                if write_idx in existing:
+                    if write_idx >= 0:
+                        continue
+                    # Special channels (errors, interrupts) overwrite.
+                    conn.execute(delete(self.writes).where(and_(scope, self.writes.c.idx == write_idx)))
+                type_, blob = self._dump(value)
+                conn.execute(
+                    self.writes.insert(),
+                    {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": ns,
+                        "checkpoint_id": checkpoint_id,
+                        "task_id": task_id,
+                        "idx": write_idx,
+                        "channel": channel,
+                        "type": type_,
+                        "blob": blob,
+                        "task_path": task_path,
+                    },
+                )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self.engine.begin() as conn:
+            for table in (self.checkpoints, self.blobs, self.writes):
+                conn.execute(delete(table).where(table.c.thread_id == thread_id))
+        with self._lock:
+            for key in [key for key in self._last_values if key[0] == thread_id]:
+                del self._last_values[key]
+
+    def get_next_version(self, current: Optional[str], channel: None = None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # async variants run the blocking SQL work in a thread -------------------
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+_MISSING = object()
+_SAVER: Optional[SqlAlchemySaver] = None
+_SAVER_LOCK = threading.Lock()
+
+
+def get_checkpointer() -> Optional[SqlAlchemySaver]:
+    """Return the saver configured by ``CONVERSATION_CHECKPOINT_URL``, if any."""
+    global _SAVER
+    url = os.environ.get("CONVERSATION_CHECKPOINT_URL")
+    if not url:
+        return None
+    with _SAVER_LOCK:
+        if _SAVER is None:
+            _SAVER = SqlAlchemySaver(url)
+        return _SAVER
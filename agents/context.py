@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+"""Token-budgeted context window management for agent LLM calls.
+
+:class:`ContextWindow` trims the message history handed to the model so the
+prompt never exceeds an agent's ``max_context_tokens``. It first shrinks
+tool outputs from earlier turns (typically whole manuals), then folds the
+oldest turns into a running summary that is cached and extended
+incrementally, and as a last resort truncates oversized tool outputs of the
+current turn. Tokens are counted locally.
+"""
+
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable, Optional, Sequence
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+
+DEFAULT_MAX_CONTEXT_TOKENS = 32000
+# Fixed per-message overhead of the chat format (role, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+ELIDED_PREVIEW_CHARS = 160
+SUMMARY_LINE_CHARS = 200
+SUMMARY_MAX_CHARS = 4000
+_CACHE_SIZE = 512
+# Messages remembered by identity (weakly: the graph state keeps them alive).
+_OBJECT_CACHE_SIZE = 2048
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """Return a tiktoken encoding, or ``None`` when it cannot be loaded offline."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = None
+    return _encoding
+
+
+def count_text_tokens(text: str) -> int:
+    """Count tokens with tiktoken, or estimate ~4 characters per token."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def message_text(message: BaseMessage) -> str:
+    """Flatten message content (including multimodal parts and tool calls) to text."""
+    content = message.content
+    if isinstance(content, str):
+        text = content
+    else:
+        text = " ".join(
+            part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+        )
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        text += " " + " ".join(f"{call['name']} {call['args']}" for call in tool_calls)
+    return text
+
+
+def default_summarizer(messages: Sequence[BaseMessage], previous: str) -> str:
+    """Extractive summary: one clipped line per user/assistant message.
+
+    The result keeps only the most recent lines that fit in
+    :data:`SUMMARY_MAX_CHARS`, so the summary itself stays bounded.
+    """
+    lines = [previous] if previous else []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            role = "User"
+        elif isinstance(message, AIMessage) and message_text(message).strip():
+            role = "Assistant"
+        else:
+            continue
+        text = " ".join(message_text(message).split())
+        if len(text) > SUMMARY_LINE_CHARS:
+            text = text[:SUMMARY_LINE_CHARS] + " …"
+        lines.append(f"- {role}: {text}")
+    summary = "\n".join(lines)
+    if len(summary) > SUMMARY_MAX_CHARS:
+        summary = summary[-SUMMARY_MAX_CHARS:].split("\n", 1)[-1]
+    return summary
+
+
+class ContextWindow:
+    """Fit a message history into a token budget before each LLM call."""
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_MAX_CONTEXT_TOKENS,
+        *,
+        count_tokens: Callable[[str], int] = count_text_tokens,
+        summarizer: Callable[[Sequence[BaseMessage], str], str] = default_summarizer,
+    ) -> None:
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens
+        self.summarizer = summarizer
+        self._token_cache: OrderedDict[str, int] = OrderedDict()
+        # Messages kept in the graph state are counted once, without hashing.
+        self._message_tokens = _ObjectCache(_OBJECT_CACHE_SIZE)
+        # digest of the folded message prefix -> running summary text
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    # counting -------------------------------------------------------------
+    def tokens(self, message: BaseMessage) -> int:
+        known = self._message_tokens.get(message)
+        if known is not None:
+            return known
+        text = message_text(message)
+        key = f"{message.id or ''}:{hashlib.sha1(text.encode('utf-8')).hexdigest()}"
+        with self._lock:
+            cached = self._token_cache.get(key)
+        if cached is None:
+            cached = self.count_tokens(text) + MESSAGE_OVERHEAD_TOKENS
+            with self._lock:
+                self._token_cache[key] = cached
+                while len(self._token_cache) > _CACHE_SIZE:
+                    self._token_cache.popitem(last=False)
+        self._message_tokens.put(message, cached)
+        return cached
+
+    def total(self, messages: Sequence[BaseMessage]) -> int:
+        return sum(self.tokens(message) for message in messages)
+
+    # fitting --------------------------------------------------------------
+    def fit(self, system: SystemMessage, messages: Sequence[BaseMessage]) -> list[BaseMessage]:
+        """Return ``[system, (summary), *messages]`` trimmed to the budget."""
+        messages = list(messages)
+        budget = self.max_tokens - self.tokens(system)
+        if self.total(messages) <= budget:
+            return [system, *messages]
+
+        turns = _split_turns(messages)
+        # 1. Shrink tool outputs of every turn but the current one.
+        turns = [*([_elide_tool_outputs(turn) for turn in turns[:-1]]), turns[-1]]
+        turn_tokens = [self.total(turn) for turn in turns]
+        kept_tokens = sum(turn_tokens)
+        if kept_tokens <= budget:
+            return [system, *(m for turn in turns for m in turn)]
+
+        # 2. Fold the oldest turns into a running summary until the rest fits.
+        hasher = hashlib.sha1()
+        boundaries: list[tuple[int, str]] = []
+        folded_count = 0
+        summary: Optional[SystemMessage] = None
+        first = 0
+        while first < len(turns) - 1:
+            for message in messages[folded_count : folded_count + len(turns[first])]:
+                hasher.update((message.id or message_text(message)).encode("utf-8") + b"\0")
+            folded_count += len(turns[first])
+            boundaries.append((folded_count, hasher.hexdigest()))
+            kept_tokens -= turn_tokens[first]
+            first += 1
+            if kept_tokens > budget and first < len(turns) - 1:
+                continue  # cannot fit yet, whatever the summary
+            summary = self._summary_message(messages, boundaries)
+            if self.tokens(summary) + kept_tokens <= budget:
+                return [system, summary, *(m for turn in turns[first:] for m in turn)]
+        turns = turns[first:]
+
+        # 3. Only the current turn is left: truncate its largest tool outputs.
+        prefix = [summary] if summary is not None else []
+        remaining = budget - self.total(prefix)
+        return [system, *prefix, *self._truncate_current_turn(turns[0], remaining)]
+
+    def _summary_message(
+        self, messages: list[BaseMessage], boundaries: list[tuple[int, str]]
+    ) -> SystemMessage:
+        """Summarise ``messages`` up to the last boundary, reusing cached prefixes.
+
+        ``boundaries`` holds ``(message count, digest)`` for each folded turn;
+        the summary of the longest already-cached prefix is extended with the
+        remaining turns only.
+        """
+        count, digest = boundaries[-1]
+        with self._lock:
+            text = self._summaries.get(digest)
+            base_count, base_text = 0, ""
+            if text is None:
+                for prefix_count, prefix_digest in reversed(boundaries[:-1]):
+                    if prefix_digest in self._summaries:
+                        base_count, base_text = prefix_count, self._summaries[prefix_digest]
+                        break
+        if text is None:
+            text = self.summarizer(messages[base_count:count], base_text)
+            with self._lock:
+                self._summaries[digest] = text
+                while len(self._summaries) > _CACHE_SIZE:
+                    self._summaries.popitem(last=False)
+        return SystemMessage(content=f"Summary of the earlier conversation:\n{text}")
+
+    def _truncate_current_turn(self, turn: list[BaseMessage], budget: int) -> list[BaseMessage]:
+        turn = list(turn)
+        while self.total(turn) > budget:
+            tool_positions = [i for i, m in enumerate(turn) if isinstance(m, ToolMessage)]
+            if not tool_positions:
+                break
+            largest = max(tool_positions, key=lambda i: self.tokens(turn[i]))
+            excess = self.total(turn) - budget
+            text = message_text(turn[largest])
+            keep_chars = max(0, len(text) - excess * 4 - 64)
+            if keep_chars >= len(text) - 1 or not text:
+                break
+            turn[largest] = turn[largest].model_copy(
+                update={"content": text[:keep_chars] + "\n[… truncated to fit the context window]"}
+            )
+        return turn
+
+
+class OpenAIMessageCache:
+    """Reuse ``convert_to_openai_messages`` output across LLM calls.
+
+    Entries are keyed on the message object, which the graph state keeps
+    from one call to the next, so each call converts only the messages added
+    since the previous one (and copies made by :meth:`ContextWindow.fit`).
+    """
+
+    def __init__(self, max_entries: int = _OBJECT_CACHE_SIZE) -> None:
+        self._converted = _ObjectCache(max_entries)
+
+    def convert(self, messages: Sequence[BaseMessage]) -> list[dict]:
+        from langchain_core.messages.utils import convert_to_openai_messages
+
+        converted = [self._converted.get(message) for message in messages]
+        missing = [position for position, value in enumerate(converted) if value is None]
+        if missing:
+            fresh = convert_to_openai_messages([messages[i] for i in missing])
+            for position, value in zip(missing, fresh):
+                converted[position] = value
+                self._converted.put(messages[position], value)
+        return converted  # type: ignore[return-value]
+
+
+class _ObjectCache:
+    """LRU keyed on object identity, holding its objects weakly.
+
+    An entry is dropped once its object is garbage collected, so the cache
+    never keeps a message alive, and a reused ``id()`` never matches the
+    entry of a collected object.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, tuple[weakref.ref, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Filled by weakref callbacks, which may run at any point (even while
+        # ``_lock`` is held), and drained under the lock.
+        self._collected: list[tuple[int, weakref.ref]] = []
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge()
+            return len(self._entries)
+
+    def get(self, obj: object):
+        with self._lock:
+            self._purge()
+            entry = self._entries.get(id(obj))
+            if entry is None or entry[0]() is not obj:
+                return None
+            self._entries.move_to_end(id(obj))
+            return entry[1]
+
+    def put(self, obj: object, value: object) -> None:
+        key = id(obj)
+        collected = self._collected
+
+        def forget(ref: weakref.ref) -> None:
+            collected.append((key, ref))
+
+        with self._lock:
+            self._purge()
+            self._entries[key] = (weakref.ref(obj, forget), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _purge(self) -> None:
+        while self._collected:
+            key, ref = self._collected.pop()
+            entry = self._entries.get(key)
+            # The id may already belong to a newer object's entry.
+            if entry is not None and entry[0] is ref:
+                del self._entries[key]
+
+
+def _split_turns(messages: list[BaseMessage]) -> list[list[BaseMessage]]:
+    """Group messages into turns, each starting at a human message."""
+    turns: list[list[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+def _elide_tool_outputs(turn: list[BaseMessage]) -> list[BaseMessage]:
+    elided = []
+    for message in turn:
+        if isinstance(message, ToolMessage):
+            text = message_text(message)
+            if len(text) > ELIDED_PREVIEW_CHARS:
+                preview = " ".join(text[:ELIDED_PREVIEW_CHARS].split())
+                message = message.model_copy(
+                    update={
+                        "content": f"[earlier {message.name or 'tool'} output elided "
+                        f"({len(text)} chars); began: {preview} …]"
+                    }
+                )
+        elided.append(message)
+    return elided
@@ -0,0 +1,212 @@
+"""Multi-agent graph wiring the agent subgraphs together."""
+
+import os
+from typing import Optional
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.graph import StateGraph, START, MessagesState, END
+from langgraph.prebuilt import tools_condition
+
+from .registry import CompiledGraph, get_agent_registry
+from .router import IntentRouter, register_router
+from .vanilla_agent import HANDOFF_PREFIX
+
+SPEC_ANSWER_NODE = "spec_answer"
+
+
+def build_graph(
+    entry_id: str = "dispatcher_agent", checkpointer=None, fast_route: bool = True, flatten: Optional[bool] = None
+):
+    """Build the global multi-agent graph connecting the agent subgraphs starting from the given entry.
+
+    When a ``checkpointer`` is given the graph persists its state per
+    ``thread_id``, so callers only send the new messages of each turn.
+
+    With ``fast_route`` an :class:`IntentRouter` sends clearly scoped
+    requests straight to the specialist, whose answer then ends the turn;
+    everything else goes through the entry agent as before. Hand-offs the
+    entry agent makes are fed back to the router as learned keywords.
+
+    With ``flatten`` (default: ``CONVERSATION_GRAPH_MODE=flat``) the agents'
+    ``llm`` and ``tools`` nodes are inlined into one graph instead of nesting
+    each agent as a subgraph, and a specialist's final answer ends the run
+    instead of being relayed by the entry agent's LLM.
+
+    Agents and compiled graphs come from the :class:`AgentRegistry`, so
+    repeated calls return the same graph until an agent's config or
+    instructions change.
+    """
+    if flatten is None:
+        flatten = os.environ.get("CONVERSATION_GRAPH_MODE", "nested") == "flat"
+    registry = get_agent_registry()
+    cached = registry.get_graph(entry_id, checkpointer, fast_route, flatten)
+    if cached is None:
+        agents = registry.agents(entry_id)
+        compile_graph = _compile_flat_graph if flatten else _compile_graph
+        cached = registry.put_graph(
+            entry_id, compile_graph(entry_id, agents, checkpointer, fast_route), fast_route, flatten
+        )
+    register_router(entry_id, cached.router)
+    return cached.graph
+
+
+def _compile_graph(entry_id: str, agents: dict, checkpointer, fast_route: bool) -> CompiledGraph:
+    entry = agents[entry_id]
+    graph = StateGraph(MessagesState)
+    tool_handovers = dict()
+    tool_handovers["__end__"] = "__end__"
+    specialists = [agent for agent_id, agent in agents.items() if agent_id != entry_id]
+    router = IntentRouter.from_agents(entry, specialists) if fast_route and specialists else None
+    for agent_id, agent in agents.items():
+        graph.add_node(agent_id, agent.graph)
+        if agent_id != entry_id:
+            if router is not None:
+                graph.add_conditional_edges(
+                    agent_id, _after_specialist(router, entry_id), [entry_id, END]
+                )
+            else:
+                graph.add_edge(agent_id, entry_id)
+            tool_handovers[agent_id] = agent_id
+    _add_start(graph, entry_id, agents, router)
+    graph.add_conditional_edges(
+                            entry_id,
+                            tools_condition,  # Routes to "tools" or "__end__"
+                            tool_handovers
+                        )
+    # graph.add_edge(entry_id, 'manual_agent')
+    # graph.add_edge(entry_id, 'maintenance_agent')
+    # graph.add_edge("tools", entry_id)
+    # graph.add_edge(entry_id, END)
+    return CompiledGraph(graph.compile(checkpointer=checkpointer), agents, router, checkpointer)
+
+
+def _compile_flat_graph(entry_id: str, agents: dict, checkpointer, fast_route: bool) -> CompiledGraph:
+    """One graph with an ``<agent>`` (LLM) and ``<agent>_tools`` node per agent.
+
+    Hand-offs only record the transfer; the edge after the tools node moves
+    to the target agent. Agents other than the entry end the run with their
+    answer, so the entry agent's LLM never runs just to relay it.
+    """
+    graph = StateGraph(MessagesState)
+    specialists = [agent for agent_id, agent in agents.items() if agent_id != entry_id]
+    router = IntentRouter.from_agents(agents[entry_id], specialists) if fast_route and specialists else None
+    for agent_id, agent in agents.items():
+        graph.add_node(agent_id, agent.model_node())
+        targets = [END]
+        if agent.tools:
+            tools_id = f"{agent_id}_tools"
+            graph.add_node(tools_id, agent.tool_node(agent.flat_tools()))
+            graph.add_conditional_edges(tools_id, _after_tools(agent_id), [agent_id, *agents])
+            targets.append(tools_id)
+        learn = router if router is not None and agent_id != entry_id else None
+        graph.add_conditional_edges(agent_id, _after_llm(agent_id, learn), targets)
+    _add_start(graph, entry_id, agents, router)
+    return CompiledGraph(graph.compile(checkpointer=checkpointer), agents, router, checkpointer)
+
+
+def _add_start(graph: StateGraph, entry_id: str, agents: dict, router: Optional[IntentRouter]) -> None:
+    """Edges out of ``START``: optional spec answers, then the router or the entry agent.
+
+    With ``"spec_answers": true`` in the entry agent's config, a question
+    asking for one spec of one machine is answered from the spec store (see
+    :mod:`middleware.manual_specs`) before any LLM runs.
+    """
+    route = _route_input(router, entry_id) if router is not None else None
+    if agents[entry_id].config.get("spec_answers"):
+        graph.add_node(SPEC_ANSWER_NODE, _answer_from_specs)
+        graph.add_edge(START, SPEC_ANSWER_NODE)
+        graph.add_conditional_edges(
+            SPEC_ANSWER_NODE, _after_spec_answer(route or (lambda _: entry_id)), [*agents, END]
+        )
+    elif route is not None:
+        graph.add_conditional_edges(START, route, list(agents))
+    else:
+        graph.add_edge(START, entry_id)
+
+
+def _answer_from_specs(state: MessagesState) -> dict:
+    from middleware.manual_specs import answer_from_specs
+    from middleware.telemetry import step
+
+    text, _ = _current_turn(state["messages"])
+    with step("spec", SPEC_ANSWER_NODE):
+        answer = answer_from_specs(text)
+    return {"messages": [AIMessage(content=answer, name=SPEC_ANSWER_NODE)]} if answer else {}
+
+
+def _after_spec_answer(route):
+    def after_spec_answer(state: MessagesState) -> str:
+        last = state["messages"][-1]
+        if isinstance(last, AIMessage) and last.name == SPEC_ANSWER_NODE:
+            return END
+        return route(state)
+
+    return after_spec_answer
+
+
+def _current_turn(messages: list) -> tuple[str, list]:
+    """Return the text of the last human message and the messages after it."""
+    for position in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[position], HumanMessage):
+            return str(messages[position].content), messages[position + 1 :]
+    return "", messages
+
+
+def _route_input(router: IntentRouter, entry_id: str):
+    def route_input(state: MessagesState) -> str:
+        text, _ = _current_turn(state["messages"])
+        return router.route(text).agent_id or entry_id
+
+    return route_input
+
+
+def _after_specialist(router: IntentRouter, entry_id: str):
+    def after_specialist(state: MessagesState) -> str:
+        text, turn = _current_turn(state["messages"])
+        for message in turn:
+            name = getattr(message, "name", None) or ""
+            if isinstance(message, ToolMessage) and name.startswith(HANDOFF_PREFIX):
+                # Reached through the entry agent: learn from its choice and
+                # hand the answer back to it, as without fast routing.
+                router.learn(text, name[len(HANDOFF_PREFIX):])
+                return entry_id
+        return END
+
+    return after_specialist
+
+
+def _after_llm(agent_id: str, router: Optional[IntentRouter]):
+    def after_llm(state: MessagesState) -> str:
+        if tools_condition(state) == "tools":
+            return f"{agent_id}_tools"
+        if router is not None:
+            text, turn = _current_turn(state["messages"])
+            handoff = _last_handoff(turn)
+            if handoff is not None:
+                router.learn(text, handoff)
+        return END
+
+    return after_llm
+
+
+def _after_tools(agent_id: str):
+    def after_tools(state: MessagesState) -> str:
+        # Only the results of the calls just made; earlier hand-offs are done.
+        step: list = []
+        for message in reversed(state["messages"]):
+            if isinstance(message, AIMessage):
+                break
+            step.append(message)
+        return _last_handoff(reversed(step)) or agent_id
+
+    return after_tools
+
+
+def _last_handoff(messages) -> Optional[str]:
+    """Target agent of the last hand-off ``ToolMessage`` in ``messages``."""
+    target = None
+    for message in messages:
+        name = getattr(message, "name", None) or ""
+        if isinstance(message, ToolMessage) and name.startswith(HANDOFF_PREFIX):
+            target = name[len(HANDOFF_PREFIX):]
+    return target
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+"""Conversation jobs run from the ``tasks`` queue.
+
+``conversationRun`` with ``"queue": true`` records a job and enqueues it
+instead of answering; ``queue_worker`` runs the conversation and stores the
+answer on the job; ``conversationResult/{job_id}`` returns it. Jobs are kept
+in a Cosmos DB container when ``CosmosDbConnection`` is set, so any worker
+can pick them up and any instance can answer a poll; otherwise they live in
+process memory, which only suits a single local worker.
+"""
+
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Optional, Protocol
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = frozenset({SUCCEEDED, FAILED})
+
+DEFAULT_CONTAINER = "conversation-jobs"
+# Finished jobs are removed by Cosmos DB after this many seconds.
+DEFAULT_JOB_TTL_SECONDS = 86400
+DEFAULT_MAX_JOBS = 1024
+# Fields returned to clients; the rest is bookkeeping.
+PUBLIC_FIELDS = ("id", "status", "output", "error", "created_at", "updated_at")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def new_job(session_id: Optional[str] = None) -> dict[str, Any]:
+    """Return a queued job document with a fresh id."""
+    now = _now()
+    return {
+        "id": uuid.uuid4().hex,
+        "status": QUEUED,
+        "session_id": session_id,
+        "attempts": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def public_view(job: dict[str, Any]) -> dict[str, Any]:
+    return {key: job[key] for key in PUBLIC_FIELDS if job.get(key) is not None}
+
+
+class JobStore(Protocol):
+    """Storage for conversation job documents."""
+
+    def create(self, job: dict[str, Any]) -> None:
+        ...
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        ...
+
+    def get(self, job_id: str) -> Optional[dict[str, Any]]:
+        ...
+
+
+class InMemoryJobStore:
+    """Process-local job store keeping the most recent ``max_jobs`` jobs."""
+
+    def __init__(self, max_jobs: int = DEFAULT_MAX_JOBS) -> None:
+        self.max_jobs = max_jobs
+        self._jobs: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, job: dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            job = self._jobs.setdefault(job_id, {"id": job_id, "created_at": _now()})
+            job.update(fields, updated_at=_now())
+
+    def get(self, job_id: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+
+class CosmosJobStore:
+    """Job documents in a Cosmos DB container partitioned by ``/id``.
+
+    Updates are partial (``patch_item``), so a status change costs one small
+    write whatever the size of the answer stored earlier.
+    """
+
+    def __init__(self, container, ttl: int = DEFAULT_JOB_TTL_SECONDS) -> None:
+        self.container = container
+        self.ttl = ttl
+
+    @classmethod
+    def from_connection_string(
+        cls, connection_string: str, database: str, container: str, ttl: int = DEFAULT_JOB_TTL_SECONDS
+    ) -> "CosmosJobStore":
+        from azure.cosmos import CosmosClient, PartitionKey
+
+        client = CosmosClient.from_connection_string(connection_string)
+        db = client.create_database_if_not_exists(database)
+        jobs = db.create_container_if_not_exists(
+            id=container, partition_key=PartitionKey(path="/id"), default_ttl=ttl
+        )
+        return cls(jobs, ttl=ttl)
+
+    def create(self, job: dict[str, Any]) -> None:
+        self.container.create_item(job)
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        from azure.cosmos.exceptions import CosmosResourceNotFoundError
+
+        fields["updated_at"] = _now()
+        operations = [{"op": "set", "path": f"/{key}", "value": value} for key, value in fields.items()]
+        try:
+            self.container.patch_item(job_id, partition_key=job_id, patch_operations=operations)
+        except CosmosResourceNotFoundError:
+            # The job expired or was never recorded: keep the outcome anyway.
+            self.container.upsert_item({"id": job_id, "created_at": fields["updated_at"], **fields})
+
+    def get(self, job_id: str) -> Optional[dict[str, Any]]:
+        from azure.cosmos.exceptions import CosmosResourceNotFoundError
+
+        try:
+            return self.container.read_item(job_id, partition_key=job_id)
+        except CosmosResourceNotFoundError:
+            return None
+
+
+_STORE: Optional[JobStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """Return the process-wide job store configured from environment variables.
+
+    ``CosmosDbConnection`` selects Cosmos DB, with the database from
+    ``CosmosDatabase`` and the container from ``ConversationJobsContainer``
+    (default ``conversation-jobs``); ``CONVERSATION_JOB_TTL`` sets how long
+    jobs are kept.
+    """
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            connection = os.environ.get("CosmosDbConnection")
+            if connection:
+                _STORE = CosmosJobStore.from_connection_string(
+                    connection,
+                    os.environ.get("CosmosDatabase", "db"),
+                    os.environ.get("ConversationJobsContainer", DEFAULT_CONTAINER),
+                    ttl=int(os.environ.get("CONVERSATION_JOB_TTL", DEFAULT_JOB_TTL_SECONDS)),
+                )
+            else:
+                _STORE = InMemoryJobStore()
+        return _STORE
+
+
+def set_job_store(store: Optional[JobStore]) -> None:
+    """Replace the process-wide store (``None`` re-reads the environment)."""
+    global _STORE
+    with _STORE_LOCK:
+        _STORE = store
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+"""Per-session conversation memory with an optional persistent backend.
+
+:class:`SessionMemoryStore` keeps recently used sessions in an in-process
+LRU that also evicts sessions idle for longer than ``idle_ttl``. Evicted or
+never-seen sessions are reloaded from the configured backend, so memory use
+stays bounded while conversations survive eviction and worker restarts.
+Sessions held or awaited by a turn are never evicted.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Optional, Protocol
+
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+
+DEFAULT_MAX_SESSIONS = 256
+DEFAULT_IDLE_SECONDS = 1800.0
+# Length of the ``session_id`` column.
+MAX_SESSION_ID_LENGTH = 128
+
+
+class MemoryBackend(Protocol):
+    """Persistent storage for session message histories."""
+
+    def load(self, session_id: str) -> list[BaseMessage]:
+        ...
+
+    def append(self, session_id: str, start: int, messages: list[BaseMessage]) -> None:
+        ...
+
+    def delete(self, session_id: str) -> None:
+        ...
+
+
+class SqlAlchemyMemoryBackend:
+    """Stores one row per message in a SQL table via SQLAlchemy Core.
+
+    Works with SQLite locally (``sqlite:///conversations.db``) and with the
+    Azure SQL database from ``infra/modules/sql.bicep``
+    (``mssql+pyodbc://...``). Only messages added since the last save are
+    inserted, so the cost of a turn does not grow with the history length.
+    """
+
+    def __init__(self, url: str) -> None:
+        from sqlalchemy import (
+            Column,
+            Integer,
+            MetaData,
+            String,
+            Table,
+            Text,
+            create_engine,
+        )
+
+        self.engine = create_engine(url, pool_pre_ping=True)
+        self.metadata = MetaData()
+        self.table = Table(
+            "conversation_messages",
+            self.metadata,
+            Column("session_id", String(MAX_SESSION_ID_LENGTH), primary_key=True),
+            Column("position", Integer, primary_key=True, autoincrement=False),
+            Column("payload", Text, nullable=False),
+        )
+        self.metadata.create_all(self.engine)
+
+    def load(self, session_id: str) -> list[BaseMessage]:
+        from sqlalchemy import select
+
+        query = (
+            select(self.table.c.payload)
+            .where(self.table.c.session_id == session_id)
+            .order_by(self.table.c.position)
+        )
+        with self.engine.connect() as conn:
+            rows = conn.execute(query).scalars().all()
+        return messages_from_dict([json.loads(row) for row in rows])
+
+    def append(self, session_id: str, start: int, messages: list[BaseMessage]) -> None:
+        if not messages:
+            return
+        from sqlalchemy import delete
+
+        rows = [
+            {"session_id": session_id, "position": start + offset, "payload": json.dumps(data)}
+            for offset, data in enumerate(messages_to_dict(messages))
+        ]
+        with self.engine.begin() as conn:
+            # Positions at or after ``start`` are rewritten in case a previous
+            # save of this session was interrupted half way.
+            conn.execute(
+                delete(self.table).where(
+                    (self.table.c.session_id == session_id) & (self.table.c.position >= start)
+                )
+            )
+            conn.execute(self.table.insert(), rows)
+
+    def delete(self, session_id: str) -> None:
+        from sqlalchemy import delete
+
+        with self.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.session_id == session_id))
+
+
+class Session:
+    """Message history of one conversation; use via :meth:`SessionMemoryStore.session`."""
+
+    def __init__(self, session_id: str, messages: list[BaseMessage]) -> None:
+        self.session_id = session_id
+        self.messages = messages
+        self.persisted = len(messages)
+        self.last_access = time.monotonic()
+        self.lock = threading.Lock()
+        # Turns holding or waiting for this session; it is not evicted meanwhile.
+        self.users = 0
+
+    def update(self, messages: list[BaseMessage]) -> None:
+        self.messages = list(messages)
+
+
+class SessionMemoryStore:
+    """Thread-safe LRU of sessions with idle eviction and a pluggable backend."""
+
+    def __init__(
+        self,
+        backend: Optional[MemoryBackend] = None,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        idle_ttl: float = DEFAULT_IDLE_SECONDS,
+    ) -> None:
+        self.backend = backend
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[Session]:
+        """Hold ``session_id`` exclusively and persist its new messages on exit.
+
+        Concurrent requests for the same session are serialised; different
+        sessions proceed in parallel.
+        """
+        session = self._acquire(session_id)
+        try:
+            with session.lock:
+                yield session
+                self._persist(session)
+        finally:
+            self._release(session)
+
+    @asynccontextmanager
+    async def asession(self, session_id: str) -> AsyncIterator[Session]:
+        """Async variant of :meth:`session` that never blocks the event loop.
+
+        Lock waits and backend I/O run in worker threads, so other
+        conversations keep being served while this one waits.
+        """
+        session = await asyncio.to_thread(self._acquire, session_id)
+        acquire = asyncio.ensure_future(asyncio.to_thread(session.lock.acquire))
+        try:
+            # Shielded: a cancelled turn must not leave the lock taken once
+            # the waiting thread gets it.
+            await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            acquire.add_done_callback(lambda _: session.lock.release())
+            self._release(session)
+            raise
+        try:
+            yield session
+            await asyncio.to_thread(self._persist, session)
+        finally:
+            session.lock.release()
+            self._release(session)
+
+    def get(self, session_id: str) -> list[BaseMessage]:
+        """Return a copy of the messages stored for ``session_id``."""
+        with self.session(session_id) as session:
+            return list(session.messages)
+
+    def delete(self, session_id: str) -> None:
+        _check_session_id(session_id)
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        if self.backend is not None:
+            self.backend.delete(session_id)
+
+    def clear(self) -> None:
+        """Forget every in-process session (the backend is left untouched)."""
+        with self._lock:
+            self._sessions.clear()
+
+    def _acquire(self, session_id: str) -> Session:
+        _check_session_id(session_id)
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.last_access = time.monotonic()
+                session.users += 1
+                return session
+        messages = self.backend.load(session_id) if self.backend is not None else []
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id, messages)
+                self._sessions[session_id] = session
+            session.users += 1
+            self._evict_excess()
+            return session
+
+    def _release(self, session: Session) -> None:
+        with self._lock:
+            session.users -= 1
+
+    def _persist(self, session: Session) -> None:
+        session.last_access = time.monotonic()
+        if self.backend is not None and len(session.messages) > session.persisted:
+            start = session.persisted
+            self.backend.append(session.session_id, start, session.messages[start:])
+            session.persisted = len(session.messages)
+
+    def _evict_idle(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl
+        idle = []
+        for session_id, session in self._sessions.items():
+            if session.last_access >= cutoff:
+                break
+            if not session.users:
+                idle.append(session_id)
+        for session_id in idle:
+            del self._sessions[session_id]
+
+    def _evict_excess(self) -> None:
+        """Drop the least recently used sessions over ``max_sessions`` that are not in use."""
+        excess = len(self._sessions) - self.max_sessions
+        if excess <= 0:
+            return
+        unused = (session_id for session_id, session in self._sessions.items() if not session.users)
+        for session_id in list(itertools.islice(unused, excess)):
+            del self._sessions[session_id]
+
+
+def _check_session_id(session_id: str) -> None:
+    if len(session_id) > MAX_SESSION_ID_LENGTH:
+        raise ValueError(f"session_id is longer than {MAX_SESSION_ID_LENGTH} characters")
+
+
+_STORE: Optional[SessionMemoryStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_memory_store() -> SessionMemoryStore:
+    """Return the process-wide store configured from environment variables.
+
+    ``CONVERSATION_DB_URL`` selects a SQLAlchemy backend (for example
+    ``sqlite:///conversations.db``); without it sessions live in memory only.
+    ``CONVERSATION_MAX_SESSIONS`` and ``CONVERSATION_IDLE_SECONDS`` bound the
+    in-process LRU.
+    """
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            url = os.environ.get("CONVERSATION_DB_URL")
+            _STORE = SessionMemoryStore(
+                backend=SqlAlchemyMemoryBackend(url) if url else None,
+                max_sessions=int(os.environ.get("CONVERSATION_MAX_SESSIONS", DEFAULT_MAX_SESSIONS)),
+                idle_ttl=float(os.environ.get("CONVERSATION_IDLE_SECONDS", DEFAULT_IDLE_SECONDS)),
+            )
+        return _STORE
+
+
+def set_memory_store(store: Optional[SessionMemoryStore]) -> None:
+    """Replace the process-wide store (``None`` re-reads the environment)."""
+    global _STORE
+    with _STORE_LOCK:
+        _STORE = store
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+"""Shared HTTP clients and client-side rate limiting for Azure OpenAI.
+
+Every agent's ``AzureChatOpenAI`` uses the same pair of ``httpx`` clients
+(sync and async), so the agents share one keep-alive connection pool, over
+HTTP/2 when ``h2`` is installed.
+
+When ``AZURE_OPENAI_TPM`` or ``AZURE_OPENAI_RPM`` is set, each request first
+takes its estimated tokens and one request from token buckets kept per
+deployment, waiting briefly when a bucket is empty instead of sending a
+request the service would reject with ``429``. The buckets follow the
+``x-ratelimit-remaining-*`` headers of each response, and a ``429`` with
+``retry-after`` pauses the whole deployment, so concurrent requests queue
+behind it rather than retrying into the limit.
+
+Settings (environment variables):
+
+``AZURE_OPENAI_MAX_CONNECTIONS`` / ``AZURE_OPENAI_MAX_KEEPALIVE``
+    Pool size and idle connections kept open (default 20 / 10).
+``AZURE_OPENAI_KEEPALIVE_EXPIRY``
+    Seconds an idle connection is kept (default 30).
+``AZURE_OPENAI_HTTP2``
+    ``0`` disables HTTP/2 (default on when ``h2`` is installed).
+``AZURE_OPENAI_TIMEOUT``
+    Request timeout in seconds (default 120).
+``AZURE_OPENAI_TPM`` / ``AZURE_OPENAI_RPM``
+    Tokens and requests per minute of each deployment (default unlimited).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+from .context import count_text_tokens
+
+try:  # optional: HTTP/2 needs the ``h2`` package (``httpx[http2]``)
+    import h2  # noqa: F401
+except ImportError:  # pragma: no cover - depends on the deployment
+    HTTP2_AVAILABLE = False
+else:  # pragma: no cover - depends on the deployment
+    HTTP2_AVAILABLE = True
+
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_TIMEOUT = 120.0
+# Completion size assumed when a request does not set ``max_tokens``.
+DEFAULT_COMPLETION_TOKENS = 512
+
+_DEPLOYMENT_RE = re.compile(r"/deployments/([^/]+)/")
+
+
+class TokenBucket:
+    """Token bucket refilled continuously up to ``capacity``.
+
+    :meth:`reserve` always succeeds and returns how long the caller has to
+    wait; the balance may go negative, which queues later callers behind
+    earlier ones.
+    """
+
+    def __init__(self, capacity: float, clock=time.monotonic) -> None:
+        self.capacity = float(capacity)
+        self.rate = self.capacity / 60.0
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        now = self.clock()
+        self._refill(now)
+        # A single oversized request waits for a full bucket, not forever.
+        amount = min(amount, self.capacity)
+        self.tokens -= amount
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.paused_until - now)
+
+    def sync(self, remaining: float) -> None:
+        """Lower the balance to what the service reports as remaining."""
+        self._refill(self.clock())
+        self.tokens = min(self.tokens, remaining)
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+
+class RateLimiter:
+    """Token and request buckets of one deployment."""
+
+    def __init__(self, tpm: Optional[float] = None, rpm: Optional[float] = None, clock=time.monotonic) -> None:
+        self.tokens = TokenBucket(tpm, clock) if tpm else None
+        self.requests = TokenBucket(rpm, clock) if rpm else None
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    def reserve(self, tokens: int) -> float:
+        """Take ``tokens`` and one request; return the seconds to wait first."""
+        with self._lock:
+            wait = 0.0
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.reserve(tokens))
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1))
+            return wait
+
+    def observe(self, response: httpx.Response) -> None:
+        """Follow the rate-limit headers of ``response``."""
+        headers = response.headers
+        with self._lock:
+            for bucket, header in (
+                (self.tokens, "x-ratelimit-remaining-tokens"),
+                (self.requests, "x-ratelimit-remaining-requests"),
+            ):
+                value = headers.get(header)
+                if bucket is not None and value is not None:
+                    try:
+                        bucket.sync(float(value))
+                    except ValueError:
+                        pass
+            if response.status_code == 429:
+                self.throttled += 1
+                delay = retry_after(headers)
+                for bucket in (self.tokens, self.requests):
+                    if bucket is not None:
+                        bucket.pause(delay)
+                logging.warning("Azure OpenAI throttled the deployment; pausing %.1fs", delay)
+
+
+def retry_after(headers: httpx.Headers, default: float = 1.0) -> float:
+    """Seconds to wait according to ``retry-after-ms`` or ``retry-after``."""
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return default
+
+
+def estimate_tokens(request: httpx.Request) -> int:
+    """Prompt plus maximum completion tokens of a chat completion request."""
+    try:
+        body = json.loads(request.content or b"{}")
+    except (ValueError, httpx.RequestNotRead):
+        return 0
+    if not isinstance(body, dict) or "messages" not in body:
+        return 0
+    prompt = sum(
+        count_text_tokens(json.dumps(message.get("content", ""), ensure_ascii=False))
+        for message in body.get("messages", [])
+        if isinstance(message, dict)
+    )
+    completion = body.get("max_completion_tokens") or body.get("max_tokens") or DEFAULT_COMPLETION_TOKENS
+    return prompt + int(completion)
+
+
+class DeploymentLimits:
+    """Limiters per deployment, created on first use."""
+
+    def __init__(self, tpm: Optional[float], rpm: Optional[float]) -> None:
+        self.tpm = tpm
+        self.rpm = rpm
+        self._limiters: dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def for_request(self, request: httpx.Request) -> RateLimiter:
+        match = _DEPLOYMENT_RE.search(request.url.path)
+        deployment = match.group(1) if match else request.url.host
+        with self._lock:
+            limiter = self._limiters.get(deployment)
+            if limiter is None:
+                limiter = self._limiters[deployment] = RateLimiter(self.tpm, self.rpm)
+            return limiter
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """Sync transport waiting for the deployment's buckets before sending."""
+
+    def __init__(self, transport: httpx.BaseTransport, limits: DeploymentLimits) -> None:
+        self.transport = transport
+        self.limits = limits
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        limiter = self.limits.for_request(request)
+        wait = limiter.reserve(estimate_tokens(request))
+        if wait > 0:
+            time.sleep(wait)
+        response = self.transport.handle_request(request)
+        limiter.observe(response)
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of :class:`RateLimitedTransport`."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limits: DeploymentLimits) -> None:
+        self.transport = transport
+        self.limits = limits
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        limiter = self.limits.for_request(request)
+        wait = limiter.reserve(estimate_tokens(request))
+        if wait > 0:
+            await asyncio.sleep(wait)
+        response = await self.transport.handle_async_request(request)
+        limiter.observe(response)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def _build_clients() -> tuple[httpx.Client, httpx.AsyncClient]:
+    limits = httpx.Limits(
+        max_connections=int(_env_float("AZURE_OPENAI_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+        max_keepalive_connections=int(_env_float("AZURE_OPENAI_MAX_KEEPALIVE", DEFAULT_MAX_KEEPALIVE)),
+        keepalive_expiry=_env_float("AZURE_OPENAI_KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY),
+    )
+    http2 = HTTP2_AVAILABLE and os.environ.get("AZURE_OPENAI_HTTP2", "1") != "0"
+    timeout = httpx.Timeout(_env_float("AZURE_OPENAI_TIMEOUT", DEFAULT_TIMEOUT), connect=10.0)
+    transport: httpx.BaseTransport = httpx.HTTPTransport(limits=limits, http2=http2)
+    async_transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+    tpm = _env_float("AZURE_OPENAI_TPM", None)
+    rpm = _env_float("AZURE_OPENAI_RPM", None)
+    if tpm or rpm:
+        rate_limits = DeploymentLimits(tpm, rpm)
+        transport = RateLimitedTransport(transport, rate_limits)
+        async_transport = AsyncRateLimitedTransport(async_transport, rate_limits)
+    return (
+        httpx.Client(transport=transport, timeout=timeout),
+        httpx.AsyncClient(transport=async_transport, timeout=timeout),
+    )
+
+
+_CLIENTS: Optional[tuple[httpx.Client, httpx.AsyncClient]] = None
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_http_clients() -> tuple[httpx.Client, httpx.AsyncClient]:
+    """Return the process-wide ``(sync, async)`` clients shared by all agents.
+
+    The async client's connections belong to the event loop that first uses
+    it, i.e. the Functions worker loop.
+    """
+    global _CLIENTS
+    with _CLIENTS_LOCK:
+        if _CLIENTS is None:
+            _CLIENTS = _build_clients()
+        return _CLIENTS
+
+
+def set_http_clients(clients: Optional[tuple[httpx.Client, httpx.AsyncClient]]) -> None:
+    """Replace the shared clients (``None`` re-reads the environment on next use)."""
+    global _CLIENTS
+    with _CLIENTS_LOCK:
+        _CLIENTS = clients
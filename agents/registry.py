@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+"""Memoized agents and compiled multi-agent graphs.
+
+Building an agent reads its ``config.json`` and ``instructions.md``, creates
+its LLM client, binds its tools and compiles its subgraph. :class:`AgentRegistry`
+does this once per agent and keeps the compiled graph of each entry agent,
+so further :func:`~agents.graph.build_graph` calls (other entry points,
+checkpointed variants, reloaded modules) reuse them.
+
+Everything is keyed on a hash of the agents' config and instruction files;
+when it changes the next lookup rebuilds. The hash is only recomputed when
+a file was added, removed or modified since the last lookup. Code that swaps
+the chat model class (tests, benchmarks) calls :meth:`AgentRegistry.clear`.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from .router import IntentRouter
+from .vanilla_agent import VanillaAgent
+
+AGENTS_DIR = Path(__file__).parent
+DEFAULT_MAX_GRAPHS = 8
+
+
+# root -> (path, mtime, size) of each hashed file, and their hash
+_FINGERPRINTS: dict[Path, tuple[tuple, str]] = {}
+_FINGERPRINTS_LOCK = threading.Lock()
+
+
+def config_fingerprint(root: Path = AGENTS_DIR) -> str:
+    """Hash of every agent's ``config.json`` and ``instructions.md`` under ``root``.
+
+    Files are only read again when their modification time or size changed.
+    """
+    paths = sorted([*root.glob("*/config.json"), *root.glob("*/instructions.md")])
+    files = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        files.append((path, stat.st_mtime_ns, stat.st_size))
+    signature = tuple(files)
+    with _FINGERPRINTS_LOCK:
+        cached = _FINGERPRINTS.get(root)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    digest = hashlib.sha1()
+    for path, _, _ in files:
+        digest.update(path.relative_to(root).as_posix().encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(path.read_bytes())
+    fingerprint = digest.hexdigest()
+    with _FINGERPRINTS_LOCK:
+        _FINGERPRINTS[root] = (signature, fingerprint)
+    return fingerprint
+
+
+@dataclass
+class CompiledGraph:
+    """A compiled graph with the agents and router it was built from."""
+
+    graph: Any
+    agents: dict[str, VanillaAgent]
+    router: Optional[IntentRouter]
+    checkpointer: Any = None
+
+
+class AgentRegistry:
+    """Build each agent and entry graph once per configuration."""
+
+    def __init__(self, root: Path = AGENTS_DIR, max_graphs: int = DEFAULT_MAX_GRAPHS) -> None:
+        self.root = root
+        self.max_graphs = max_graphs
+        self._lock = threading.RLock()
+        self._stamp: Optional[str] = None
+        self._agents: dict[str, VanillaAgent] = {}
+        self._graphs: OrderedDict[tuple, CompiledGraph] = OrderedDict()
+        self._stats = {"agent_builds": 0, "graph_hits": 0, "graph_builds": 0, "reloads": 0}
+
+    # agents ---------------------------------------------------------------
+    def agents(self, entry_id: str) -> dict[str, VanillaAgent]:
+        """The entry agent and every agent reachable through hand-offs."""
+        with self._lock:
+            self._refresh()
+            reachable: dict[str, VanillaAgent] = {}
+            pending = [entry_id]
+            while pending:
+                agent_id = pending.pop(0)
+                if agent_id in reachable:
+                    continue
+                agent = self._agents.get(agent_id)
+                if agent is None:
+                    agent = self._agents[agent_id] = VanillaAgent.from_id(agent_id)
+                    self._stats["agent_builds"] += 1
+                reachable[agent_id] = agent
+                pending.extend(agent.config.get("handover", []))
+            return reachable
+
+    # graphs ---------------------------------------------------------------
+    def get_graph(
+        self, entry_id: str, checkpointer=None, fast_route: bool = True, flatten: bool = False
+    ) -> Optional[CompiledGraph]:
+        key = self._graph_key(entry_id, checkpointer, fast_route, flatten)
+        with self._lock:
+            self._refresh()
+            cached = self._graphs.get(key)
+            if cached is None or cached.checkpointer is not checkpointer:
+                return None
+            self._graphs.move_to_end(key)
+            self._stats["graph_hits"] += 1
+            VanillaAgent.REGISTRY.update(cached.agents)
+            return cached
+
+    def put_graph(
+        self, entry_id: str, compiled: CompiledGraph, fast_route: bool = True, flatten: bool = False
+    ) -> CompiledGraph:
+        key = self._graph_key(entry_id, compiled.checkpointer, fast_route, flatten)
+        with self._lock:
+            self._graphs[key] = compiled
+            self._graphs.move_to_end(key)
+            while len(self._graphs) > self.max_graphs:
+                self._graphs.popitem(last=False)
+            self._stats["graph_builds"] += 1
+        return compiled
+
+    def clear(self) -> None:
+        """Drop every agent and graph, e.g. after swapping the chat model class."""
+        with self._lock:
+            self._stamp = None
+            self._agents.clear()
+            self._graphs.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._stats, "agents": len(self._agents), "graphs": len(self._graphs)}
+
+    # helpers --------------------------------------------------------------
+    @staticmethod
+    def _graph_key(entry_id: str, checkpointer, fast_route: bool, flatten: bool = False) -> tuple:
+        return (entry_id, fast_route, flatten, id(checkpointer) if checkpointer is not None else None)
+
+    def _refresh(self) -> None:
+        stamp = config_fingerprint(self.root)
+        if stamp == self._stamp:
+            return
+        if self._stamp is not None:
+            logging.info("Agent configuration changed; rebuilding agents and graphs")
+            self._stats["reloads"] += 1
+        self._stamp = stamp
+        self._agents.clear()
+        self._graphs.clear()
+        VanillaAgent.REGISTRY.clear()
+
+
+_REGISTRY: Optional[AgentRegistry] = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_agent_registry() -> AgentRegistry:
+    """Return the process-wide agent registry."""
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = AgentRegistry()
+        return _REGISTRY
+
+
+def set_agent_registry(registry: Optional[AgentRegistry]) -> None:
+    """Replace the process-wide registry (``None`` starts a fresh one on next use)."""
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        _REGISTRY = registry
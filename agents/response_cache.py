@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+"""Response cache for repeated, context-free questions.
+
+Entries are keyed on the normalised input and the agent route, and remember
+the version (ETag) of every manual consulted while the answer was produced.
+A lookup re-checks those versions (a local cache hit or a conditional blob
+request, never an LLM call), so an answer is dropped as soon as one of its
+manuals changes. Entries also expire after a TTL and are evicted LRU.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage, ToolMessage
+
+from .vanilla_agent import HANDOFF_PREFIX
+
+DEFAULT_TTL_SECONDS = 600.0
+DEFAULT_MAX_ENTRIES = 512
+# Tools whose output depends only on manual contents tracked by version.
+CACHEABLE_TOOLS = frozenset({"manuals_tool", "manual_sections", "search_manuals"})
+
+_SPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s?!.]+$")
+
+
+def normalize_input(text: str) -> str:
+    """Case-fold and collapse whitespace and trailing punctuation."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _TRAILING_PUNCT_RE.sub("", _SPACE_RE.sub(" ", text).strip())
+
+
+def is_cacheable_turn(messages: Sequence[BaseMessage]) -> bool:
+    """Return ``True`` when the last turn only used version-tracked tools."""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return True
+        if isinstance(message, ToolMessage):
+            name = message.name or ""
+            if not name.startswith(HANDOFF_PREFIX) and name not in CACHEABLE_TOOLS:
+                return False
+    return True
+
+
+def _manual_version(machine: str) -> str:
+    from middleware.manuals_tools import ManualsTool
+
+    return ManualsTool().current_version(machine)
+
+
+@dataclass
+class CachedResponse:
+    output: str
+    manuals: dict[str, str] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class ResponseCache:
+    """Thread-safe LRU of final answers with TTL and manual-version checks."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        version_of: Callable[[str], str] = _manual_version,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_of = version_of
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "invalidated": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(text: str, route: str) -> str:
+        return hashlib.sha1(f"{route}\0{normalize_input(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str, route: str) -> Optional[str]:
+        """Return the cached answer, or ``None`` if absent, expired or outdated."""
+        key = self.key(text, route)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.created_at > self.ttl:
+                del self._entries[key]
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+        for machine, version in entry.manuals.items():
+            if self.version_of(machine) != version:
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                    self._stats["invalidated"] += 1
+                    self._stats["misses"] += 1
+                return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+        return entry.output
+
+    def put(self, text: str, route: str, output: str, manuals: dict[str, str]) -> None:
+        if self.ttl <= 0 or not output:
+            return
+        key = self.key(text, route)
+        with self._lock:
+            self._entries[key] = CachedResponse(output, dict(manuals))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_manual(self, machine: str) -> int:
+        """Drop every answer that consulted ``machine``; return how many."""
+        machine = machine[: -len(".md")] if machine.endswith(".md") else machine
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if machine in entry.manuals]
+            for key in stale:
+                del self._entries[key]
+            self._stats["invalidated"] += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+
+_CACHE: Optional[ResponseCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide cache configured from environment variables.
+
+    ``RESPONSE_CACHE_TTL`` (seconds, ``0`` disables caching) and
+    ``RESPONSE_CACHE_MAX_ENTRIES`` bound the cache.
+    """
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ResponseCache(
+                max_entries=int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                ttl=float(os.environ.get("RESPONSE_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+            )
+        return _CACHE
+
+
+def set_response_cache(cache: Optional[ResponseCache]) -> None:
+    """Replace the process-wide cache (``None`` re-reads the environment)."""
+    global _CACHE
+    with _CACHE_LOCK:
+        _CACHE = cache
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+"""Local intent routing in front of the dispatcher agent.
+
+:class:`IntentRouter` scores a user message against each specialist's
+``description`` and ``routing.keywords`` from its ``config.json`` and against
+terms learned from earlier dispatcher hand-offs. When one specialist wins
+with enough confidence the graph enters it directly and skips the dispatcher
+LLM round trip; otherwise the dispatcher decides as before.
+"""
+
+import logging
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+DEFAULT_THRESHOLD = 0.6
+DESCRIPTION_WEIGHT = 1.0
+KEYWORD_WEIGHT = 3.0
+LEARNED_WEIGHT = 2.0
+# Hand-offs a term needs before it gets the full learned weight.
+LEARNED_SATURATION = 5
+MIN_LEARNED_COUNT = 2
+MAX_LEARNED_TERMS = 2048
+# Score at which a match counts as fully specific (one configured keyword).
+SCORE_SATURATION = KEYWORD_WEIGHT
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how i in is it of on or the this that "
+    "to what when where which with my me can could should would please used need "
+    "about agent information query queries handles create wired".split()
+)
+
+
+def routing_terms(text: str) -> list[str]:
+    """Normalised, de-duplicated content words of ``text``."""
+    terms: list[str] = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        if token not in terms:
+            terms.append(token)
+    return terms
+
+
+@dataclass
+class AgentProfile:
+    """Routing vocabulary of one specialist agent."""
+
+    agent_id: str
+    description: str = ""
+    keywords: list[str] = field(default_factory=list)
+    learned: Counter[str] = field(default_factory=Counter)
+
+    def weights(self) -> dict[str, float]:
+        weights = {term: DESCRIPTION_WEIGHT for term in routing_terms(self.description)}
+        for term, count in self.learned.items():
+            if count >= MIN_LEARNED_COUNT:
+                learned = LEARNED_WEIGHT * min(count, LEARNED_SATURATION) / LEARNED_SATURATION
+                weights[term] = max(weights.get(term, 0.0), learned)
+        for keyword in self.keywords:
+            for term in routing_terms(keyword):
+                weights[term] = KEYWORD_WEIGHT
+        return weights
+
+
+@dataclass
+class RouteDecision:
+    """Outcome of :meth:`IntentRouter.route`; ``agent_id`` is ``None`` for fallback."""
+
+    agent_id: Optional[str]
+    confidence: float
+    scores: dict[str, float]
+
+
+class IntentRouter:
+    """Score messages against specialist profiles and pick one when confident.
+
+    A term's contribution to an agent is weighted by that agent's share of the
+    term across all profiles, so words every specialist knows add nothing.
+    Confidence combines the margin over the runner-up with the absolute
+    strength of the best match.
+    """
+
+    def __init__(self, profiles: Iterable[AgentProfile], threshold: float = DEFAULT_THRESHOLD) -> None:
+        self.profiles = {profile.agent_id: profile for profile in profiles}
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._weights: Optional[dict[str, dict[str, float]]] = None
+
+    @classmethod
+    def from_agents(cls, entry, specialists: Iterable) -> "IntentRouter":
+        """Build a router from agent configs (threshold from the entry agent)."""
+        profiles = []
+        for agent in specialists:
+            routing = agent.config.get("routing", {})
+            profiles.append(
+                AgentProfile(
+                    agent_id=agent.config["id"],
+                    description=agent.config.get("description", ""),
+                    keywords=list(routing.get("keywords", [])),
+                )
+            )
+        threshold = entry.config.get("routing", {}).get("threshold", DEFAULT_THRESHOLD)
+        return cls(profiles, threshold=threshold)
+
+    # scoring --------------------------------------------------------------
+    def scores(self, text: str) -> dict[str, float]:
+        weights = self._profile_weights()
+        totals: Counter[str] = Counter()
+        for per_agent in weights.values():
+            totals.update(per_agent)
+        scores = {agent_id: 0.0 for agent_id in weights}
+        for term in routing_terms(text):
+            total = totals.get(term)
+            if not total:
+                continue
+            for agent_id, per_agent in weights.items():
+                weight = per_agent.get(term)
+                if weight:
+                    scores[agent_id] += weight * weight / total
+        return scores
+
+    def route(self, text: str, log: bool = True) -> RouteDecision:
+        """Return the specialist for ``text``, or a fallback decision."""
+        scores = self.scores(text)
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        if not ranked or ranked[0][1] <= 0:
+            decision = RouteDecision(None, 0.0, scores)
+        else:
+            best_id, best = ranked[0]
+            runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+            confidence = (1 - runner_up / best) * min(1.0, best / SCORE_SATURATION)
+            agent_id = best_id if confidence >= self.threshold else None
+            decision = RouteDecision(agent_id, round(confidence, 3), scores)
+        if not log:
+            return decision
+        logging.info(
+            "Router decision: %s (confidence=%.2f, threshold=%.2f, scores=%s)",
+            decision.agent_id or "fallback",
+            decision.confidence,
+            self.threshold,
+            {agent_id: round(score, 2) for agent_id, score in scores.items()},
+        )
+        return decision
+
+    # learning -------------------------------------------------------------
+    def learn(self, text: str, agent_id: str) -> None:
+        """Record that the dispatcher routed ``text`` to ``agent_id``."""
+        profile = self.profiles.get(agent_id)
+        if profile is None:
+            return
+        with self._lock:
+            profile.learned.update(routing_terms(text))
+            if len(profile.learned) > MAX_LEARNED_TERMS:
+                profile.learned = Counter(dict(profile.learned.most_common(MAX_LEARNED_TERMS)))
+            self._weights = None
+        logging.info("Router learned hand-off to %s", agent_id)
+
+    def _profile_weights(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            if self._weights is None:
+                self._weights = {
+                    agent_id: profile.weights() for agent_id, profile in self.profiles.items()
+                }
+            return self._weights
+
+
+_ROUTERS: dict[str, IntentRouter] = {}
+
+
+def register_router(entry_id: str, router: Optional[IntentRouter]) -> None:
+    """Make ``router`` the active router of the graph entered at ``entry_id``."""
+    if router is None:
+        _ROUTERS.pop(entry_id, None)
+    else:
+        _ROUTERS[entry_id] = router
+
+
+def predict_route(text: str, entry_id: str = "dispatcher_agent") -> str:
+    """Return the agent the active graph would enter first for ``text``."""
+    router = _ROUTERS.get(entry_id)
+    if router is None:
+        return entry_id
+    return router.route(text, log=False).agent_id or entry_id
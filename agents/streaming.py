@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+"""Server-sent events for a running conversation graph.
+
+:class:`ConversationStream` turns LangGraph ``astream_events`` into a small,
+front-end friendly event vocabulary:
+
+``route``
+    The agent a request was sent to, by the local router or a hand-off.
+``agent``
+    An agent subgraph started working.
+``tool_start`` / ``tool_end``
+    A tool call began or finished (name only; outputs can be whole manuals).
+``message_start`` / ``token``
+    A model started answering, followed by its text chunks. The final answer
+    is the last message started, so clients replace rather than append.
+``done``
+    The final answer; ``messages`` holds the full history afterwards.
+``error``
+    The run failed; no ``done`` event follows.
+"""
+
+import json
+import logging
+from typing import Any, AsyncIterator, Iterable, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from .vanilla_agent import HANDOFF_PREFIX
+
+
+def format_sse(event: dict[str, Any]) -> str:
+    """Encode ``{"event": ..., "data": ...}`` as one SSE frame."""
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+
+def _agent_of(metadata: dict[str, Any]) -> Optional[str]:
+    namespace = metadata.get("langgraph_checkpoint_ns") or ""
+    return namespace.split(":", 1)[0] or None
+
+
+class ConversationStream:
+    """Run ``graph`` with ``astream_events`` and yield progress and token events."""
+
+    def __init__(
+        self,
+        graph,
+        inputs: dict[str, Any],
+        config: Optional[dict[str, Any]] = None,
+        agent_ids: Iterable[str] = (),
+        route: Optional[str] = None,
+    ) -> None:
+        self.graph = graph
+        self.inputs = inputs
+        self.config = config
+        self.agent_ids = set(agent_ids)
+        self.route = route
+        self.messages: list[BaseMessage] = list(inputs.get("messages", []))
+
+    async def __aiter__(self) -> AsyncIterator[dict[str, Any]]:
+        if self.route:
+            yield {"event": "route", "data": {"agent": self.route, "via": "router"}}
+        streaming_run: Optional[str] = None
+        try:
+            async for event in self.graph.astream_events(self.inputs, self.config, version="v2"):
+                kind, name = event["event"], event.get("name", "")
+                if kind == "on_chain_start" and name in self.agent_ids:
+                    yield {"event": "agent", "data": {"agent": name}}
+                elif kind == "on_tool_start":
+                    if name.startswith(HANDOFF_PREFIX):
+                        agent = name[len(HANDOFF_PREFIX):]
+                        yield {"event": "route", "data": {"agent": agent, "via": "dispatcher"}}
+                    else:
+                        yield {"event": "tool_start", "data": {"tool": name}}
+                elif kind == "on_tool_end" and not name.startswith(HANDOFF_PREFIX):
+                    yield {"event": "tool_end", "data": {"tool": name}}
+                elif kind == "on_chat_model_stream":
+                    text = event["data"]["chunk"].content
+                    if not isinstance(text, str) or not text:
+                        continue
+                    if event["run_id"] != streaming_run:
+                        streaming_run = event["run_id"]
+                        agent = _agent_of(event.get("metadata", {}))
+                        yield {"event": "message_start", "data": {"agent": agent}}
+                    yield {"event": "token", "data": {"text": text}}
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    output = event["data"].get("output")
+                    if isinstance(output, dict) and "messages" in output:
+                        self.messages = list(output["messages"])
+        except Exception as exc:
+            logging.exception("Conversation stream failed")
+            yield {"event": "error", "data": {"message": str(exc)}}
+            return
+        yield {"event": "done", "data": {"output": self.output}}
+
+    @property
+    def output(self) -> Any:
+        last = self.messages[-1] if self.messages else None
+        return last.content if isinstance(last, AIMessage) else ""
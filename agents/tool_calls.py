@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+"""Bounded, time-limited execution of the tool calls of an agent turn.
+
+``ToolNode`` runs the calls of one model response side by side (threads for
+``invoke``, ``asyncio.gather`` for ``ainvoke``) and returns their messages in
+call order, so comparing two manuals costs one blob round trip, not two.
+:class:`ToolCallPolicy` adds what it lacks by wrapping each tool, which works
+with every ``ToolNode`` version: sync calls run on one process-wide pool, so
+concurrent conversations cannot start an unbounded number of downloads, and
+every call has a deadline, counted from when the call starts running. A call
+that overruns answers the model with an error ``ToolMessage`` instead of
+holding the turn.
+
+A Python thread cannot be stopped, so an overrunning sync call keeps its
+worker until it returns. Such calls are counted as abandoned; once half the
+workers are abandoned the pool is retired and a fresh one takes the new
+calls, including those still queued on the old one.
+
+Settings (environment variables):
+
+``TOOL_CALL_WORKERS``
+    Size of the shared pool (default 8).
+``TOOL_CALL_TIMEOUT``
+    Default deadline in seconds (default 30); an agent's ``config.json`` can
+    set ``"tool_timeouts": {"<tool name>": seconds}``.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Optional
+
+from langchain_core.tools import ToolException
+
+DEFAULT_WORKERS = 8
+DEFAULT_TIMEOUT_SECONDS = 30.0
+
+
+class ToolTimeout(ToolException):
+    """A tool call that missed its deadline."""
+
+
+class ToolCallPolicy:
+    """Deadlines and the shared pool for the tools of an agent's ``ToolNode``."""
+
+    def __init__(self, timeouts: Optional[dict[str, float]] = None, default: Optional[float] = None) -> None:
+        self.timeouts = dict(timeouts or {})
+        self.default = (
+            default if default is not None else float(os.environ.get("TOOL_CALL_TIMEOUT", DEFAULT_TIMEOUT_SECONDS))
+        )
+
+    def timeout_for(self, name: str) -> float:
+        return float(self.timeouts.get(name, self.default))
+
+    def apply(self, tools: list[Any]) -> list[Any]:
+        """Copies of ``tools`` running under this policy."""
+        return [self.wrap(tool) for tool in tools]
+
+    def wrap(self, tool: Any) -> Any:
+        """A copy of ``tool`` whose calls run on the pool, within their deadline.
+
+        Tools without a ``func``/``coroutine`` to wrap are returned unchanged.
+        A tool without a coroutine is run by ``ainvoke`` through its ``func``,
+        so it uses the pool as well.
+        """
+        func, coroutine = getattr(tool, "func", None), getattr(tool, "coroutine", None)
+        if not hasattr(tool, "model_copy") or (func is None and coroutine is None):
+            return tool
+        seconds = self.timeout_for(tool.name)
+        update: dict[str, Any] = {"handle_tool_error": _timeout_handler(tool.handle_tool_error)}
+        if func is not None:
+            update["func"] = _sync_call(tool.name, func, seconds)
+        if coroutine is not None:
+            update["coroutine"] = _async_call(tool.name, coroutine, seconds)
+        return tool.model_copy(update=update)
+
+
+def _sync_call(name: str, func, seconds: float):
+    @functools.wraps(func)
+    def call(*args, **kwargs):
+        # Each call gets its own copy so telemetry and manual-read tracking
+        # of the turn see what the tool does on the pool thread.
+        context = contextvars.copy_context()
+        while True:
+            pool = get_tool_pool()
+            started = threading.Event()
+
+            def run():
+                started.set()
+                return context.run(func, *args, **kwargs)
+
+            try:
+                future = pool.submit(run)
+            except RuntimeError:
+                # Retired since ``get_tool_pool`` returned it.
+                continue
+            future.add_done_callback(lambda _: started.set())
+            # Time spent queued behind other calls does not count.
+            started.wait()
+            try:
+                return future.result(timeout=seconds)
+            except CancelledError:
+                # Still queued when its pool was retired: run on the new one.
+                continue
+            except FutureTimeoutError:
+                _abandon(pool, future)
+                raise _timed_out(name, seconds) from None
+
+    return call
+
+
+def _async_call(name: str, coroutine, seconds: float):
+    @functools.wraps(coroutine)
+    async def call(*args, **kwargs):
+        try:
+            return await asyncio.wait_for(coroutine(*args, **kwargs), seconds)
+        except asyncio.TimeoutError:
+            raise _timed_out(name, seconds) from None
+
+    return call
+
+
+def _timed_out(name: str, seconds: float) -> ToolTimeout:
+    logging.warning("Tool %s timed out after %.1fs", name, seconds)
+    return ToolTimeout(f"Error: {name} did not finish within {seconds:g} seconds.")
+
+
+def _timeout_handler(handle_tool_error):
+    """``handle_tool_error`` answering timeouts and leaving other errors to ``handle_tool_error``."""
+
+    def handle(error: ToolException) -> str:
+        if isinstance(error, ToolTimeout):
+            return str(error)
+        if not handle_tool_error:
+            raise error
+        if callable(handle_tool_error):
+            return handle_tool_error(error)
+        if isinstance(handle_tool_error, str):
+            return handle_tool_error
+        return error.args[0] if error.args else "Tool execution error"
+
+    return handle
+
+
+# pool ----------------------------------------------------------------------
+
+_POOL: Optional[ThreadPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+# Calls past their deadline, per pool, that still occupy a worker.
+_ABANDONED: dict[ThreadPoolExecutor, int] = {}
+
+
+def get_tool_pool() -> ThreadPoolExecutor:
+    """Return the process-wide pool sized by ``TOOL_CALL_WORKERS``."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(
+                max_workers=int(os.environ.get("TOOL_CALL_WORKERS", DEFAULT_WORKERS)),
+                thread_name_prefix="tool-call",
+            )
+        return _POOL
+
+
+def set_tool_pool(pool: Optional[ThreadPoolExecutor]) -> None:
+    """Replace the shared pool (``None`` re-reads the environment on next use)."""
+    global _POOL
+    with _POOL_LOCK:
+        _POOL = pool
+
+
+def abandoned_tool_calls() -> int:
+    """Calls that missed their deadline and are still running."""
+    with _POOL_LOCK:
+        return sum(_ABANDONED.values())
+
+
+def _abandon(pool: ThreadPoolExecutor, future) -> None:
+    global _POOL
+    with _POOL_LOCK:
+        abandoned = _ABANDONED[pool] = _ABANDONED.get(pool, 0) + 1
+        retire = pool is _POOL and abandoned * 2 >= pool._max_workers
+        if retire:
+            _POOL = None
+    future.add_done_callback(functools.partial(_release, pool))
+    if retire:
+        logging.warning("Retiring the tool pool: %d of its workers run abandoned calls", abandoned)
+        # Queued calls are cancelled and resubmitted to the next pool; the
+        # abandoned ones finish on their threads.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _release(pool: ThreadPoolExecutor, _future) -> None:
+    with _POOL_LOCK:
+        remaining = _ABANDONED.get(pool, 0) - 1
+        if remaining > 0:
+            _ABANDONED[pool] = remaining
+        else:
+            _ABANDONED.pop(pool, None)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 """Base agent implementation built using LangGraph subgraphs."""
 
+import functools
 import json
 from importlib import import_module
 import pkgutil
@@ -13,16 +14,41 @@ from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AI
 from langgraph.graph import StateGraph, START, END, MessagesState
 from langgraph.prebuilt import ToolNode, InjectedState, tools_condition
 from langgraph.types import Command
+from langchain_core.runnables import RunnableLambda
 from langchain_core.tools import tool, InjectedToolCallId
 from typing import Annotated
-from langchain_core.messages.utils import convert_to_openai_messages
 
+from middleware.telemetry import instrument_tool, step
 
-def create_handoff_tool(*, agent_name: str, description: str | None = None):
-    """Create a tool that transfers control to another agent."""
-    name = f"transfer_to_{agent_name}"
+from .context import DEFAULT_MAX_CONTEXT_TOKENS, ContextWindow, OpenAIMessageCache
+from .memory import get_memory_store
+from .openai_client import get_http_clients
+from .tool_calls import ToolCallPolicy
+
+# Session used by :meth:`VanillaAgent.invoke` when the caller does not pass one.
+DEFAULT_SESSION_ID = "local"
+# Name prefix of the tools created by :func:`create_handoff_tool`.
+HANDOFF_PREFIX = "transfer_to_"
+
+
+def create_handoff_tool(*, agent_name: str, description: str | None = None, parent: bool = True):
+    """Create a tool that transfers control to another agent.
+
+    By default the tool runs inside an agent subgraph and sends the parent
+    graph to ``agent_name``. With ``parent=False`` (flattened graphs) it only
+    records the transfer; the graph routes on its ``ToolMessage``.
+    """
+    name = f"{HANDOFF_PREFIX}{agent_name}"
     description = description or f"Transfer to {agent_name}"
 
+    if not parent:
+
+        @tool(name, description=description)
+        def transfer() -> str:
+            return f"Successfully transferred to {agent_name}"
+
+        return transfer
+
     @tool(name, description=description)
     def handoff(
         state: Annotated[MessagesState, InjectedState],
@@ -34,20 +60,29 @@ def create_handoff_tool(*, agent_name: str, description: str | None = None):
             "name": name,
             "tool_call_id": tool_call_id,
         }
+        # The parent has not seen this subgraph's messages yet; those of the
+        # current turn are enough, earlier ones are matched by id.
         return Command(
             goto=agent_name,
-            update={"messages": state["messages"] + [tool_message]},
+            update={"messages": [*_current_turn(state["messages"]), tool_message]},
             graph=Command.PARENT,
         )
 
     return handoff
 
 
+def _current_turn(messages: list[BaseMessage]) -> list[BaseMessage]:
+    """Messages from the last human message on."""
+    for position in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[position], HumanMessage):
+            return messages[position:]
+    return messages
+
+
 class VanillaAgent:
-    """Generic agent wiring LLMs with optional tools and shared memory."""
+    """Generic agent wiring LLMs with optional tools and per-session memory."""
 
     REGISTRY: dict[str, "VanillaAgent"] = {}
-    MEMORY: list[BaseMessage] = []
 
     def __init__(
         self,
@@ -64,32 +99,34 @@ class VanillaAgent:
 
         self.tools: list[Any] = self._load_tools_from_config()
 
+        # Hand-off targets are built by the :class:`~agents.registry.AgentRegistry`.
         for agent_name in self.config.get("handover", []):
-            if agent_name not in VanillaAgent.REGISTRY:
-                VanillaAgent.from_id(agent_name)
             self.tools.append(create_handoff_tool(agent_name=agent_name))
+        self.tools = [instrument_tool(t, agent=self.config["displayName"]) for t in self.tools]
 
         model_name = self.config.get("model")
         if not model_name:
             raise ValueError("model must be specified in config")
-        self.llm = AzureChatOpenAI(deployment_name=model_name).bind_tools(self.tools)
+        # All agents share one connection pool and the deployment's rate limits.
+        http_client, http_async_client = get_http_clients()
+        self.llm = AzureChatOpenAI(
+            deployment_name=model_name,
+            http_client=http_client,
+            http_async_client=http_async_client,
+        ).bind_tools(self.tools)
+        self.context_window = ContextWindow(
+            self.config.get("max_context_tokens", DEFAULT_MAX_CONTEXT_TOKENS)
+        )
+        self.openai_messages = OpenAIMessageCache()
 
         self.graph = self._build_subgraph()
 
     # building ------------------------------------------------------------
     def _build_subgraph(self):
-        def call_model(state: MessagesState):
-            msgs = [SystemMessage(content=self.instructions)] + list(state["messages"])
-            msgs = convert_to_openai_messages(msgs)
-            response = self.llm.invoke(msgs)
-            airesponse = AIMessage(content=response.content, additional_kwargs=response.additional_kwargs, agent = self.config["displayName"])
-            # msg_to_append = AIMessage(response.content if response.content else str(response.additional_kwargs['tool_calls'][0]['function']))
-            return {"messages": state["messages"] + [airesponse]}
-
         graph = StateGraph(MessagesState)
-        graph.add_node("llm", call_model)
+        graph.add_node("llm", self.model_node())
         if self.tools:
-            graph.add_node("tools", ToolNode(self.tools))
+            graph.add_node("tools", self.tool_node(self.tools))
             graph.add_edge(START, "llm")
             graph.add_conditional_edges(
                                         "llm",
@@ -105,15 +142,79 @@ class VanillaAgent:
         graph.add_edge("llm", END)
         return graph.compile()
 
+    def model_node(self) -> RunnableLambda:
+        """The node calling this agent's LLM and appending its response."""
+
+        def prepare(state: MessagesState):
+            msgs = self.context_window.fit(
+                SystemMessage(content=self.instructions), state["messages"]
+            )
+            return self.openai_messages.convert(msgs)
+
+        def respond(response):
+            # Streamed responses carry their (aggregated) calls in ``tool_calls``.
+            airesponse = AIMessage(content=response.content, additional_kwargs=response.additional_kwargs, tool_calls=getattr(response, "tool_calls", None) or [], agent = self.config["displayName"])
+            # msg_to_append = AIMessage(response.content if response.content else str(response.additional_kwargs['tool_calls'][0]['function']))
+            # Only the new message: ``add_messages`` appends it to the state.
+            return {"messages": [airesponse]}
+
+        def call_model(state: MessagesState):
+            with step("llm", self.config["id"], agent=self.config["displayName"]) as timing:
+                response = self.llm.invoke(prepare(state))
+                timing.add_usage(response, self.config.get("pricing"))
+            return respond(response)
+
+        async def acall_model(state: MessagesState):
+            # Used by ``graph.ainvoke``: the worker is free while the LLM answers.
+            with step("llm", self.config["id"], agent=self.config["displayName"]) as timing:
+                response = await self.llm.ainvoke(prepare(state))
+                timing.add_usage(response, self.config.get("pricing"))
+            return respond(response)
+
+        return RunnableLambda(call_model, afunc=acall_model, name="llm")
+
+    def tool_node(self, tools: list[Any]) -> ToolNode:
+        """A node running ``tools``; calls of one response run concurrently, each with a deadline."""
+        return ToolNode(ToolCallPolicy(self.config.get("tool_timeouts")).apply(tools))
+
+    def flat_tools(self) -> list[Any]:
+        """This agent's tools with hand-offs that route within a flattened graph."""
+        return [
+            instrument_tool(
+                create_handoff_tool(agent_name=t.name[len(HANDOFF_PREFIX):], parent=False),
+                agent=self.config["displayName"],
+            )
+            if getattr(t, "name", "").startswith(HANDOFF_PREFIX)
+            else t
+            for t in self.tools
+        ]
+
     # invocation ---------------------------------------------------------
     def invoke(self, inputs: dict[str, Any] | str) -> Any:
         if isinstance(inputs, dict):
             input_text = inputs.get("input", "")
+            session_id = inputs.get("session_id", DEFAULT_SESSION_ID)
+        else:
+            input_text = inputs
+            session_id = DEFAULT_SESSION_ID
+        with get_memory_store().session(session_id) as session:
+            messages = [*session.messages, HumanMessage(content=input_text)]
+            result = self.graph.invoke({"messages": messages})
+            session.update(result.get("messages", messages))
+        return result
+
+    async def ainvoke(self, inputs: dict[str, Any] | str) -> Any:
+        """Async variant of :meth:`invoke` built on ``graph.ainvoke``."""
+        if isinstance(inputs, dict):
+            input_text = inputs.get("input", "")
+            session_id = inputs.get("session_id", DEFAULT_SESSION_ID)
         else:
             input_text = inputs
-        messages = [*VanillaAgent.MEMORY, HumanMessage(content=input_text)]
-        result = self.graph.invoke({"messages": messages})
-        VanillaAgent.MEMORY = result.get("messages", messages)
+            session_id = DEFAULT_SESSION_ID
+        async with get_memory_store().asession(session_id) as session:
+            messages = [*session.messages, HumanMessage(content=input_text)]
+            result = await self.graph.ainvoke({"messages": messages})
+            session.update(result.get("messages", messages))
         return result
 
     # helpers ------------------------------------------------------------
@@ -132,7 +233,9 @@ class VanillaAgent:
         return loaded
 
     @staticmethod
+    @functools.cache
     def _resolve_tool(name: str):
+        """Find the tool ``name`` in the ``middleware`` modules (scanned once per name)."""
         import middleware
 
         for _, module_name, _ in pkgutil.iter_modules(middleware.__path__):
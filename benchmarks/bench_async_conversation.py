@@ -0,0 +1,162 @@
+"""Throughput of one worker with the sync and the async conversation route.
+
+Every request is a manual question that the router sends to the manuals
+agent: a model call requesting ``manuals_tool``, a blob download from
+:class:`FakeBlobServer` and a second model call. The fake model sleeps for
+``--llm-latency`` seconds per call (``time.sleep`` in ``invoke``,
+``asyncio.sleep`` in ``ainvoke``). ``sync`` runs ``conversation_run`` on
+``--threads`` worker threads, the way the Functions host runs sync handlers;
+``async`` runs ``conversation_run_async`` on one event loop.
+
+Usage::
+
+    python -m benchmarks.bench_async_conversation --requests 64 --concurrency 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import azure.functions as func
+from langchain_core.messages import AIMessage
+
+from benchmarks.fake_blob_server import FakeBlobServer
+
+MANUAL = Path(__file__).resolve().parent.parent / "tests" / "data" / "machine001.md"
+CONTAINER = "manuals-md"
+
+
+class FakeChatModel:
+    """Tool-calling stand-in for ``AzureChatOpenAI`` with a fixed latency."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def bind_tools(self, tools):
+        return self
+
+    def _respond(self, messages) -> AIMessage:
+        if messages and messages[-1].get("role") == "tool":
+            return AIMessage(content="Hold RESET for five seconds.")
+        call = {
+            "id": f"call_{uuid.uuid4().hex[:8]}",
+            "type": "function",
+            "function": {"name": "manuals_tool", "arguments": json.dumps({"machine_name": "machine001"})},
+        }
+        return AIMessage(content="", additional_kwargs={"tool_calls": [call]})
+
+    def invoke(self, messages) -> AIMessage:
+        time.sleep(self.latency)
+        return self._respond(messages)
+
+    async def ainvoke(self, messages) -> AIMessage:
+        await asyncio.sleep(self.latency)
+        return self._respond(messages)
+
+
+def _request(i: int) -> func.HttpRequest:
+    body = {"input": f"What does the manual of machine001 say about reset, case {i}?"}
+    return func.HttpRequest(
+        method="POST",
+        url="/api/conversationRun",
+        headers={"Content-Type": "application/json"},
+        params={},
+        route_params={},
+        body=json.dumps(body).encode(),
+    )
+
+
+def _timed_sync(handler, req) -> float:
+    start = time.perf_counter()
+    resp = handler(req)
+    assert resp.status_code == 200, resp.get_body()
+    return time.perf_counter() - start
+
+
+async def _timed_async(handler, req, limit: asyncio.Semaphore) -> float:
+    async with limit:
+        start = time.perf_counter()
+        resp = await handler(req)
+        assert resp.status_code == 200, resp.get_body()
+        return time.perf_counter() - start
+
+
+def _run_sync(http_conversation, requests: int, threads: int) -> tuple[float, list[float]]:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        samples = list(
+            pool.map(lambda i: _timed_sync(http_conversation.conversation_run, _request(i)), range(requests))
+        )
+    return time.perf_counter() - start, samples
+
+
+def _run_async(http_conversation, requests: int, concurrency: int) -> tuple[float, list[float]]:
+    from middleware.manuals_tools import ASYNC_CONTAINER_POOL
+
+    async def main() -> list[float]:
+        limit = asyncio.Semaphore(concurrency)
+        try:
+            return await asyncio.gather(
+                *(
+                    _timed_async(http_conversation.conversation_run_async, _request(i), limit)
+                    for i in range(requests)
+                )
+            )
+        finally:
+            await ASYNC_CONTAINER_POOL.aclose()
+
+    start = time.perf_counter()
+    samples = asyncio.run(main())
+    return time.perf_counter() - start, samples
+
+
+def _report(label: str, wall: float, samples: list[float]) -> None:
+    ordered = sorted(samples)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"{label:<6} {len(samples) / wall:7.1f} req/s  wall={wall:6.2f}s "
+        f"p50={statistics.median(samples) * 1000:7.1f}ms p95={p95 * 1000:7.1f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--blob-latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with FakeBlobServer(request_latency=args.blob_latency) as server:
+        server.put_blob(CONTAINER, "machine001.md", MANUAL.read_bytes())
+        os.environ.update(
+            {
+                "MANUALS_MD_CONNECTION_STRING": server.connection_string,
+                "MANUALS_MD_CACHE_TTL": "0",
+                "MANUALS_MIRROR": "0",
+                "RESPONSE_CACHE_TTL": "0",
+            }
+        )
+        import agents.vanilla_agent as vanilla_agent
+        from agents.registry import get_agent_registry
+        from functions import http_conversation
+
+        vanilla_agent.AzureChatOpenAI = lambda **_: FakeChatModel(args.llm_latency)
+        get_agent_registry().clear()
+        http_conversation._graph = None
+
+        _report("sync", *_run_sync(http_conversation, args.requests, args.threads))
+        _report("async", *_run_async(http_conversation, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Per-call latency of manual lookups with and without the container pool.
+
+``before`` reproduces the previous behaviour of building a
+``BlobServiceClient`` from the connection string on every fetch; ``after``
+goes through :class:`middleware.manuals_tools.ManualsTool`, which reuses the
+pooled container client (with a zero cache TTL, so every call still goes to
+the server); ``cached`` additionally lets the manual cache serve fresh hits.
+All run against :class:`FakeBlobServer`, whose ``--connect-latency`` models
+the TCP/TLS handshake of a real endpoint.
+
+Usage::
+
+    python -m benchmarks.bench_container_pool --calls 200 --connect-latency 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+from pathlib import Path
+
+from azure.storage.blob import BlobServiceClient
+
+from benchmarks.fake_blob_server import FakeBlobServer
+from middleware.manual_cache import clear_manual_caches
+from middleware.manuals_tools import CONTAINER_POOL, ManualsTool
+
+MANUAL = Path(__file__).resolve().parent.parent / "tests" / "data" / "machine001.md"
+CONTAINER = "manuals-md"
+
+
+def _fetch_unpooled(connection_string: str, machine_name: str) -> str:
+    service_client = BlobServiceClient.from_connection_string(connection_string)
+    container_client = service_client.get_container_client(CONTAINER)
+    blob_client = container_client.get_blob_client(f"{machine_name}.md")
+    if blob_client.exists():
+        return blob_client.download_blob().readall().decode("utf-8")
+    return ""
+
+
+def _fetch_pooled(connection_string: str, machine_name: str) -> str:
+    tool = ManualsTool(
+        connection_string=connection_string,
+        container_name=CONTAINER,
+        fallback_path="/__does_not_exist__",
+    )
+    return tool.run(machine_name=machine_name)
+
+
+def _measure(fn, connection_string: str, calls: int) -> list[float]:
+    fn(connection_string, "machine001")  # warm-up, excluded from samples
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn(connection_string, "machine001")
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(label: str, samples: list[float], server: FakeBlobServer) -> None:
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(
+        f"{label:<7} mean={statistics.mean(samples):7.2f}ms "
+        f"p50={statistics.median(samples):7.2f}ms p95={p95:7.2f}ms "
+        f"connections={server.connections}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--connect-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    runs = (
+        ("before", _fetch_unpooled, "0"),
+        ("after", _fetch_pooled, "0"),
+        ("cached", _fetch_pooled, "300"),
+    )
+    # Every run measures blob round trips, not the shared manual mirror.
+    os.environ["MANUALS_MIRROR"] = "0"
+    for label, fn, ttl in runs:
+        os.environ["MANUALS_MD_CACHE_TTL"] = ttl
+        clear_manual_caches()
+        CONTAINER_POOL.clear()
+        with FakeBlobServer(connect_latency=args.connect_latency) as server:
+            server.put_blob(CONTAINER, "machine001.md", MANUAL.read_bytes())
+            samples = _measure(fn, server.connection_string, args.calls)
+            _report(label, samples, server)
+        CONTAINER_POOL.clear()
+
+
+if __name__ == "__main__":
+    main()
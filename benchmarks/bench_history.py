@@ -0,0 +1,77 @@
+"""Per-turn overhead of the orchestration layer against history length.
+
+Runs one turn of the real graph (scripted model, local blob stand-in, as in
+:mod:`benchmarks.bench_orchestration`) on top of histories of 10, 100 and
+1000 messages, the way a session resumes: earlier messages are the objects
+kept from previous turns. A layer that copies or re-converts the whole
+history at every step shows up as a per-turn cost growing with the history;
+the ``per_msg_us`` column divides the growth over the shortest history by
+the extra messages.
+
+Usage::
+
+    python -m benchmarks.bench_history
+    python -m benchmarks.bench_history --lengths 10 100 1000 --turns 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.bench_orchestration import CONTAINER, FLOWS, MANUAL, history, percentile
+from benchmarks.fake_blob_server import FakeBlobServer
+from benchmarks.fake_llm import ScriptedChatModel
+
+
+def measure(graph, question: str, length: int, turns: int, answer_tokens: int) -> float:
+    """Median seconds of a turn resumed on ``length`` earlier messages."""
+    prior = history(length // 2, answer_tokens)
+    inputs = {"messages": [*prior, HumanMessage(content=question)]}
+    graph.invoke(inputs)  # assigns message ids and warms the caches
+    samples = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        graph.invoke(inputs)
+        samples.append(time.perf_counter() - start)
+    return percentile(samples, 50)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--flow", choices=sorted(FLOWS), default="manual")
+    parser.add_argument("--route", choices=("dispatcher", "router"), default="dispatcher")
+    parser.add_argument("--graph", choices=("nested", "flat"), default="nested")
+    parser.add_argument("--answer-tokens", type=int, default=20)
+    args = parser.parse_args()
+
+    import agents.vanilla_agent as vanilla_agent
+    from agents import build_graph
+    from agents.registry import get_agent_registry
+
+    vanilla_agent.AzureChatOpenAI = lambda **_: ScriptedChatModel(answer_tokens=args.answer_tokens)
+    get_agent_registry().clear()
+    with FakeBlobServer() as server:
+        server.put_blob(CONTAINER, "machine001.md", MANUAL.read_bytes())
+        os.environ["MANUALS_MD_CONNECTION_STRING"] = server.connection_string
+        os.environ.setdefault("MANUALS_MD_DISK_CACHE", "0")
+        # Keep the shared mirror under the system temp dir out of the runs.
+        os.environ["MANUALS_MIRROR"] = "0"
+        graph = build_graph(fast_route=args.route == "router", flatten=args.graph == "flat")
+        base = None
+        for length in sorted(args.lengths):
+            p50 = measure(graph, FLOWS[args.flow], length, args.turns, args.answer_tokens)
+            growth = "" if base is None else f" per_msg_us={(p50 - base[1]) / (length - base[0]) * 1e6:7.2f}"
+            print(f"{args.flow}/{args.route}/{args.graph}/history={length:<5} p50={p50 * 1000:8.2f}ms{growth}", flush=True)
+            base = base or (length, p50)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""Cost of the orchestration layer per conversation turn.
+
+Runs the real ``build_graph()`` graph with :class:`ScriptedChatModel` in
+place of ``AzureChatOpenAI`` and :class:`FakeBlobServer` as the manuals
+container, so only our own code, LangGraph and the blob client are measured.
+Each scenario is a flow (``manual`` or ``maintenance``), a routing mode
+(``dispatcher``: every turn goes through the dispatcher LLM; ``router``:
+the local router may skip it), a graph shape (``nested`` agent subgraphs or
+the ``flat`` single-level graph, reported as ``<route>/flat``) and a number
+of earlier turns in the history.
+
+For every scenario it reports p50/p95/p99 latency and throughput over
+``--turns`` sequential turns, the peak memory allocated per turn
+(tracemalloc, measured in a separate pass), the LLM calls per turn and the
+orchestration overhead per LLM or tool step (p50 minus the time spent in
+those steps, divided by their number). Results can be stored as a JSON
+baseline and compared against it; ``--compare`` exits with status 1 when a
+scenario's p95 regresses by more than ``--tolerance`` or its LLM calls per
+turn change.
+
+Usage::
+
+    python -m benchmarks.bench_orchestration
+    python -m benchmarks.bench_orchestration --save-baseline
+    python -m benchmarks.bench_orchestration --compare --tolerance 0.3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from benchmarks.fake_blob_server import FakeBlobServer
+from benchmarks.fake_llm import ScriptedChatModel, answer_text
+from middleware.telemetry import track_timings
+
+ROOT = Path(__file__).resolve().parent.parent
+MANUAL = ROOT / "tests" / "data" / "machine001.md"
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+CONTAINER = "manuals-md"
+
+FLOWS = {
+    "manual": "What does the manual of machine001 say about the reset procedure?",
+    "maintenance": "Machine001 is overdue for service, what should I check first?",
+}
+ROUTES = ("dispatcher", "router")
+GRAPHS = ("nested", "flat")
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``."""
+    ordered = sorted(samples)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+def history(turns: int, answer_tokens: int) -> list:
+    """Synthetic earlier turns of the conversation."""
+    messages: list = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"Earlier question {i} about machine001 settings?"))
+        messages.append(AIMessage(content=answer_text(answer_tokens)))
+    return messages
+
+
+def run_scenario(graph, question: str, prior: list, turns: int, warmup: int, memory_turns: int) -> dict[str, Any]:
+    inputs = {"messages": [*prior, HumanMessage(content=question)]}
+    for _ in range(warmup):
+        graph.invoke(inputs)
+
+    samples = []
+    wall_start = time.perf_counter()
+    for _ in range(turns):
+        start = time.perf_counter()
+        result = graph.invoke(inputs)
+        samples.append(time.perf_counter() - start)
+    wall = time.perf_counter() - wall_start
+    assert isinstance(result["messages"][-1], AIMessage) and result["messages"][-1].content
+
+    with track_timings() as timings:
+        graph.invoke(inputs)
+    totals = timings.summary()["totals"]
+    steps = sum(totals.get(kind, {}).get("count", 0) for kind in ("llm", "tool"))
+    step_ms = sum(totals.get(kind, {}).get("duration_ms", 0.0) for kind in ("llm", "tool"))
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(memory_turns):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            graph.invoke(inputs)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "turns_per_s": round(turns / wall, 2),
+        "peak_kib_per_turn": round(percentile(peaks, 50) / 1024, 1) if peaks else None,
+        "llm_calls": totals.get("llm", {}).get("count", 0),
+        "overhead_ms_per_step": round((percentile(samples, 50) * 1000 - step_ms) / max(steps, 1), 3),
+    }
+
+
+def run_suite(args: argparse.Namespace) -> dict[str, Any]:
+    import agents.vanilla_agent as vanilla_agent
+    from agents import build_graph
+    from agents.registry import get_agent_registry
+
+    vanilla_agent.AzureChatOpenAI = lambda **_: ScriptedChatModel(
+        latency=args.llm_latency, answer_tokens=args.answer_tokens
+    )
+    # Agents built with another chat model must not be reused.
+    get_agent_registry().clear()
+    results: dict[str, Any] = {}
+    graphs = {
+        (route, shape): build_graph(fast_route=(route == "router"), flatten=(shape == "flat"))
+        for route in args.routes
+        for shape in args.graphs
+    }
+    for flow in args.flows:
+        for route, shape in graphs:
+            for length in args.history:
+                # Nested scenarios keep their names so older baselines still compare.
+                name = f"{flow}/{route}{'/flat' if shape == 'flat' else ''}/history={length}"
+                results[name] = run_scenario(
+                    graphs[route, shape],
+                    FLOWS[flow],
+                    history(length, args.answer_tokens),
+                    args.turns,
+                    args.warmup,
+                    args.memory_turns,
+                )
+                print(_format_row(name, results[name]), flush=True)
+    return results
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """Return a message per scenario that regressed against ``baseline``.
+
+    A scenario regresses when its p95 exceeds the baseline's by more than
+    ``tolerance`` or when its LLM calls per turn differ from the baseline's.
+    """
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        limit = before["p95_ms"] * (1 + tolerance)
+        if current["p95_ms"] > limit:
+            regressions.append(
+                f"{name}: p95 {current['p95_ms']:.2f}ms > {limit:.2f}ms "
+                f"(baseline {before['p95_ms']:.2f}ms + {tolerance:.0%})"
+            )
+        if "llm_calls" in before and current.get("llm_calls") != before["llm_calls"]:
+            regressions.append(
+                f"{name}: {current.get('llm_calls')} LLM calls per turn (baseline {before['llm_calls']})"
+            )
+    return regressions
+
+
+def _format_row(name: str, row: dict[str, Any]) -> str:
+    return (
+        f"{name:<41} p50={row['p50_ms']:8.2f}ms p95={row['p95_ms']:8.2f}ms "
+        f"p99={row['p99_ms']:8.2f}ms {row['turns_per_s']:8.1f} turns/s "
+        f"peak={row['peak_kib_per_turn']}KiB llm_calls={row['llm_calls']} "
+        f"overhead/step={row['overhead_ms_per_step']:.2f}ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--memory-turns", type=int, default=5)
+    parser.add_argument("--history", type=int, nargs="+", default=[0, 8, 32])
+    parser.add_argument("--flows", nargs="+", choices=sorted(FLOWS), default=sorted(FLOWS))
+    parser.add_argument("--routes", nargs="+", choices=ROUTES, default=list(ROUTES))
+    parser.add_argument("--graphs", nargs="+", choices=GRAPHS, default=list(GRAPHS))
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--answer-tokens", type=int, default=40)
+    parser.add_argument("--blob-latency", type=float, default=0.0)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    args = parser.parse_args()
+
+    with FakeBlobServer(request_latency=args.blob_latency) as server:
+        server.put_blob(CONTAINER, "machine001.md", MANUAL.read_bytes())
+        os.environ["MANUALS_MD_CONNECTION_STRING"] = server.connection_string
+        os.environ.setdefault("MANUALS_MD_DISK_CACHE", "0")
+        # Time blob reads, not the shared mirror under the system temp dir.
+        os.environ["MANUALS_MIRROR"] = "0"
+        results = run_suite(args)
+
+    config = {
+        key: getattr(args, key)
+        for key in ("turns", "llm_latency", "answer_tokens", "blob_latency", "memory_turns")
+    }
+    if args.save_baseline:
+        args.baseline.write_text(
+            json.dumps({"config": config, "results": results}, indent=2) + "\n", encoding="utf-8"
+        )
+        print(f"Baseline written to {args.baseline}")
+    if args.compare:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("config") != config:
+            print(f"Warning: baseline config {baseline.get('config')} differs from {config}")
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Cold-start cost of the Function App: indexing imports and first request.
+
+Each sample runs in a fresh interpreter, which imports ``function_app`` the
+way the host does when it indexes the app, then sends ``conversationRun``
+requests answered by :class:`ScriptedChatModel`. Two modes are compared:
+
+``cold``
+    The first request imports the agent stack and builds the graph.
+``warm``
+    :func:`functions.http_conversation.warm_up` has run first, as the warm-up
+    trigger or ``CONVERSATION_WARMUP=1`` would do after host start.
+
+Usage::
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("langchain_core", "langchain_openai", "langgraph", "agents.vanilla_agent")
+QUESTION = "Open the manual of machine001"
+
+
+def child(mode: str) -> dict:
+    started = time.perf_counter()
+    import function_app  # noqa: F401 - what the host does when indexing
+
+    index_ms = (time.perf_counter() - started) * 1000
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    import azure.functions as func
+
+    from functions import http_conversation
+
+    def request() -> float:
+        req = func.HttpRequest(
+            method="POST",
+            url="/api/conversationRun",
+            headers={"Content-Type": "application/json"},
+            params={},
+            route_params={},
+            body=json.dumps({"input": QUESTION}).encode(),
+        )
+        started = time.perf_counter()
+        resp = http_conversation.conversation_run(req)
+        assert resp.status_code == 200, resp.get_body()
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    import agents.vanilla_agent as vanilla_agent
+    from agents.registry import get_agent_registry
+    from benchmarks.fake_llm import ScriptedChatModel
+
+    vanilla_agent.AzureChatOpenAI = lambda **_: ScriptedChatModel()
+    get_agent_registry().clear()
+    stack_ms = (time.perf_counter() - started) * 1000
+    warm_up_ms = 0.0
+    if mode == "warm":
+        started = time.perf_counter()
+        http_conversation.warm_up()
+        warm_up_ms = (time.perf_counter() - started) * 1000
+    first_ms = request()
+    return {
+        "index_ms": index_ms,
+        "loaded_at_index": loaded,
+        # In cold mode the stack import is part of what the first request pays.
+        "first_request_ms": first_ms + (stack_ms if mode == "cold" else 0.0),
+        "warm_up_ms": warm_up_ms,
+        "next_request_ms": request(),
+    }
+
+
+def sample(mode: str) -> dict:
+    env = {
+        **os.environ,
+        "MANUALS_MD_PATH": str(ROOT / "tests" / "data"),
+        "RESPONSE_CACHE_TTL": "0",
+        "CONVERSATION_WARMUP": "0",
+    }
+    env.pop("MANUALS_MD_CONNECTION_STRING", None)
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", mode],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", choices=("cold", "warm"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(child(args.child)))
+        return 0
+
+    for mode in ("cold", "warm"):
+        runs = [sample(mode) for _ in range(args.runs)]
+        medians = {
+            key: statistics.median(run[key] for run in runs)
+            for key in ("index_ms", "warm_up_ms", "first_request_ms", "next_request_ms")
+        }
+        print(
+            f"{mode:<5} index={medians['index_ms']:7.1f}ms warm_up={medians['warm_up_ms']:7.1f}ms "
+            f"first_request={medians['first_request_ms']:7.1f}ms next_request={medians['next_request_ms']:6.1f}ms "
+            f"loaded_at_index={runs[0]['loaded_at_index'] or 'none'}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""Minimal Azurite-style stand-in for the Azure Blob REST API.
+
+Serves the subset of the Blob service used by :mod:`middleware.manuals_tools`
+(container listing, blob properties and ranged/conditional downloads) from an
+in-memory ``{container: {blob: bytes}}`` mapping, so the real
+``azure-storage-blob`` SDK can be benchmarked without network access.
+Authentication headers are accepted but never verified.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+from xml.sax.saxutils import escape
+
+ACCOUNT_NAME = "devstoreaccount1"
+API_VERSION = "2025-01-05"
+# Well-known Azurite development key; the server ignores signatures anyway.
+ACCOUNT_KEY = (
+    "Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw=="
+)
+
+
+class _Blob:
+    __slots__ = ("data", "etag", "last_modified", "content_md5")
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        digest = hashlib.md5(data)
+        self.etag = '"0x%s"' % digest.hexdigest()[:16].upper()
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        self.content_md5 = base64.b64encode(digest.digest()).decode("ascii")
+
+
+class FakeBlobServer:
+    """Threaded HTTP server emulating a single storage account.
+
+    ``connect_latency`` is slept once per accepted TCP connection to model the
+    TCP/TLS handshake cost of a real endpoint, and ``request_latency`` once per
+    request to model service-side processing.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        connect_latency: float = 0.0,
+        request_latency: float = 0.0,
+    ) -> None:
+        self.containers: dict[str, dict[str, _Blob]] = {}
+        self.connect_latency = connect_latency
+        self.request_latency = request_latency
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    # data -----------------------------------------------------------------
+    def put_blob(self, container: str, name: str, data: bytes | str) -> None:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self._lock:
+            self.containers.setdefault(container, {})[name] = _Blob(data)
+
+    def delete_blob(self, container: str, name: str) -> None:
+        with self._lock:
+            self.containers.get(container, {}).pop(name, None)
+
+    def get_blob(self, container: str, name: str) -> _Blob | None:
+        with self._lock:
+            return self.containers.get(container, {}).get(name)
+
+    def list_blobs(self, container: str) -> list[tuple[str, _Blob]] | None:
+        with self._lock:
+            blobs = self.containers.get(container)
+            return None if blobs is None else sorted(blobs.items())
+
+    # lifecycle ------------------------------------------------------------
+    @property
+    def endpoint(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/{ACCOUNT_NAME}"
+
+    @property
+    def connection_string(self) -> str:
+        return (
+            "DefaultEndpointsProtocol=http;"
+            f"AccountName={ACCOUNT_NAME};AccountKey={ACCOUNT_KEY};"
+            f"BlobEndpoint={self.endpoint};"
+        )
+
+    def start(self) -> "FakeBlobServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeBlobServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def _make_handler(server: FakeBlobServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self) -> None:  # noqa: D401 - called once per TCP connection
+            super().setup()
+            with server._lock:
+                server.connections += 1
+            if server.connect_latency:
+                time.sleep(server.connect_latency)
+
+        def log_message(self, *args) -> None:  # silence stderr noise
+            return
+
+        # helpers ----------------------------------------------------------
+        def _route(self) -> tuple[str | None, str | None, dict[str, list[str]]]:
+            with server._lock:
+                server.requests += 1
+            if server.request_latency:
+                time.sleep(server.request_latency)
+            parsed = urlparse(self.path)
+            parts = [unquote(p) for p in parsed.path.split("/") if p]
+            if parts and parts[0] == ACCOUNT_NAME:
+                parts = parts[1:]
+            container = parts[0] if parts else None
+            blob = "/".join(parts[1:]) or None
+            return container, blob, parse_qs(parsed.query)
+
+        def _send(
+            self, status: int, body: bytes = b"", headers: dict | None = None, length: int | None = None
+        ) -> None:
+            # The service headers every response carries; without them the
+            # SDK's response handlers log warnings.
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("x-ms-request-id", str(uuid.uuid4()))
+            self.send_header("x-ms-version", API_VERSION)
+            client_request_id = self.headers.get("x-ms-client-request-id")
+            if client_request_id:
+                self.send_header("x-ms-client-request-id", client_request_id)
+            self.send_header("Content-Length", str(len(body) if length is None else length))
+            self.end_headers()
+            if body and self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _send_not_modified(self, blob: _Blob) -> None:
+            self._send(
+                304,
+                headers={
+                    "ETag": blob.etag,
+                    "Last-Modified": blob.last_modified,
+                    "x-ms-error-code": "ConditionNotMet",
+                },
+            )
+
+        def _not_found(self, code: str) -> None:
+            body = (
+                f'<?xml version="1.0" encoding="utf-8"?><Error><Code>{code}</Code>'
+                "<Message>The specified resource does not exist.</Message></Error>"
+            ).encode()
+            self._send(404, body, {"x-ms-error-code": code, "Content-Type": "application/xml"})
+
+        def _blob_headers(self, blob: _Blob) -> dict[str, str]:
+            return {
+                "ETag": blob.etag,
+                "Last-Modified": blob.last_modified,
+                "Content-Type": "text/markdown",
+                "Content-MD5": blob.content_md5,
+                "Accept-Ranges": "bytes",
+                "x-ms-blob-type": "BlockBlob",
+                "x-ms-creation-time": blob.last_modified,
+                "x-ms-lease-state": "available",
+                "x-ms-lease-status": "unlocked",
+                "x-ms-server-encrypted": "true",
+            }
+
+        def _not_modified(self, blob: _Blob) -> bool:
+            if_none_match = self.headers.get("If-None-Match")
+            return bool(if_none_match) and if_none_match in (blob.etag, "*")
+
+        # verbs ------------------------------------------------------------
+        def do_HEAD(self) -> None:  # noqa: N802
+            container, name, _ = self._route()
+            blob = server.get_blob(container or "", name or "")
+            if blob is None:
+                self._not_found("BlobNotFound")
+                return
+            if self._not_modified(blob):
+                self._send_not_modified(blob)
+                return
+            self._send(200, headers=self._blob_headers(blob), length=len(blob.data))
+
+        def do_GET(self) -> None:  # noqa: N802
+            container, name, query = self._route()
+            if name is None and query.get("comp") == ["list"]:
+                self._list(container or "", query)
+                return
+            blob = server.get_blob(container or "", name or "")
+            if blob is None:
+                self._not_found("BlobNotFound")
+                return
+            if self._not_modified(blob):
+                self._send_not_modified(blob)
+                return
+            headers = self._blob_headers(blob)
+            data = blob.data
+            byte_range = self.headers.get("x-ms-range") or self.headers.get("Range")
+            if byte_range and byte_range.startswith("bytes=") and data:
+                start_s, _, end_s = byte_range[6:].partition("-")
+                start = int(start_s)
+                end = min(int(end_s) if end_s else len(data) - 1, len(data) - 1)
+                headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+                # The MD5 of a range is only sent when asked for.
+                del headers["Content-MD5"]
+                self._send(206, data[start : end + 1], headers)
+                return
+            self._send(200, data, headers)
+
+        def _list(self, container: str, query: dict[str, list[str]]) -> None:
+            blobs = server.list_blobs(container)
+            if blobs is None:
+                self._not_found("ContainerNotFound")
+                return
+            prefix = (query.get("prefix") or [""])[0]
+            items = "".join(
+                "<Blob><Name>{}</Name><Properties>"
+                "<Last-Modified>{}</Last-Modified><Etag>{}</Etag>"
+                "<Content-Length>{}</Content-Length>"
+                "<Content-Type>text/markdown</Content-Type>"
+                "<BlobType>BlockBlob</BlobType></Properties></Blob>".format(
+                    escape(name), blob.last_modified, blob.etag, len(blob.data)
+                )
+                for name, blob in blobs
+                if name.startswith(prefix)
+            )
+            body = (
+                '<?xml version="1.0" encoding="utf-8"?>'
+                f'<EnumerationResults ServiceEndpoint="{server.endpoint}/" '
+                f'ContainerName="{escape(container)}"><Prefix>{escape(prefix)}</Prefix>'
+                f"<Blobs>{items}</Blobs><NextMarker /></EnumerationResults>"
+            ).encode()
+            self._send(200, body, {"Content-Type": "application/xml"})
+
+    return Handler
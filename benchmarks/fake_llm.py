@@ -0,0 +1,108 @@
+"""Deterministic stand-in for ``AzureChatOpenAI`` used by the benchmarks.
+
+:class:`ScriptedChatModel` plays every agent of the graph. It infers its role
+from the tools it is bound to and answers like the real agents would:
+
+* with ``transfer_to_*`` tools (dispatcher) it hands off to the manuals
+  agent when the question mentions a manual and to the maintenance agent
+  otherwise, then relays the specialist's answer;
+* with ``manuals_tool`` it first requests the manual, then answers;
+* without tools it answers directly.
+
+Each call sleeps ``latency`` seconds (``asyncio.sleep`` on the async path),
+answers with ``answer_tokens`` words and reports token usage like the Azure
+client does (prompt tokens estimated at four characters per token).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+import uuid
+from typing import Any, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+_WORDS = (
+    "check the oil level then hold the reset button for five seconds "
+    "and confirm the status light turns green before restarting".split()
+)
+TOOL_CALL_PREFIX = "call_tool_"
+HANDOFF_CALL_PREFIX = "call_handoff_"
+
+
+def answer_text(tokens: int) -> str:
+    return " ".join(itertools.islice(itertools.cycle(_WORDS), tokens))
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Role-aware fake chat model with configurable latency and output size."""
+
+    latency: float = 0.0
+    answer_tokens: int = 40
+    machine: str = "machine001"
+    tool_names: tuple[str, ...] = ()
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools, **kwargs: Any) -> "ScriptedChatModel":
+        names = tuple(getattr(tool, "name", getattr(tool, "__name__", "")) for tool in tools)
+        return self.model_copy(update={"tool_names": names})
+
+    # generation -----------------------------------------------------------
+    def _generate(
+        self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._with_usage(messages))])
+
+    async def _agenerate(
+        self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._with_usage(messages))])
+
+    def _with_usage(self, messages: list[BaseMessage]) -> AIMessage:
+        message = self.respond(messages)
+        prompt = sum(len(str(m.content)) for m in messages) // 4
+        completion = len(str(message.content).split()) + 10 * len(message.tool_calls)
+        message.usage_metadata = {
+            "input_tokens": prompt,
+            "output_tokens": completion,
+            "total_tokens": prompt + completion,
+        }
+        return message
+
+    def respond(self, messages: list[BaseMessage]) -> AIMessage:
+        question, turn = "", []
+        for position in range(len(messages) - 1, -1, -1):
+            if isinstance(messages[position], HumanMessage):
+                question, turn = str(messages[position].content), messages[position + 1 :]
+                break
+
+        handoffs = [name for name in self.tool_names if name.startswith("transfer_to_")]
+        if handoffs:
+            if any(isinstance(m, AIMessage) and m.content for m in turn):
+                return AIMessage(content=f"Here is what I found: {answer_text(self.answer_tokens)}")
+            target = "transfer_to_manual_agent" if "manual" in question.lower() else "transfer_to_maintenance_agent"
+            return self._tool_call(target if target in handoffs else handoffs[0], {})
+
+        used_tool = any(
+            isinstance(m, ToolMessage) and m.tool_call_id.startswith(TOOL_CALL_PREFIX) for m in turn
+        )
+        if "manuals_tool" in self.tool_names and not used_tool:
+            return self._tool_call("manuals_tool", {"machine_name": self.machine})
+        return AIMessage(content=answer_text(self.answer_tokens))
+
+    @staticmethod
+    def _tool_call(name: str, args: dict) -> AIMessage:
+        prefix = HANDOFF_CALL_PREFIX if name.startswith("transfer_to_") else TOOL_CALL_PREFIX
+        call_id = f"{prefix}{uuid.uuid4().hex[:12]}"
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": call_id}])
@@ -1,5 +1,15 @@
+import os
+
 import azure.functions as func
 
+try:  # optional: export telemetry spans and metrics to Application Insights
+    from azure.monitor.opentelemetry import configure_azure_monitor
+except ImportError:  # pragma: no cover - depends on the deployment
+    configure_azure_monitor = None
+
+if configure_azure_monitor is not None and os.environ.get("APPLICATIONINSIGHTS_CONNECTION_STRING"):
+    configure_azure_monitor()
+
 # Global Function App for the Python v2 programming model
 app = func.FunctionApp()
 
@@ -9,3 +19,4 @@ from functions import http_conversation  # noqa: F401
 from functions import timer_cleanup  # noqa: F401
 from functions import queue_worker  # noqa: F401
 from functions import cosmos_listener  # noqa: F401
+from functions import warmup  # noqa: F401
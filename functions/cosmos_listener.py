@@ -1,11 +1,23 @@
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
 import azure.functions as func
 from function_app import app
 
+DEFAULT_WORKERS = 8
+
+# Per-machine reactions to a change; later subscribers are appended with
+# :func:`on_machine_change`.
+_HANDLERS: list[Callable[[str], None]] = []
+
 
 # Listens to inserts/updates in a Cosmos DB container.
 # Ensure a 'leases' container exists (or set a different lease container name).
+# The lease only advances when the function returns, so a failed batch is
+# delivered again (see the retry policy) until the caches reflect it.
+@app.retry(strategy="exponential_backoff", max_retry_count="5", minimum_interval="00:00:02", maximum_interval="00:01:00")
 @app.cosmos_db_trigger(
     arg_name="documents",
     connection="CosmosDbConnection",
@@ -16,5 +28,95 @@ from function_app import app
 def cosmos_listener(documents: func.DocumentList) -> None:
     if documents:
         logging.info("Cosmos DB change feed batch size: %d", len(documents))
-        for doc in documents:
-            logging.info("Doc id=%s", doc.get("id"))
+        stats = apply_changes(documents)
+        logging.info("Cosmos DB change feed applied: %s", stats)
+
+
+def on_machine_change(handler: Callable[[str], None]) -> Callable[[str], None]:
+    """Register ``handler(machine)`` to run for every changed machine."""
+    _HANDLERS.append(handler)
+    return handler
+
+
+def machine_of(doc) -> Optional[str]:
+    """Machine a manual-metadata or machine document refers to, if any."""
+    for field in ("machine", "machine_name", "manual"):
+        value = doc.get(field)
+        if isinstance(value, str) and value:
+            return value[: -len(".md")] if value.endswith(".md") else value
+    return None
+
+
+def apply_changes(documents: Iterable) -> dict:
+    """Update derived state for a change feed batch.
+
+    Changed machines are handled in parallel; the manual search index and
+    the spec store are then rebuilt for them in one incremental pass each. The first failure is
+    re-raised once every machine has been handled, so the batch is retried.
+    """
+    machines = sorted({machine for machine in map(machine_of, documents) if machine})
+    if not machines:
+        return {"machines": 0}
+    workers = min(len(machines), int(os.environ.get("COSMOS_LISTENER_WORKERS", DEFAULT_WORKERS)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        errors = [error for error in pool.map(_apply_machine, machines) if error is not None]
+    if errors:
+        raise errors[0]
+
+    from middleware.manual_search import manual_index_exists, refresh_manual_index
+    from middleware.manual_specs import refresh_spec_store, spec_store_exists
+
+    # Only a worker that already serves searches pays for the re-index.
+    reindexed = manual_index_exists()
+    if reindexed:
+        refresh_manual_index(force=True, stale=machines)
+    respecced = spec_store_exists()
+    if respecced:
+        refresh_spec_store(force=True, stale=machines)
+    return {"machines": len(machines), "reindexed": reindexed, "specs": respecced}
+
+
+def _apply_machine(machine: str) -> Optional[Exception]:
+    for handler in _HANDLERS:
+        try:
+            handler(machine)
+        except Exception as exc:  # reported after the rest of the batch
+            logging.exception("Change handler %s failed for %s", handler.__name__, machine)
+            return exc
+    return None
+
+
+@on_machine_change
+def _invalidate_manual(machine: str) -> None:
+    from middleware.manual_cache import get_manual_cache
+    from middleware.manuals_tools import ManualsTool
+
+    tool = ManualsTool()
+    get_manual_cache(tool.fallback_path).invalidate(f"{tool.container_name}/{tool._blob_name(machine)}")
+
+
+@on_machine_change
+def _drop_mirrored_manual(machine: str) -> None:
+    from middleware.manual_mirror import get_manual_mirror
+    from middleware.manuals_tools import ManualsTool
+
+    tool = ManualsTool()
+    mirror = get_manual_mirror(tool._container_client)
+    if mirror is not None:
+        # Served from blob storage until the next mirror sync.
+        mirror.drop(tool._blob_name(machine))
+
+
+@on_machine_change
+def _expire_listings(machine: str) -> None:
+    from middleware.manual_listing import expire_manual_listings
+
+    # A new or removed manual shows up in ``fetch_manuals`` after the next refresh.
+    expire_manual_listings()
+
+
+@on_machine_change
+def _invalidate_responses(machine: str) -> None:
+    from agents.response_cache import get_response_cache
+
+    get_response_cache().invalidate_manual(machine)
@@ -1,46 +1,436 @@
+import asyncio
 import json
 import logging
+import os
+import threading
+import time
 
 import azure.functions as func
 from function_app import app
 
-from langchain_core.messages import HumanMessage
-from agents import build_graph, VanillaAgent
+# The agent stack (LangChain, LangGraph, the agents) is imported inside the
+# handlers: every trigger module is imported when the host indexes the app,
+# and the timer, queue and Cosmos triggers never need it.
+
+try:  # optional: true HTTP streaming needs the FastAPI extension
+    from azurefunctions.extensions.http.fastapi import Request, Response, StreamingResponse
+except ImportError:  # pragma: no cover - depends on the deployment
+    Request = Response = StreamingResponse = None
 
 
 _graph = None
+_checkpointed_graph = None
+_graph_lock = threading.Lock()
 
 
 @app.route(route="conversationRun", auth_level=func.AuthLevel.FUNCTION)
-def conversation_run(req: func.HttpRequest) -> func.HttpResponse:
-    """HTTP endpoint for running a dispatcher-driven conversation."""
+@app.queue_output(arg_name="msg", queue_name="tasks", connection="AzureWebJobsStorage")
+def conversation_run(req: func.HttpRequest, msg: func.Out[str] = None) -> func.HttpResponse:
+    """HTTP endpoint for running a dispatcher-driven conversation.
+
+    With ``"queue": true`` the turn is handed to ``queue_worker`` through the
+    ``tasks`` queue and a job id is returned at once (see :mod:`agents.jobs`).
+    """
 
     logging.info("HTTP conversationRun invoked")
 
+    parsed = _parse_request(req)
+    if isinstance(parsed, func.HttpResponse):
+        return parsed
+    input_data, session_id = parsed
+
+    if _flag(req, "queue"):
+        return _enqueue(input_data, session_id, msg)
+
+    from middleware.telemetry import track_timings
+
+    with track_timings() as timings:
+        history = run_turn(input_data, session_id)
+    return _output_response(history, _timings_for(req, timings))
+
+
+def run_turn(input_data, session_id=None) -> list:
+    """Run one conversation turn and return the resulting history."""
+    from langchain_core.messages import HumanMessage
+    from agents.memory import get_memory_store
+
+    checkpointer = _get_checkpointer() if session_id else None
+    if checkpointer is not None:
+        # The checkpointer holds the history; only the new turn is sent.
+        result = _get_checkpointed_graph(checkpointer).invoke(
+            {"messages": [HumanMessage(content=input_data)]},
+            config={"configurable": {"thread_id": session_id}},
+        )
+        return result.get("messages", [])
+
+    graph = _get_graph()
+    if session_id:
+        with get_memory_store().session(session_id) as session:
+            messages = [*session.messages, HumanMessage(content=input_data)]
+            session.update(_invoke_cached(graph, messages))
+            return session.messages
+    # Without a session id every request is an independent conversation.
+    return _invoke_cached(graph, [HumanMessage(content=input_data)])
+
+
+@app.route(route="conversationResult/{job_id}", methods=[func.HttpMethod.GET], auth_level=func.AuthLevel.FUNCTION)
+def conversation_result(req: func.HttpRequest) -> func.HttpResponse:
+    """Status and, once finished, output of a queued conversation turn."""
+
+    from agents.jobs import get_job_store, public_view
+
+    job_id = req.route_params.get("job_id", "")
+    job = get_job_store().get(job_id) if job_id else None
+    if job is None:
+        return func.HttpResponse(body="Unknown job id", status_code=404)
+    return func.HttpResponse(json.dumps(public_view(job)), status_code=200, mimetype="application/json")
+
+
+@app.route(route="conversationRunAsync", auth_level=func.AuthLevel.FUNCTION)
+async def conversation_run_async(req: func.HttpRequest) -> func.HttpResponse:
+    """Async variant of :func:`conversation_run` built on ``graph.ainvoke``.
+
+    The worker's event loop stays free while the LLM and blob calls of one
+    conversation are in flight, so a single worker serves many at once.
+    """
+
+    logging.info("HTTP conversationRunAsync invoked")
+
+    parsed = _parse_request(req)
+    if isinstance(parsed, func.HttpResponse):
+        return parsed
+    input_data, session_id = parsed
+
+    from langchain_core.messages import HumanMessage
+    from agents.memory import get_memory_store
+    from middleware.telemetry import track_timings
+
+    with track_timings() as timings:
+        checkpointer = _get_checkpointer() if session_id else None
+        if checkpointer is not None:
+            result = await _get_checkpointed_graph(checkpointer).ainvoke(
+                {"messages": [HumanMessage(content=input_data)]},
+                config={"configurable": {"thread_id": session_id}},
+            )
+            history = result.get("messages", [])
+        else:
+            graph = _get_graph()
+            if session_id:
+                async with get_memory_store().asession(session_id) as session:
+                    messages = [*session.messages, HumanMessage(content=input_data)]
+                    session.update(await _ainvoke_cached(graph, messages))
+                    history = session.messages
+            else:
+                history = await _ainvoke_cached(graph, [HumanMessage(content=input_data)])
+    return _output_response(history, _timings_for(req, timings))
+
+
+if StreamingResponse is not None:
+
+    @app.route(route="conversationStream", methods=[func.HttpMethod.POST], auth_level=func.AuthLevel.FUNCTION)
+    async def conversation_stream(req: Request) -> StreamingResponse:
+        """Stream a conversation turn as server-sent events (see :mod:`agents.streaming`)."""
+
+        logging.info("HTTP conversationStream invoked")
+
+        try:
+            body = await req.json()
+        except ValueError:
+            return Response("Invalid JSON when parsing request body", status_code=400)
+        parsed = _validate_body(body)
+        if isinstance(parsed, str):
+            return Response(parsed, status_code=400)
+        return StreamingResponse(
+            _stream_events(*parsed),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+else:
+
+    @app.route(route="conversationStream", methods=[func.HttpMethod.POST], auth_level=func.AuthLevel.FUNCTION)
+    async def conversation_stream(req: func.HttpRequest) -> func.HttpResponse:
+        """Buffered fallback: the same SSE events, sent in one response body.
+
+        Install ``azurefunctions-extensions-http-fastapi`` to stream them.
+        """
+
+        logging.info("HTTP conversationStream invoked (buffered)")
+
+        parsed = _parse_request(req)
+        if isinstance(parsed, func.HttpResponse):
+            return parsed
+        frames = [frame async for frame in _stream_events(*parsed)]
+        return func.HttpResponse("".join(frames), status_code=200, mimetype="text/event-stream")
+
+
+def _parse_request(req: func.HttpRequest):
+    """Return ``(input, session_id)`` from the body, or an error response."""
     try:
         body = req.get_json()
     except ValueError:
         return func.HttpResponse(body="Invalid JSON when parsing request body", status_code=400)
+    parsed = _validate_body(body)
+    if isinstance(parsed, str):
+        return func.HttpResponse(body=parsed, status_code=400)
+    return parsed
+
 
+def _validate_body(body):
+    """Return ``(input, session_id)`` or the error message for a bad body."""
     if not isinstance(body, dict):
-        return func.HttpResponse(body="Invalid JSON when checking body type", status_code=400)
+        return "Invalid JSON when checking body type"
 
     input_data = body.get("input")
     logging.debug(f"Input data: {input_data}")
     if input_data is None:
-        return func.HttpResponse(body="Invalid input when checking body content", status_code=400)
+        return "Invalid input when checking body content"
 
+    session_id = body.get("session_id")
+    if session_id is not None and not isinstance(session_id, str):
+        return "Invalid session_id when checking body content"
+    from agents.memory import MAX_SESSION_ID_LENGTH
+
+    if session_id is not None and len(session_id) > MAX_SESSION_ID_LENGTH:
+        return f"Invalid session_id: longer than {MAX_SESSION_ID_LENGTH} characters"
+    return input_data, session_id
+
+
+def _get_graph():
     global _graph
-    if _graph is None:
-        _graph = build_graph()
+    with _graph_lock:
+        if _graph is None:
+            from agents import build_graph
+
+            _graph = build_graph()
+        return _graph
+
+
+def _get_checkpointed_graph(checkpointer):
+    global _checkpointed_graph
+    with _graph_lock:
+        if _checkpointed_graph is None:
+            from agents import build_graph
+
+            _checkpointed_graph = build_graph(checkpointer=checkpointer)
+        return _checkpointed_graph
+
+
+def warm_up() -> None:
+    """Import the agent stack and build the graphs before the first request.
+
+    Building a graph also creates its agents' LLM clients. Safe to call from
+    a background thread: requests arriving meanwhile wait for the same build.
+    """
+    started = time.perf_counter()
+    try:
+        _get_graph()
+        checkpointer = _get_checkpointer()
+        if checkpointer is not None:
+            _get_checkpointed_graph(checkpointer)
+    except Exception:
+        logging.exception("Conversation warm-up failed; graphs will be built on first use")
+        return
+    logging.info("Conversation graphs warmed up in %.2fs", time.perf_counter() - started)
+
+
+def _invoke_cached(graph, messages: list) -> list:
+    """Run ``graph``, answering context-free text questions from the response cache.
+
+    Only the first turn of a conversation is cached, since later answers
+    depend on the history as well as on the input.
+    """
+    from langchain_core.messages import AIMessage
+    from agents.response_cache import get_response_cache
+    from agents.router import predict_route
+    from middleware.manual_cache import track_manual_reads
+
+    input_data = messages[-1].content
+    cache = get_response_cache()
+    if len(messages) != 1 or not isinstance(input_data, str) or cache.ttl <= 0:
+        return graph.invoke({"messages": messages}).get("messages", messages)
+
+    route = predict_route(input_data)
+    output = cache.get(input_data, route)
+    if output is not None:
+        logging.info("Response cache hit (route=%s)", route)
+        return [*messages, AIMessage(content=output)]
+
+    with track_manual_reads() as manuals:
+        history = graph.invoke({"messages": messages}).get("messages", messages)
+    _store_cached(cache, input_data, route, history, manuals)
+    return history
+
+
+async def _ainvoke_cached(graph, messages: list) -> list:
+    """Async variant of :func:`_invoke_cached`."""
+    from langchain_core.messages import AIMessage
+    from agents.response_cache import get_response_cache
+    from agents.router import predict_route
+    from middleware.manual_cache import track_manual_reads
+
+    input_data = messages[-1].content
+    cache = get_response_cache()
+    if len(messages) != 1 or not isinstance(input_data, str) or cache.ttl <= 0:
+        return (await graph.ainvoke({"messages": messages})).get("messages", messages)
+
+    route = predict_route(input_data)
+    # Validating a hit may revalidate manuals against blob storage.
+    output = await asyncio.to_thread(cache.get, input_data, route)
+    if output is not None:
+        logging.info("Response cache hit (route=%s)", route)
+        return [*messages, AIMessage(content=output)]
+
+    with track_manual_reads() as manuals:
+        history = (await graph.ainvoke({"messages": messages})).get("messages", messages)
+    _store_cached(cache, input_data, route, history, manuals)
+    return history
+
+
+async def _stream_events(input_data, session_id):
+    """Yield the SSE frames of one turn, keeping sessions and the cache in step."""
+    from langchain_core.messages import HumanMessage
+    from agents.memory import get_memory_store
+
+    messages = [HumanMessage(content=input_data)]
+    checkpointer = _get_checkpointer() if session_id else None
+    if checkpointer is not None:
+        graph = _get_checkpointed_graph(checkpointer)
+        config = {"configurable": {"thread_id": session_id}}
+        async for frame in _stream_turn(graph, messages, config=config, cacheable=False):
+            yield frame
+        return
+
+    graph = _get_graph()
+    if session_id:
+        async with get_memory_store().asession(session_id) as session:
+            history = [*session.messages, *messages]
+            async for frame in _stream_turn(graph, history, session=session):
+                yield frame
+    else:
+        async for frame in _stream_turn(graph, messages):
+            yield frame
+
+
+async def _stream_turn(graph, messages: list, session=None, config=None, cacheable: bool = True):
+    from langchain_core.messages import AIMessage
+    from agents import VanillaAgent
+    from agents.response_cache import get_response_cache
+    from agents.router import predict_route
+    from agents.streaming import ConversationStream, format_sse
+    from middleware.manual_cache import track_manual_reads
+
+    input_data = messages[-1].content
+    route = predict_route(input_data) if isinstance(input_data, str) else None
+    cache = get_response_cache()
+    cacheable = cacheable and len(messages) == 1 and isinstance(input_data, str) and cache.ttl > 0
+    if cacheable:
+        output = await asyncio.to_thread(cache.get, input_data, route)
+        if output is not None:
+            logging.info("Response cache hit (route=%s)", route)
+            if session is not None:
+                session.update([*messages, AIMessage(content=output)])
+            for event in (
+                {"event": "route", "data": {"agent": route, "via": "cache"}},
+                {"event": "message_start", "data": {"agent": route}},
+                {"event": "token", "data": {"text": output}},
+                {"event": "done", "data": {"output": output}},
+            ):
+                yield format_sse(event)
+            return
+
+    stream = ConversationStream(
+        graph, {"messages": messages}, config=config, agent_ids=VanillaAgent.REGISTRY, route=route
+    )
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def produce() -> None:
+        # Runs in its own task so manual-read tracking never spans a yield.
+        with track_manual_reads() as manuals:
+            async for event in stream:
+                await events.put(event)
+        if cacheable and stream.messages and stream.messages[-1] is not messages[-1]:
+            _store_cached(cache, input_data, route, stream.messages, manuals)
+        await events.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (event := await events.get()) is not None:
+            yield format_sse(event)
+        await producer
+    finally:
+        producer.cancel()
+    if session is not None and isinstance(stream.messages[-1], AIMessage):
+        session.update(stream.messages)
+
+
+def _store_cached(cache, input_data: str, route: str, history: list, manuals: dict) -> None:
+    from langchain_core.messages import AIMessage
+    from agents.response_cache import is_cacheable_turn
+
+    answer = history[-1] if history else None
+    if isinstance(answer, AIMessage) and isinstance(answer.content, str) and is_cacheable_turn(history):
+        cache.put(input_data, route, answer.content, manuals)
+
+
+def _get_checkpointer():
+    """Return the configured SQL checkpointer, importing it only when enabled."""
+    if not os.environ.get("CONVERSATION_CHECKPOINT_URL"):
+        return None
+    from agents.checkpoint import get_checkpointer
+
+    return get_checkpointer()
+
+
+def _flag(req: func.HttpRequest, name: str) -> bool:
+    """``True`` for ``"<name>": true`` in the body or ``?<name>=1`` in the URL."""
+    if req.params.get(name, "").lower() in ("1", "true"):
+        return True
+    try:
+        body = req.get_json()
+    except ValueError:
+        return False
+    return isinstance(body, dict) and body.get(name) is True
+
+
+def _enqueue(input_data, session_id, msg) -> func.HttpResponse:
+    from agents.jobs import get_job_store, new_job
+
+    if msg is None:
+        return func.HttpResponse(body="Queueing is not available", status_code=503)
+    job = new_job(session_id)
+    get_job_store().create(job)
+    msg.set(json.dumps({"job_id": job["id"], "input": input_data, "session_id": session_id}))
+    logging.info("Conversation job %s queued", job["id"])
+    return func.HttpResponse(
+        json.dumps({"job_id": job["id"], "status": job["status"]}),
+        status_code=202,
+        mimetype="application/json",
+        headers={"Location": f"/api/conversationResult/{job['id']}"},
+    )
+
+
+def _timings_for(req: func.HttpRequest, timings):
+    """Return the timing breakdown when the caller asked for it, else ``None``.
+
+    Requested with ``"timings": true`` in the body or ``?timings=1``.
+    """
+    summary = timings.summary()
+    logging.info(
+        "Conversation timings: total=%.1fms %s",
+        summary["total_ms"],
+        {kind: total["duration_ms"] for kind, total in summary["totals"].items()},
+    )
+    return summary if _flag(req, "timings") else None
 
-    messages = [*VanillaAgent.MEMORY, HumanMessage(content=input_data)]
-    result = _graph.invoke({"messages": messages})
-    VanillaAgent.MEMORY = result.get("messages", messages)
-    output_msg = VanillaAgent.MEMORY[-1].content if VanillaAgent.MEMORY else ""
 
+def _output_response(history: list, timings: dict | None = None) -> func.HttpResponse:
+    output_msg = history[-1].content if history else ""
+    payload = {"output": output_msg}
+    if timings is not None:
+        payload["timings"] = timings
     return func.HttpResponse(
-        json.dumps({"output": output_msg}),
+        json.dumps(payload),
         status_code=200,
         mimetype="application/json",
     )
@@ -3,6 +3,10 @@ import logging
 import azure.functions as func
 from function_app import app
 
+# Matches ``extensions.queues.maxDequeueCount`` in host.json: the last
+# delivery of a failing job records the failure instead of retrying.
+MAX_DEQUEUE_COUNT = 3
+
 
 # Processes messages from a Storage Queue named 'tasks'
 @app.queue_trigger(arg_name="msg", queue_name="tasks", connection="AzureWebJobsStorage")
@@ -11,7 +15,42 @@ def queue_worker(msg: func.QueueMessage) -> None:
         body = msg.get_body().decode("utf-8")
         logging.info("Queue message: %s", body)
         payload = json.loads(body)
-        # TODO: handle task payload
-        logging.info("Processed payload keys: %s", list(payload) if isinstance(payload, dict) else type(payload))
     except Exception as e:
         logging.exception("Failed to process queue message: %s", e)
+        return
+    if isinstance(payload, dict) and "job_id" in payload:
+        run_conversation_job(payload, msg.dequeue_count or 1)
+        return
+    logging.info("Processed payload keys: %s", list(payload) if isinstance(payload, dict) else type(payload))
+
+
+def run_conversation_job(payload: dict, dequeue_count: int = 1) -> None:
+    """Run a turn queued by ``conversationRun`` and store its outcome.
+
+    Failures are re-raised so the queue retries the message, except on its
+    last delivery, where the job is marked failed.
+    """
+    from agents.jobs import FAILED, FINISHED, QUEUED, RUNNING, SUCCEEDED, get_job_store
+    from functions.http_conversation import run_turn
+
+    job_id = payload["job_id"]
+    store = get_job_store()
+    job = store.get(job_id)
+    if job is not None and job.get("status") in FINISHED:
+        logging.info("Conversation job %s already %s; skipping redelivery", job_id, job["status"])
+        return
+
+    store.update(job_id, status=RUNNING, attempts=dequeue_count)
+    try:
+        history = run_turn(payload.get("input"), payload.get("session_id"))
+    except Exception as exc:
+        if dequeue_count >= MAX_DEQUEUE_COUNT:
+            logging.exception("Conversation job %s failed", job_id)
+            store.update(job_id, status=FAILED, error=str(exc))
+            return
+        logging.warning("Conversation job %s failed (attempt %d); retrying: %s", job_id, dequeue_count, exc)
+        store.update(job_id, status=QUEUED, error=str(exc))
+        raise
+    output = history[-1].content if history else ""
+    store.update(job_id, status=SUCCEEDED, output=output, error=None)
+    logging.info("Conversation job %s succeeded", job_id)
@@ -6,8 +6,29 @@ from function_app import app
 
 @app.timer_trigger(schedule="0 */5 * * * *", arg_name="mytimer")
 def timer_cleanup(mytimer: func.TimerRequest) -> None:
-    """Runs every 5 minutes. Add periodic maintenance here."""
+    """Runs every 5 minutes: keeps the local manual mirror and the spec store in sync."""
     utc_now = datetime.datetime.utcnow().isoformat()
     if mytimer.past_due:
         logging.warning("Timer is past due!")
     logging.info("Timer triggered at %s", utc_now)
+
+    from middleware.manual_mirror import sync_manual_mirror
+    from middleware.manual_specs import refresh_spec_store
+
+    try:
+        stats = sync_manual_mirror()
+    except Exception as exc:
+        # Readers fall back to blob storage; the next run tries again.
+        logging.exception("Manual mirror sync failed: %s", exc)
+    else:
+        if stats is not None:
+            logging.info("Manual mirror synced: %s", stats)
+
+    try:
+        # After the mirror sync, changed manuals are read from local disk.
+        store = refresh_spec_store(force=True)
+    except Exception as exc:
+        logging.exception("Spec store refresh failed: %s", exc)
+        return
+    if store is not None:
+        logging.info("Spec store refreshed: %d machines", len(store.machines))
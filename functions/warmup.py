@@ -0,0 +1,22 @@
+import logging
+import os
+import threading
+
+from azure.functions.warmup import WarmUpContext
+from function_app import app
+
+from functions import http_conversation
+
+
+# Runs when the platform adds an instance (Premium / Elastic Premium plans),
+# before the instance receives traffic.
+@app.warm_up_trigger("warmup")
+def warmup(warmup: WarmUpContext) -> None:
+    logging.info("Warm-up trigger invoked")
+    http_conversation.warm_up()
+
+
+# On any plan, CONVERSATION_WARMUP=1 builds the conversation graphs in the
+# background right after the host has indexed the app.
+if os.environ.get("CONVERSATION_WARMUP", "0") == "1":
+    threading.Thread(target=http_conversation.warm_up, name="conversation-warmup", daemon=True).start()
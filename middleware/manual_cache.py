@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+"""Two-tier cache for manual contents fetched from Azure Blob Storage.
+
+The memory tier is an LRU bounded by a byte budget; the optional disk tier
+persists entries under ``<fallback_path>/.manuals-cache`` so they survive a
+worker restart. Entries carry the blob ``ETag``/``Last-Modified`` so stale
+copies are revalidated with conditional requests instead of re-downloaded.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+DEFAULT_TTL_SECONDS = 300.0
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DISK_CACHE_DIRNAME = ".manuals-cache"
+
+
+@dataclass
+class CachedManual:
+    """A cached manual body together with its blob validators."""
+
+    text: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    validated_at: float = 0.0
+
+    @property
+    def size(self) -> int:
+        return len(self.text.encode("utf-8"))
+
+
+class ManualCache:
+    """Thread-safe LRU cache of manuals with an optional on-disk tier."""
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        disk_dir: Optional[str | Path] = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = Path(disk_dir) if disk_dir is not None else None
+        self._entries: OrderedDict[str, CachedManual] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.refreshes = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+    # lookup ---------------------------------------------------------------
+    def get(self, key: str) -> Optional[CachedManual]:
+        """Return the entry for ``key`` from memory, then disk, or ``None``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self._read_disk(key)
+        if entry is not None:
+            with self._lock:
+                self.disk_hits += 1
+                self._insert(key, entry)
+        return entry
+
+    def is_fresh(self, entry: CachedManual) -> bool:
+        return time.time() - entry.validated_at < self.ttl
+
+    # mutation -------------------------------------------------------------
+    def put(self, key: str, entry: CachedManual) -> None:
+        """Store ``entry`` in both tiers, evicting least recently used items."""
+        entry.validated_at = time.time()
+        with self._lock:
+            self._insert(key, entry)
+        self._write_disk(key, entry)
+
+    def mark_validated(self, key: str, entry: CachedManual) -> None:
+        """Record a successful conditional revalidation of ``entry``."""
+        entry.validated_at = time.time()
+        with self._lock:
+            self.revalidations += 1
+        self._write_disk(key, entry, meta_only=True)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop ``key`` (or every entry when omitted) from both tiers."""
+        with self._lock:
+            keys = [key] if key is not None else list(self._entries)
+            for item in keys:
+                entry = self._entries.pop(item, None)
+                if entry is not None:
+                    self._bytes -= entry.size
+        for item in keys:
+            for path in self._disk_paths(item):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def record(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> dict[str, int]:
+        """Snapshot of the cache counters and current occupancy."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "refreshes": self.refreshes,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    # internals ------------------------------------------------------------
+    def _insert(self, key: str, entry: CachedManual) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def _disk_paths(self, key: str) -> tuple[Path, ...]:
+        if self.disk_dir is None:
+            return ()
+        safe = key.replace("/", "__")
+        return (self.disk_dir / safe, self.disk_dir / f"{safe}.meta.json")
+
+    def _read_disk(self, key: str) -> Optional[CachedManual]:
+        paths = self._disk_paths(key)
+        if not paths:
+            return None
+        body_path, meta_path = paths
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            text = body_path.read_text(encoding="utf-8")
+        except (OSError, ValueError):
+            return None
+        return CachedManual(
+            text=text,
+            etag=meta.get("etag"),
+            last_modified=meta.get("last_modified"),
+            validated_at=float(meta.get("validated_at", 0.0)),
+        )
+
+    def _write_disk(self, key: str, entry: CachedManual, meta_only: bool = False) -> None:
+        paths = self._disk_paths(key)
+        if not paths:
+            return
+        body_path, meta_path = paths
+        meta = {k: v for k, v in asdict(entry).items() if k != "text"}
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            if not meta_only:
+                _atomic_write(body_path, entry.text)
+            _atomic_write(meta_path, json.dumps(meta))
+        except OSError:
+            # Read-only deployments (run-from-package) simply skip the disk tier.
+            pass
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+_CACHES: dict[Optional[Path], ManualCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_manual_cache(fallback_path: Optional[str | Path] = None) -> ManualCache:
+    """Return the process-wide cache, configured from environment variables.
+
+    ``MANUALS_MD_CACHE_TTL`` sets the freshness window in seconds,
+    ``MANUALS_MD_CACHE_MAX_BYTES`` the memory budget, and
+    ``MANUALS_MD_DISK_CACHE=1`` enables the disk tier under ``fallback_path``.
+    """
+    disk_dir: Optional[Path] = None
+    if fallback_path is not None and os.environ.get("MANUALS_MD_DISK_CACHE", "0") == "1":
+        disk_dir = Path(fallback_path) / DISK_CACHE_DIRNAME
+    with _CACHES_LOCK:
+        cache = _CACHES.get(disk_dir)
+        if cache is None:
+            cache = ManualCache(
+                max_bytes=int(os.environ.get("MANUALS_MD_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+                ttl=float(os.environ.get("MANUALS_MD_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+                disk_dir=disk_dir,
+            )
+            _CACHES[disk_dir] = cache
+        return cache
+
+
+def manual_cache_stats() -> dict[str, int]:
+    """Aggregate counters across every process-wide manual cache."""
+    totals: dict[str, int] = {}
+    with _CACHES_LOCK:
+        caches = list(_CACHES.values())
+    for cache in caches:
+        for name, value in cache.stats().items():
+            totals[name] = totals.get(name, 0) + value
+    return totals
+
+
+def clear_manual_caches() -> None:
+    """Drop every process-wide cache (memory only; disk entries are kept)."""
+    with _CACHES_LOCK:
+        _CACHES.clear()
+
+
+# read tracking ------------------------------------------------------------
+_MANUAL_READS: ContextVar[Optional[dict[str, str]]] = ContextVar("manual_reads", default=None)
+
+
+@contextmanager
+def track_manual_reads() -> Iterator[dict[str, str]]:
+    """Collect ``{machine: version}`` for every manual read inside the block.
+
+    The dict is shared with copies of the current context, so reads made by
+    tools running on executor threads are included. An empty version means
+    the manual did not exist.
+    """
+    reads: dict[str, str] = {}
+    token = _MANUAL_READS.set(reads)
+    try:
+        yield reads
+    finally:
+        _MANUAL_READS.reset(token)
+
+
+def record_manual_read(machine: str, version: Optional[str]) -> None:
+    """Report that ``machine`` was read at ``version`` to the active tracker."""
+    reads = _MANUAL_READS.get()
+    if reads is not None:
+        machine = machine[: -len(".md")] if machine.endswith(".md") else machine
+        reads[machine] = (version or "").removeprefix("W/").strip('"')
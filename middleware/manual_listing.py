@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+"""Cached listing of the manuals container.
+
+Listing a container of thousands of manuals takes several paged requests, so
+:func:`get_manual_listing` keeps one :class:`ManualListing` per manuals
+source. The first call lists the container (or the local manuals directory
+when there is no container, or it is empty); later calls return the cached
+listing at once and refresh it on a background thread once it is older than
+``MANUALS_LISTING_TTL`` seconds (default 300). A change-feed event expires
+the listings, so the next call starts a refresh.
+
+``fetch_manuals`` pages through a filtered slice of the listing, and the
+machine-name index (:mod:`middleware.manual_names`) is built from it.
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+DEFAULT_TTL_SECONDS = 300.0
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+@dataclass(frozen=True)
+class ManualEntry:
+    """A listed manual with the metadata the listing provides."""
+
+    name: str
+    size: Optional[int] = None
+    last_modified: Optional[str] = None
+
+
+class ManualListing:
+    """Manuals of one source, sorted by name (case-insensitively)."""
+
+    def __init__(self, entries: list[ManualEntry]) -> None:
+        self.entries = sorted(entries, key=lambda entry: (entry.name.lower(), entry.name))
+        self._keys = [entry.name.lower() for entry in self.entries]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def names(self) -> list[str]:
+        return [entry.name for entry in self.entries]
+
+    def select(self, prefix: str = "", contains: str = "") -> list[ManualEntry]:
+        """Entries whose name starts with ``prefix`` and contains ``contains`` (any case)."""
+        entries = self.entries
+        if prefix:
+            prefix = prefix.lower()
+            start = bisect.bisect_left(self._keys, prefix)
+            # Every key with the prefix sorts before the prefix followed by the highest code point.
+            end = bisect.bisect_left(self._keys, prefix + "\U0010ffff", start)
+            entries = entries[start:end]
+        if contains:
+            contains = contains.lower()
+            entries = [entry for entry in entries if contains in entry.name.lower()]
+        return entries
+
+
+def list_manual_entries(tool_impl) -> Optional[list[ManualEntry]]:
+    """List the container of ``tool_impl``, falling back to its local directory.
+
+    ``None`` means neither could be listed.
+    """
+    container_client = getattr(tool_impl, "_container_client", None)
+    failed = False
+    if container_client is not None:
+        try:
+            entries = [
+                ManualEntry(
+                    blob.name,
+                    blob.size,
+                    blob.last_modified.isoformat() if blob.last_modified else None,
+                )
+                for blob in container_client.list_blobs()
+            ]
+        except Exception:
+            logging.warning("Listing container %s failed", tool_impl.container_name)
+            entries, failed = [], True
+        if entries:
+            return entries
+    if not tool_impl.fallback_path.exists():
+        # A failed listing is not cached; an empty container is.
+        return [] if container_client is not None and not failed else None
+    entries = []
+    for path in tool_impl.fallback_path.glob("*"):
+        if path.is_file():
+            stat = path.stat()
+            modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat()
+            entries.append(ManualEntry(path.name, stat.st_size, modified))
+    return entries
+
+
+class _ListingState:
+    """The listing of one manuals source and its background refresh."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.listing: Optional[ManualListing] = None
+        self.built_at = 0.0
+        self.refreshing = False
+
+    def build(self, tool_impl) -> Optional[ManualListing]:
+        entries = list_manual_entries(tool_impl)
+        with self.lock:
+            self.refreshing = False
+            if entries is not None:
+                self.listing, self.built_at = ManualListing(entries), time.monotonic()
+            return self.listing
+
+
+_STATES: dict[tuple, _ListingState] = {}
+_STATES_LOCK = threading.Lock()
+
+
+def get_manual_listing(tool_impl, wait: bool = True) -> Optional[ManualListing]:
+    """The cached listing of ``tool_impl``'s manuals.
+
+    The first call lists the source (or returns ``None`` without ``wait``);
+    later calls return the cached listing and start a background refresh
+    once it is older than ``MANUALS_LISTING_TTL``.
+    """
+    key = (tool_impl.connection_string, tool_impl.container_name, str(tool_impl.fallback_path))
+    with _STATES_LOCK:
+        state = _STATES.setdefault(key, _ListingState())
+    ttl = float(os.environ.get("MANUALS_LISTING_TTL", DEFAULT_TTL_SECONDS))
+    with state.lock:
+        listing = state.listing
+        due = listing is not None and time.monotonic() - state.built_at >= ttl
+        if due and not state.refreshing:
+            state.refreshing = True
+            threading.Thread(target=state.build, args=(tool_impl,), name="manual-listing", daemon=True).start()
+    if listing is None and wait:
+        listing = state.build(tool_impl)
+    return listing
+
+
+def expire_manual_listings() -> None:
+    """Make the next :func:`get_manual_listing` call refresh every listing."""
+    with _STATES_LOCK:
+        states = list(_STATES.values())
+    for state in states:
+        with state.lock:
+            state.built_at = 0.0
+
+
+def clear_manual_listings() -> None:
+    """Forget every cached listing (tests and configuration changes)."""
+    with _STATES_LOCK:
+        _STATES.clear()
+
+
+def format_listing(entries: list[ManualEntry], offset: int, limit: int, details: bool = False) -> str:
+    """One line per manual of the page: its name, or with ``details`` a
+    tab-separated ``name, size, last modified``.
+
+    A last line tells the model how to get the next page, if there is one.
+    """
+    page = entries[offset : offset + limit]
+    lines = [
+        "\t".join((entry.name, _size(entry.size), entry.last_modified or "-")) if details else entry.name
+        for entry in page
+    ]
+    if offset + limit < len(entries):
+        lines.append(
+            f"(manuals {offset + 1}-{offset + len(page)} of {len(entries)}; "
+            f"call again with offset={offset + limit} for more)"
+        )
+    return "\n".join(lines)
+
+
+def _size(size: Optional[int]) -> str:
+    if size is None:
+        return "-"
+    if size < 1024:
+        return f"{size} B"
+    return f"{size / 1024:.1f} KiB"
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+"""Local read-through mirror of the manuals blob container.
+
+The ``timer_cleanup`` function calls :func:`sync_manual_mirror` every five
+minutes: it lists the container with ETags, downloads only new or changed
+manuals in parallel and then swaps in a new manifest, so readers see either
+the previous or the next generation, never a mix. Files are named after their
+ETag, which keeps a file from ever being rewritten in place.
+
+The mirror lives on local disk, while the timer runs on one instance only.
+Every instance therefore keeps its own mirror in sync: a read finding it
+missing or older than ``MANUALS_MIRROR_SYNC_SECONDS`` starts a sync on a
+background thread (:meth:`ManualMirror.sync_in_background`) and is served
+from blob storage meanwhile.
+
+Each container gets its own directory, named after the container and a hash
+of its URL, so processes pointed at different storage accounts never share a
+mirror. A process only serves the mirror once it has synced it itself: files
+left by an earlier process may be older than the container.
+
+``ManualsTool`` reads the mirror before blob storage; a manual missing from
+the mirror (not synced yet, or dropped by :meth:`ManualMirror.drop`) falls
+through to the blob path.
+
+Settings (environment variables):
+
+``MANUALS_MIRROR``
+    ``0`` disables the mirror (default on when a blob connection is set).
+``MANUALS_MIRROR_PATH``
+    Directory holding the mirrors (default ``<tmp>/machine-bot/manuals-mirror``).
+``MANUALS_MIRROR_WORKERS``
+    Parallel downloads per sync (default 8).
+``MANUALS_MIRROR_SYNC_SECONDS``
+    Age of the mirror after which a read starts a background sync
+    (default 300).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from .manual_cache import _atomic_write
+
+DEFAULT_WORKERS = 8
+DEFAULT_SYNC_SECONDS = 300.0
+MANIFEST = "manifest.json"
+
+
+class ManualMirror:
+    """Manuals of one container mirrored under ``root``."""
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._manifest: dict[str, dict] = {}
+        self._manifest_stamp: Optional[int] = None
+        # Names dropped while a sync runs; that sync must not bring them back.
+        self._dropped: Optional[set[str]] = None
+        self._background = False
+        # Set by the first sync in this process; until then reads return None.
+        self._synced = False
+
+    # reading --------------------------------------------------------------
+    def manifest(self) -> dict[str, dict]:
+        """Current ``{blob_name: entry}``, reloaded when another process syncs."""
+        with self._lock:
+            return self._current()
+
+    def _current(self) -> dict[str, dict]:
+        # Callers hold ``_lock``.
+        try:
+            stamp = (self.root / MANIFEST).stat().st_mtime_ns
+        except OSError:
+            return {}
+        if stamp != self._manifest_stamp:
+            try:
+                self._manifest = json.loads((self.root / MANIFEST).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                return {}
+            self._manifest_stamp = stamp
+        return self._manifest
+
+    def read(self, blob_name: str) -> Optional[tuple[str, str]]:
+        """Return ``(text, etag)`` of a mirrored manual, or ``None``.
+
+        Always ``None`` before this process has synced the mirror.
+        """
+        if not self._synced:
+            return None
+        entry = self.manifest().get(blob_name)
+        if entry is None:
+            return None
+        try:
+            text = (self.root / entry["file"]).read_text(encoding="utf-8")
+        except OSError:
+            # Removed by a newer sync since the manifest was read.
+            return None
+        return text, entry["etag"]
+
+    # syncing --------------------------------------------------------------
+    def sync(self, container_client, workers: int = DEFAULT_WORKERS) -> dict[str, int]:
+        """Bring the mirror up to date with ``container_client``.
+
+        Returns how many manuals were downloaded, kept, removed and failed; a
+        failed download keeps the previous copy of that manual.
+        """
+        with self._sync_lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with self._lock:
+                current = self._current()
+                self._dropped = set()
+            listed = {
+                blob.name: {
+                    "etag": str(blob.etag),
+                    "size": blob.size,
+                    "last_modified": blob.last_modified.isoformat() if blob.last_modified else None,
+                }
+                for blob in container_client.list_blobs()
+                if blob.name.endswith(".md")
+            }
+            changed = [name for name, meta in listed.items() if current.get(name, {}).get("etag") != meta["etag"]]
+
+            def download(name: str) -> Optional[str]:
+                file_name = _file_name(name, listed[name]["etag"])
+                try:
+                    data = container_client.get_blob_client(name).download_blob().readall()
+                except Exception:
+                    return None
+                _atomic_write(self.root / file_name, data.decode("utf-8"))
+                return file_name
+
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(changed) or 1))) as pool:
+                files = dict(zip(changed, pool.map(download, changed)))
+
+            manifest: dict[str, dict] = {}
+            failed = 0
+            for name, meta in listed.items():
+                if name in files and files[name] is None:
+                    failed += 1
+                    if name in current:
+                        manifest[name] = current[name]
+                    continue
+                file_name = files.get(name) or current[name]["file"]
+                manifest[name] = {**meta, "file": file_name}
+            with self._lock:
+                # Changed after this sync listed them: left to the next sync.
+                for name in self._dropped or ():
+                    manifest.pop(name, None)
+                self._dropped = None
+                self._write_manifest(manifest)
+                self._synced = True
+
+            keep = {entry["file"] for entry in manifest.values()} | {MANIFEST}
+            for path in self.root.iterdir():
+                if path.name not in keep and path.suffix == ".md":
+                    path.unlink(missing_ok=True)
+            return {
+                "downloaded": len(changed) - failed,
+                "unchanged": len(listed) - len(changed),
+                "removed": len(set(current) - set(listed)),
+                "failed": failed,
+            }
+
+    def drop(self, blob_name: str) -> None:
+        """Forget ``blob_name`` until the next sync downloads it again.
+
+        Does not wait for a sync in progress; that sync leaves the manual out.
+        """
+        with self._lock:
+            if self._dropped is not None:
+                self._dropped.add(blob_name)
+            manifest = dict(self._current())
+            if manifest.pop(blob_name, None) is not None:
+                self._write_manifest(manifest)
+
+    def sync_in_background(self, container_client, workers: int = DEFAULT_WORKERS) -> bool:
+        """Start a sync on a background thread if the mirror is missing or due.
+
+        A mirror this process has not synced yet is always due.
+
+        Returns whether a sync was started.
+        """
+        interval = float(os.environ.get("MANUALS_MIRROR_SYNC_SECONDS", DEFAULT_SYNC_SECONDS))
+        try:
+            due = not self._synced or time.time() - (self.root / MANIFEST).stat().st_mtime >= interval
+        except OSError:
+            due = True
+        with self._lock:
+            if not due or self._background:
+                return False
+            self._background = True
+        threading.Thread(
+            target=self._sync_quietly, args=(container_client, workers), name="manual-mirror", daemon=True
+        ).start()
+        return True
+
+    def _sync_quietly(self, container_client, workers: int) -> None:
+        try:
+            self.sync(container_client, workers=workers)
+        except Exception:
+            # Reads keep falling back to blob storage; the next one retries.
+            logging.exception("Background sync of %s failed", self.root)
+        finally:
+            with self._lock:
+                self._background = False
+
+    def _write_manifest(self, manifest: dict[str, dict]) -> None:
+        # Callers hold ``_lock``.
+        _atomic_write(self.root / MANIFEST, json.dumps(manifest, sort_keys=True))
+        self._manifest = manifest
+        self._manifest_stamp = (self.root / MANIFEST).stat().st_mtime_ns
+
+
+def _file_name(blob_name: str, etag: str) -> str:
+    digest = hashlib.sha1(etag.encode("utf-8")).hexdigest()[:12]
+    return f"{blob_name[: -len('.md')].replace('/', '_')}.{digest}.md"
+
+
+_MIRRORS: dict[str, ManualMirror] = {}
+_MIRRORS_LOCK = threading.Lock()
+
+
+def get_manual_mirror(container_client) -> Optional[ManualMirror]:
+    """Return the process-wide mirror of ``container_client``'s container.
+
+    ``None`` if the mirror is disabled or there is no container client.
+    """
+    if container_client is None or os.environ.get("MANUALS_MIRROR", "1") == "0":
+        return None
+    # The URL names the account; a SAS token in its query string does not.
+    account = hashlib.sha1(container_client.url.split("?", 1)[0].encode("utf-8")).hexdigest()[:12]
+    root = Path(
+        os.environ.get("MANUALS_MIRROR_PATH")
+        or Path(tempfile.gettempdir()) / "machine-bot" / "manuals-mirror"
+    ) / f"{container_client.container_name}-{account}"
+    with _MIRRORS_LOCK:
+        mirror = _MIRRORS.get(str(root))
+        if mirror is None:
+            mirror = _MIRRORS[str(root)] = ManualMirror(root)
+        return mirror
+
+
+def sync_manual_mirror() -> Optional[dict[str, int]]:
+    """Sync the mirror of the configured manuals container, if there is one."""
+    from .manuals_tools import ManualsTool
+
+    tool_impl = ManualsTool()
+    mirror = get_manual_mirror(tool_impl._container_client)
+    if mirror is None:
+        return None
+    return mirror.sync(
+        tool_impl._container_client,
+        workers=int(os.environ.get("MANUALS_MIRROR_WORKERS", DEFAULT_WORKERS)),
+    )
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+"""Resolution of approximate machine names to the manuals that exist.
+
+Models rarely spell a machine the way its manual is stored: ``Machine 1``,
+``machine-001`` or ``M001`` all mean ``machine001.md``. :class:`MachineNameIndex`
+is built from the container listing (or the local manuals directory) and
+resolves such names in three steps:
+
+1. the same letters and numbers, ignoring case, separators and leading zeros;
+2. the same numbers, with the asked letters a prefix or abbreviation of the
+   manual's (``M001``, ``mach 1``);
+3. for names without numbers, trigram similarity.
+
+A name with numbers never resolves to a manual with other numbers, so
+``machine999`` is not mistaken for ``machine001``.
+
+:func:`get_name_index` builds the index from the cached listing of
+:mod:`middleware.manual_listing`, so it is refreshed in the background
+together with that listing.
+"""
+
+import re
+import threading
+import weakref
+from collections import Counter
+from typing import Iterable, Optional
+
+from .manual_listing import ManualListing, get_manual_listing
+
+# Trigram similarity a name without numbers needs to resolve.
+MIN_SIMILARITY = 0.45
+
+_PART_RE = re.compile(r"[a-z]+|\d+")
+
+
+def name_parts(name: str) -> tuple[str, tuple[int, ...]]:
+    """Letters and numbers of ``name``: ``"Machine-001.md"`` -> ``("machine", (1,))``."""
+    name = name.strip().lower()
+    if name.endswith(".md"):
+        name = name[: -len(".md")]
+    letters, numbers = [], []
+    for part in _PART_RE.findall(name):
+        if part.isdigit():
+            numbers.append(int(part))
+        else:
+            letters.append(part)
+    return "".join(letters), tuple(numbers)
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _abbreviates(short: str, full: str) -> bool:
+    """Whether ``short`` is a prefix of ``full`` or its letters appear in order."""
+    if not short or full.startswith(short):
+        return True
+    if short[0] != full[0]:
+        return False
+    remaining = iter(full)
+    return all(char in remaining for char in short)
+
+
+class MachineNameIndex:
+    """Machine names of the listed manuals, searchable by approximate name."""
+
+    def __init__(self, names: Iterable[str]) -> None:
+        self.names = sorted({name[: -len(".md")] if name.endswith(".md") else name for name in names})
+        self._exact = {name.lower(): name for name in self.names}
+        self._parts: dict[str, tuple[str, tuple[int, ...]]] = {}
+        self._by_parts: dict[tuple[str, tuple[int, ...]], list[str]] = {}
+        self._by_numbers: dict[tuple[int, ...], list[str]] = {}
+        self._by_trigram: dict[str, list[str]] = {}
+        for name in self.names:
+            parts = self._parts[name] = name_parts(name)
+            self._by_parts.setdefault(parts, []).append(name)
+            self._by_numbers.setdefault(parts[1], []).append(name)
+            for gram in trigrams(parts[0]):
+                self._by_trigram.setdefault(gram, []).append(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower().removesuffix(".md") in self._exact
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """The listed machine ``name`` stands for, or ``None`` if unclear."""
+        exact = self._exact.get(name.strip().lower().removesuffix(".md"))
+        if exact is not None:
+            return exact
+        letters, numbers = parts = name_parts(name)
+        same = self._by_parts.get(parts, [])
+        if len(same) == 1:
+            return same[0]
+        if numbers:
+            # ``M001`` may abbreviate ``machine001`` or ``mixer001``: only a
+            # single fitting manual resolves.
+            fitting = [match for match in self._by_numbers.get(numbers, []) if _abbreviates(letters, self._parts[match][0])]
+            return fitting[0] if len(fitting) == 1 else None
+        ranked = self.candidates(name)
+        if not ranked or ranked[0][0] < MIN_SIMILARITY:
+            return None
+        if len(ranked) > 1 and ranked[0][0] == ranked[1][0]:
+            return None
+        return ranked[0][1]
+
+    def candidates(self, name: str, limit: int = 10) -> list[tuple[float, str]]:
+        """``(similarity, machine)`` pairs for ``name``, best first.
+
+        With numbers in ``name`` only machines with the same numbers qualify.
+        """
+        letters, numbers = name_parts(name)
+        grams = trigrams(letters)
+        if numbers:
+            pool: Iterable[str] = self._by_numbers.get(numbers, [])
+        else:
+            shared: Counter[str] = Counter()
+            for gram in grams:
+                shared.update(self._by_trigram.get(gram, ()))
+            pool = [match for match, _ in shared.most_common(limit * 4)]
+        scored = []
+        for match in pool:
+            other = trigrams(self._parts[match][0])
+            scored.append((round(len(grams & other) / len(grams | other), 3), match))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored[:limit]
+
+
+_INDEXES: "weakref.WeakKeyDictionary[ManualListing, MachineNameIndex]" = weakref.WeakKeyDictionary()
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_name_index(tool_impl, wait: bool = True) -> Optional[MachineNameIndex]:
+    """The name index of ``tool_impl``'s manuals.
+
+    Built once per listing returned by
+    :func:`~middleware.manual_listing.get_manual_listing`; ``wait=False``
+    returns ``None`` instead of listing the container on first use.
+    """
+    listing = get_manual_listing(tool_impl, wait=wait)
+    if listing is None:
+        return None
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(listing)
+        if index is None:
+            index = _INDEXES[listing] = MachineNameIndex(name for name in listing.names if name.endswith(".md"))
+        return index
@@ -0,0 +1,472 @@
+from __future__ import annotations
+
+"""Cross-manual full-text search backed by a persistent inverted index.
+
+The index covers every ``.md`` manual in the blob container (or the local
+``MANUALS_MD_PATH`` directory) at section granularity and is stored as a
+single compact binary file that is memory-mapped when loaded, so a worker
+only pages in the postings it actually touches. Rebuilds are incremental:
+only manuals whose ETag changed are downloaded and re-split; the text of
+unchanged sections is reused from the previous index file, and the file is
+not rewritten when no manual changed.
+
+Searches never rebuild the index themselves: :func:`current_manual_index`
+serves the loaded index and, once it is older than
+``MANUALS_INDEX_REFRESH_SECONDS`` (default 300), refreshes it on a background
+thread. The change feed refreshes it at once for the machines that changed.
+Only the first search of a worker without an index file waits for a build.
+
+File layout (little endian)::
+
+    header    magic, version, counts and region offsets (see ``_HEADER``)
+    terms     sorted fixed-width entries: string offset/len, postings range
+    postings  (section id, term frequency) pairs
+    sections  fixed-width entries: doc id, heading/text offsets, token count
+    strings   UTF-8 blob holding terms, headings and section texts
+    meta      JSON with per-manual ETags and the average section length
+"""
+
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from langchain_core.tools import tool
+
+from .manual_cache import record_manual_read
+from .manual_sections import split_sections, tokenize
+from .manuals_tools import ManualsTool, get_container_client
+
+DEFAULT_LIMIT = 5
+DEFAULT_REFRESH_SECONDS = 300.0
+SNIPPET_CHARS = 240
+# Longer tokens (base64 blobs, hex dumps) are not indexed; the term table
+# stores term lengths in 16 bits.
+MAX_TERM_CHARS = 128
+
+_MAGIC = b"MBIX"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHIIQQQQQQ")
+_TERM = struct.Struct("<IHII")
+_POSTING = struct.Struct("<IH")
+_SECTION = struct.Struct("<IIHIII")
+_K1 = 1.5
+_B = 0.75
+
+
+@dataclass
+class SearchHit:
+    """A ranked section match returned by :meth:`ManualIndex.search`."""
+
+    machine: str
+    section: str
+    snippet: str
+    score: float
+
+
+@dataclass
+class ManualSource:
+    """A manual to index: its machine name, version tag and body loader."""
+
+    machine: str
+    etag: str
+    load: Callable[[], Optional[str]]
+
+
+class ManualIndex:
+    """Read-only view over an index file, memory-mapped on load."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as handle:
+            self._buf = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            _,
+            self.n_terms,
+            self.n_sections,
+            self._terms_off,
+            self._postings_off,
+            self._sections_off,
+            self._strings_off,
+            meta_off,
+            meta_len,
+        ) = _HEADER.unpack_from(self._buf, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self._buf.close()
+            raise ValueError(f"{self.path} is not a manual index (version {_VERSION})")
+        meta = json.loads(self._buf[meta_off : meta_off + meta_len].decode("utf-8"))
+        self.documents: list[dict] = meta["docs"]
+        self._by_machine = {doc["machine"]: doc for doc in self.documents}
+        self.avg_length: float = meta["avgdl"] or 1.0
+
+    def close(self) -> None:
+        self._buf.close()
+
+    # record access --------------------------------------------------------
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_off + offset
+        return self._buf[start : start + length].decode("utf-8")
+
+    def _term_at(self, position: int) -> tuple[bytes, int, int]:
+        str_off, str_len, post_start, post_count = _TERM.unpack_from(
+            self._buf, self._terms_off + position * _TERM.size
+        )
+        start = self._strings_off + str_off
+        return self._buf[start : start + str_len], post_start, post_count
+
+    def _section_at(self, section_id: int) -> tuple[int, str, str, int]:
+        doc, head_off, head_len, text_off, text_len, length = _SECTION.unpack_from(
+            self._buf, self._sections_off + section_id * _SECTION.size
+        )
+        return doc, self._string(head_off, head_len), self._string(text_off, text_len), length
+
+    def postings(self, term: str) -> list[tuple[int, int]]:
+        """Binary-search ``term`` and return its ``(section_id, tf)`` postings."""
+        needle = term.encode("utf-8")
+        low, high = 0, self.n_terms - 1
+        while low <= high:
+            mid = (low + high) // 2
+            value, post_start, post_count = self._term_at(mid)
+            if value == needle:
+                base = self._postings_off + post_start * _POSTING.size
+                return [
+                    _POSTING.unpack_from(self._buf, base + i * _POSTING.size)
+                    for i in range(post_count)
+                ]
+            if value < needle:
+                low = mid + 1
+            else:
+                high = mid - 1
+        return []
+
+    def sections_of(self, machine: str) -> list[tuple[str, str]]:
+        """Return ``(heading, text)`` pairs stored for ``machine``."""
+        doc = self._by_machine.get(machine)
+        if doc is None:
+            return []
+        return [self._section_at(i)[1:3] for i in range(doc["first"], doc["first"] + doc["count"])]
+
+    # querying -------------------------------------------------------------
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> list[SearchHit]:
+        """Rank sections across all manuals against ``query`` with BM25."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.n_sections:
+            return []
+        scores: Counter[int] = Counter()
+        lengths: dict[int, int] = {}
+        for term in terms:
+            postings = self.postings(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (self.n_sections - len(postings) + 0.5) / (len(postings) + 0.5))
+            for section_id, tf in postings:
+                if section_id not in lengths:
+                    lengths[section_id] = _SECTION.unpack_from(
+                        self._buf, self._sections_off + section_id * _SECTION.size
+                    )[5]
+                norm = _K1 * (1 - _B + _B * lengths[section_id] / self.avg_length)
+                scores[section_id] += idf * tf * (_K1 + 1) / (tf + norm)
+        hits = []
+        for section_id, score in sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]:
+            doc, heading, text, _ = self._section_at(section_id)
+            hits.append(
+                SearchHit(
+                    machine=self.documents[doc]["machine"],
+                    section=heading,
+                    snippet=_snippet(text, terms),
+                    score=score,
+                )
+            )
+        return hits
+
+
+def _snippet(text: str, terms: list[str]) -> str:
+    """Return a window of ``text`` around the first occurrence of a query term."""
+    lowered = text.lower()
+    positions = [pos for pos in (lowered.find(term) for term in terms) if pos >= 0]
+    start = max(0, min(positions) - SNIPPET_CHARS // 3) if positions else 0
+    window = " ".join(text[start : start + SNIPPET_CHARS].split())
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + SNIPPET_CHARS < len(text) else ""
+    return f"{prefix}{window}{suffix}"
+
+
+def build_index(
+    path: str | Path,
+    sources: Iterable[ManualSource],
+    previous: Optional[ManualIndex] = None,
+    stale: Iterable[str] = (),
+) -> dict[str, int]:
+    """Write a new index for ``sources`` to ``path`` and return build counters.
+
+    Manuals whose ETag matches ``previous`` reuse its stored sections; only
+    new or changed manuals, and those named in ``stale``, call their loader.
+    When nothing changed since ``previous``, ``path`` is left as it is.
+    Tokens longer than ``MAX_TERM_CHARS`` count towards section length but
+    are not searchable.
+    """
+    reused_versions = {doc["machine"]: doc["etag"] for doc in previous.documents} if previous else {}
+    sources = list(sources)
+    stale = set(stale)
+    if previous is not None and not stale and {s.machine: s.etag for s in sources} == reused_versions:
+        return {"reindexed": 0, "reused": len(sources), "removed": 0}
+    stats = {"reindexed": 0, "reused": 0, "removed": 0}
+    docs: list[dict] = []
+    sections: list[tuple[int, str, str, list[str]]] = []
+    seen: set[str] = set()
+    for source in sorted(sources, key=lambda item: item.machine):
+        seen.add(source.machine)
+        if (
+            previous is not None
+            and source.machine not in stale
+            and reused_versions.get(source.machine) == source.etag
+        ):
+            pairs = previous.sections_of(source.machine)
+            stats["reused"] += 1
+        else:
+            text = source.load()
+            if text is None:
+                continue
+            pairs = [(s.heading, s.text) for s in split_sections(text)]
+            stats["reindexed"] += 1
+        docs.append(
+            {"machine": source.machine, "etag": source.etag, "first": len(sections), "count": len(pairs)}
+        )
+        for heading, text in pairs:
+            sections.append((len(docs) - 1, heading, text, tokenize(text)))
+    stats["removed"] = len(set(reused_versions) - seen)
+
+    strings = bytearray()
+
+    def intern(value: str) -> tuple[int, int]:
+        encoded = value.encode("utf-8")
+        offset = len(strings)
+        strings.extend(encoded)
+        return offset, len(encoded)
+
+    inverted: dict[str, list[tuple[int, int]]] = {}
+    section_table = bytearray()
+    total_length = 0
+    for section_id, (doc, heading, text, tokens) in enumerate(sections):
+        for term, tf in Counter(tokens).items():
+            if len(term) <= MAX_TERM_CHARS:
+                inverted.setdefault(term, []).append((section_id, min(tf, 0xFFFF)))
+        head_off, head_len = intern(_fit_heading(heading))
+        text_off, text_len = intern(text)
+        section_table += _SECTION.pack(doc, head_off, head_len, text_off, text_len, len(tokens))
+        total_length += len(tokens)
+
+    term_table = bytearray()
+    postings = bytearray()
+    posting_count = 0
+    for term in sorted(inverted, key=lambda value: value.encode("utf-8")):
+        entries = inverted[term]
+        str_off, str_len = intern(term)
+        term_table += _TERM.pack(str_off, str_len, posting_count, len(entries))
+        for section_id, tf in entries:
+            postings += _POSTING.pack(section_id, tf)
+        posting_count += len(entries)
+
+    meta = json.dumps(
+        {"docs": docs, "avgdl": (total_length / len(sections)) if sections else 0.0},
+        separators=(",", ":"),
+    ).encode("utf-8")
+    terms_off = _HEADER.size
+    postings_off = terms_off + len(term_table)
+    sections_off = postings_off + len(postings)
+    strings_off = sections_off + len(section_table)
+    meta_off = strings_off + len(strings)
+    header = _HEADER.pack(
+        _MAGIC,
+        _VERSION,
+        0,
+        len(inverted),
+        len(sections),
+        terms_off,
+        postings_off,
+        sections_off,
+        strings_off,
+        meta_off,
+        len(meta),
+    )
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as handle:
+        for region in (header, term_table, postings, section_table, strings, meta):
+            handle.write(region)
+    os.replace(tmp, path)
+    return stats
+
+
+def _fit_heading(heading: str) -> str:
+    """``heading`` cut to the 65,535 UTF-8 bytes its length field can hold."""
+    encoded = heading.encode("utf-8")
+    if len(encoded) <= 0xFFFF:
+        return heading
+    return encoded[:0xFFFF].decode("utf-8", errors="ignore")
+
+
+def list_manual_sources(tool_impl: Optional[ManualsTool] = None) -> list[ManualSource]:
+    """Enumerate manuals with their version tags from blob storage or disk."""
+    tool_impl = tool_impl or ManualsTool()
+    sources: list[ManualSource] = []
+    container_client = get_container_client(tool_impl.connection_string, tool_impl.container_name)
+    if container_client is not None:
+        try:
+            for blob in container_client.list_blobs():
+                if blob.name.endswith(".md"):
+                    machine = blob.name[: -len(".md")]
+                    sources.append(
+                        ManualSource(machine, str(blob.etag), _loader(tool_impl, machine))
+                    )
+        except Exception:
+            sources = []
+    if not sources and tool_impl.fallback_path.exists():
+        for manual in sorted(tool_impl.fallback_path.glob("*.md")):
+            stat = manual.stat()
+            sources.append(
+                ManualSource(
+                    manual.stem, f"{stat.st_mtime_ns}-{stat.st_size}", _loader(tool_impl, manual.stem)
+                )
+            )
+    return sources
+
+
+def _loader(tool_impl: ManualsTool, machine: str) -> Callable[[], Optional[str]]:
+    return lambda: tool_impl.load_manual(machine)
+
+
+def default_index_path() -> Path:
+    """Index location from ``MANUALS_INDEX_PATH`` or the temp directory."""
+    configured = os.environ.get("MANUALS_INDEX_PATH")
+    if configured:
+        return Path(configured)
+    return Path(tempfile.gettempdir()) / "machine-bot" / "manuals.idx"
+
+
+_STATE_LOCK = threading.Lock()
+# Serialises rebuilds; searches only take ``_STATE_LOCK``.
+_BUILD_LOCK = threading.Lock()
+_STATE: dict[str, object] = {"index": None, "path": None, "refreshed_at": 0.0, "refreshing": False}
+
+
+def _refresh_interval() -> float:
+    return float(os.environ.get("MANUALS_INDEX_REFRESH_SECONDS", DEFAULT_REFRESH_SECONDS))
+
+
+def _open_index(path: Path) -> Optional[ManualIndex]:
+    if not path.exists():
+        return None
+    try:
+        return ManualIndex(path)
+    except (OSError, ValueError):
+        return None
+
+
+def refresh_manual_index(force: bool = False, stale: Iterable[str] = ()) -> Optional[ManualIndex]:
+    """Incrementally rebuild the process-wide index when it is due.
+
+    The index is refreshed at most every ``MANUALS_INDEX_REFRESH_SECONDS``
+    unless ``force`` is set; an existing index file from an earlier worker is
+    loaded first so a restart does not re-download unchanged manuals.
+    Machines in ``stale`` are re-read even if their ETag did not change.
+    Searches keep using the current index while this runs.
+    """
+    path = default_index_path()
+    with _BUILD_LOCK:
+        with _STATE_LOCK:
+            index = _STATE["index"] if _STATE["path"] == path else None
+            if index is not None and not force and time.time() - _STATE["refreshed_at"] < _refresh_interval():
+                return index
+        if index is None:
+            index = _open_index(path)
+        try:
+            stats = build_index(path, list_manual_sources(), previous=index, stale=stale)
+            unchanged = index is not None and not stats["reindexed"] and not stats["removed"]
+            fresh = index if unchanged else ManualIndex(path)
+        except OSError:
+            return index
+        # Readers holding the old mapping keep a valid view of the old file.
+        with _STATE_LOCK:
+            _STATE.update(index=fresh, path=path, refreshed_at=time.time())
+        return fresh
+
+
+def current_manual_index(wait: bool = True) -> Optional[ManualIndex]:
+    """The index to search, refreshed on a background thread when due.
+
+    Without an index in memory or on disk the first call builds one (or,
+    without ``wait``, starts the build and returns ``None``).
+    """
+    path = default_index_path()
+    with _STATE_LOCK:
+        index = _STATE["index"] if _STATE["path"] == path else None
+        if index is None:
+            index = _open_index(path)
+            if index is not None:
+                # Left by an earlier worker: served now, refreshed below.
+                _STATE.update(index=index, path=path, refreshed_at=0.0)
+        due = index is not None and time.time() - _STATE["refreshed_at"] >= _refresh_interval()
+        start = (due or (index is None and not wait)) and not _STATE["refreshing"]
+        if start:
+            _STATE["refreshing"] = True
+    if start:
+        threading.Thread(target=_refresh_in_background, name="manual-index", daemon=True).start()
+    if index is None and wait:
+        index = refresh_manual_index()
+    return index
+
+
+def _refresh_in_background() -> None:
+    try:
+        refresh_manual_index()
+    except Exception:
+        logging.exception("Refreshing the manual search index failed")
+    finally:
+        with _STATE_LOCK:
+            _STATE["refreshing"] = False
+
+
+def manual_index_exists() -> bool:
+    """Whether this worker holds an index or can load one from disk."""
+    with _STATE_LOCK:
+        return _STATE["index"] is not None or default_index_path().exists()
+
+
+def format_hits(query: str, hits: list[SearchHit]) -> str:
+    if not hits:
+        return f"No manual matches '{query}'."
+    return "\n".join(
+        f"{i}. {hit.machine} — {hit.section}: {hit.snippet}" for i, hit in enumerate(hits, start=1)
+    )
+
+
+@tool(
+    "search_manuals",
+    description=(
+        "Search all machine manuals at once. Returns the machine, section and a "
+        "snippet for each match; use it to find which machine covers a topic."
+    ),
+)
+def search_manuals(query: str, limit: int = DEFAULT_LIMIT) -> str:
+    index = current_manual_index()
+    if index is None:
+        return "Manual search index is unavailable."
+    hits = index.search(query, limit=max(1, min(limit, 20)))
+    versions = {doc["machine"]: doc["etag"] for doc in index.documents}
+    for hit in hits:
+        record_manual_read(hit.machine, versions.get(hit.machine))
+    return format_hits(query, hits)
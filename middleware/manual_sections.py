@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+"""Section-level retrieval over machine manuals.
+
+Manuals are split on their ``##`` headings and ranked against a query with
+an in-process BM25 index, so the agent receives only the few relevant
+sections instead of the whole markdown document.
+"""
+
+import hashlib
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+
+from langchain_core.tools import tool
+
+from .manuals_tools import ManualsTool
+
+DEFAULT_TOP_K = 3
+# Upper bound on the characters returned per call, independent of manual size.
+MAX_RESULT_CHARS = 4000
+_INDEX_CACHE_SIZE = 64
+
+_HEADING_RE = re.compile(r"^#{1,2}\s+\S")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how i in is it of on or the this "
+    "to what when where which with my me can should".split()
+)
+
+
+@dataclass
+class Section:
+    """A heading-delimited chunk of a manual."""
+
+    heading: str
+    text: str
+    position: int
+    tokens: list[str] = field(default_factory=list, repr=False)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-case alphanumeric tokens with common stopwords removed."""
+    return [tok for tok in _TOKEN_RE.findall(text.lower()) if tok not in _STOPWORDS]
+
+
+def split_sections(markdown: str) -> list[Section]:
+    """Split ``markdown`` into sections at level-1 and level-2 headings.
+
+    Deeper headings stay inside their parent section. Text before the first
+    heading (or under the document title) becomes its own section.
+    """
+    sections: list[Section] = []
+    heading = ""
+    lines: list[str] = []
+
+    def flush() -> None:
+        body = "\n".join(lines).strip().strip("-").strip()
+        if body or heading:
+            text = f"{heading}\n{body}".strip() if heading else body
+            title = heading.lstrip("#").strip()
+            sections.append(Section(title, text, len(sections), tokenize(text)))
+
+    for line in markdown.splitlines():
+        if _HEADING_RE.match(line):
+            flush()
+            heading, lines = line.strip(), []
+        else:
+            lines.append(line)
+    flush()
+    return sections
+
+
+class BM25Index:
+    """Okapi BM25 ranking over a fixed list of sections."""
+
+    def __init__(self, sections: list[Section], k1: float = 1.5, b: float = 0.75) -> None:
+        self.sections = sections
+        self.k1 = k1
+        self.b = b
+        self._term_freqs = [Counter(section.tokens) for section in sections]
+        self._lengths = [len(section.tokens) for section in sections]
+        self._avg_length = (sum(self._lengths) / len(sections)) if sections else 0.0
+        doc_freq: Counter[str] = Counter()
+        for freqs in self._term_freqs:
+            doc_freq.update(freqs.keys())
+        total = len(sections)
+        self._idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()
+        }
+
+    def score(self, query_tokens: list[str], position: int) -> float:
+        freqs = self._term_freqs[position]
+        norm = self.k1 * (1 - self.b + self.b * self._lengths[position] / (self._avg_length or 1))
+        total = 0.0
+        for term in query_tokens:
+            tf = freqs.get(term)
+            if tf:
+                total += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+        return total
+
+    def search(self, query: str, top_k: int = DEFAULT_TOP_K) -> list[tuple[Section, float]]:
+        """Return up to ``top_k`` ``(section, score)`` pairs with a positive score."""
+        query_tokens = tokenize(query)
+        scored = [
+            (section, self.score(query_tokens, section.position)) for section in self.sections
+        ]
+        ranked = sorted(
+            (pair for pair in scored if pair[1] > 0), key=lambda pair: (-pair[1], pair[0].position)
+        )
+        return ranked[:top_k]
+
+
+_INDEXES: OrderedDict[str, BM25Index] = OrderedDict()
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_section_index(markdown: str) -> BM25Index:
+    """Return a cached BM25 index for ``markdown`` (keyed by content hash)."""
+    key = hashlib.sha1(markdown.encode("utf-8")).hexdigest()
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is not None:
+            _INDEXES.move_to_end(key)
+            return index
+    index = BM25Index(split_sections(markdown))
+    with _INDEXES_LOCK:
+        _INDEXES[key] = index
+        while len(_INDEXES) > _INDEX_CACHE_SIZE:
+            _INDEXES.popitem(last=False)
+    return index
+
+
+def format_sections(
+    machine_name: str, query: str, hits: list[tuple[Section, float]], index: BM25Index
+) -> str:
+    """Render ranked sections, truncated to :data:`MAX_RESULT_CHARS` in total."""
+    if not hits:
+        text = f"No section of '{machine_name}' matches '{query}'. Available sections:"
+        headings = [f"- {s.heading}" for s in index.sections if s.heading]
+        # Room is kept for the line counting the headings left out.
+        budget = MAX_RESULT_CHARS - len(text) - 32
+        for shown, line in enumerate(headings):
+            if len(line) + 1 > budget:
+                return f"{text}\n- … and {len(headings) - shown} more"
+            text += "\n" + line
+            budget -= len(line) + 1
+        return text
+    budget = MAX_RESULT_CHARS
+    parts: list[str] = []
+    for section, _ in hits:
+        if budget <= 0:
+            break
+        text = section.text if len(section.text) <= budget else section.text[:budget] + " …"
+        budget -= len(text)
+        parts.append(text)
+    return "\n\n---\n\n".join(parts)
+
+
+@tool(
+    "manual_sections",
+    description=(
+        "Return only the sections of a machine manual relevant to a question. "
+        "Prefer this over manuals_tool when the question is about a specific topic."
+    ),
+)
+def manual_sections(machine_name: str, query: str, top_k: int = DEFAULT_TOP_K) -> str:
+    tool_impl = ManualsTool()
+    text, resolved = tool_impl.find_manual(machine_name)
+    if text is None:
+        return tool_impl.not_found_message(machine_name)
+    index = get_section_index(text)
+    hits = index.search(query, top_k=max(1, min(top_k, 10)))
+    sections = format_sections(resolved, query, hits, index)
+    if resolved != machine_name:
+        return f"Sections of '{resolved}' (requested as '{machine_name}'):\n\n{sections}"
+    return sections
@@ -0,0 +1,408 @@
+from __future__ import annotations
+
+"""Structured machine specs extracted from the manuals.
+
+Manuals state their facts as ``**Label:** value`` lines (model, power
+supply, dimensions, weight, ...) and as tables (maintenance intervals,
+troubleshooting and error codes). :func:`extract_specs` turns those into
+``Spec`` records, and :class:`SpecStore` keeps them per machine in one small
+JSON file. Like the search index, the store is rebuilt incrementally: only
+manuals whose ETag changed are read again.
+
+The ``machine_spec`` tool answers a single field from the store instead of
+sending the whole manual to the model. :meth:`SpecStore.answer` goes one step
+further for the graph's optional pre-LLM fast path: it answers a question
+that names exactly one machine and nothing but one of its spec fields, and
+returns ``None`` for everything else.
+
+Settings (environment variables):
+
+``MANUALS_SPECS_PATH``
+    Location of the store (default ``<tmp>/machine-bot/manual-specs.json``).
+``MANUALS_SPECS_REFRESH_SECONDS``
+    Age after which a lookup refreshes the store on a background thread
+    (default 300).
+
+Lookups never rebuild the store themselves: the timer and the change feed
+refresh it, and :func:`current_spec_store` starts a background refresh on
+every instance whose store is missing or older than the refresh interval.
+"""
+
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+from langchain_core.tools import tool
+
+from .manual_cache import _atomic_write, record_manual_read
+from .manual_search import ManualSource, list_manual_sources
+
+DEFAULT_REFRESH_SECONDS = 300.0
+# Share of a label's terms a question must name for the fast path.
+MIN_LABEL_COVERAGE = 0.5
+
+_FIELD_RE = re.compile(r"^\s*(?:[-*]\s+)?\*\*(?P<label>[^*:]+?):?\*\*:?\s*(?P<value>\S.*?)\s*$")
+_HEADING_RE = re.compile(r"^#{1,6}\s+(?:\d+(?:\.\d+)*\.?\s+)?(?P<title>.+?)\s*$")
+_RULE_RE = re.compile(r"^\|?\s*:?-{2,}")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("a an and are at by for from in is it of on or the to with".split())
+# Words that shape a question without naming what it asks for.
+_QUESTION_WORDS = _STOPWORDS | frozenset(
+    "what which how does do did is are am be has have can could should would when where why "
+    "its my our this that me tell give show please much many often long use uses used need "
+    "value spec specs specification specifications mean means".split()
+)
+# Question words standing for the terms of a spec label.
+_SYNONYMS = {
+    "voltage": ("power", "supply"),
+    "volt": ("power", "supply"),
+    "electrical": ("power", "supply"),
+    "size": ("dimension",),
+    "big": ("dimension",),
+    "large": ("dimension",),
+    "heavy": ("weight",),
+    "weigh": ("weight",),
+    "mass": ("weight",),
+}
+
+
+@dataclass
+class Spec:
+    """One fact of a manual: its label as written, value and section."""
+
+    label: str
+    value: str
+    section: str = ""
+
+
+def spec_terms(text: str) -> list[str]:
+    """Lower-case content words of ``text``, plural ``s`` removed."""
+    terms: list[str] = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if len(token) < 2 or token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+def spec_key(label: str) -> str:
+    return "_".join(spec_terms(label))
+
+
+def extract_specs(markdown: str) -> dict[str, Spec]:
+    """Parse the ``**Label:** value`` lines and table rows of ``markdown``.
+
+    A table row becomes a spec labelled by its first cell, with the other
+    cells as ``Header: value`` pairs. The first occurrence of a key wins.
+    """
+    specs: dict[str, Spec] = {}
+    section = ""
+    table: list[list[str]] = []
+
+    def add(label: str, value: str) -> None:
+        key = spec_key(label)
+        if key and value and key not in specs:
+            specs[key] = Spec(label.strip(), value.strip(), section)
+
+    def flush_table() -> None:
+        if len(table) > 1:
+            header = table[0]
+            for row in table[1:]:
+                pairs = [f"{name}: {cell}" for name, cell in zip(header[1:], row[1:]) if cell]
+                add(row[0], "; ".join(pairs))
+        table.clear()
+
+    for line in markdown.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("|"):
+            if not _RULE_RE.match(stripped):
+                table.append([cell.strip() for cell in stripped.strip("|").split("|")])
+            continue
+        flush_table()
+        heading = _HEADING_RE.match(stripped)
+        if heading:
+            section = heading.group("title")
+            continue
+        field = _FIELD_RE.match(line)
+        if field:
+            add(field.group("label"), field.group("value"))
+    flush_table()
+    return specs
+
+
+class SpecStore:
+    """Specs of every manual, keyed by machine, with the ETag they came from."""
+
+    def __init__(self, machines: Optional[dict[str, dict]] = None) -> None:
+        # {machine: {"etag": str, "specs": {key: Spec}}}
+        self.machines: dict[str, dict] = machines or {}
+        self._names = {machine.lower(): machine for machine in self.machines}
+        # First word of each machine name -> (all its words, name), to spot
+        # names in a question without scanning every machine.
+        self._by_word: dict[str, list[tuple[tuple[str, ...], str]]] = {}
+        for machine in self.machines:
+            words = tuple(_TOKEN_RE.findall(machine.lower()))
+            if words:
+                self._by_word.setdefault(words[0], []).append((words, machine))
+
+    # persistence ----------------------------------------------------------
+    @classmethod
+    def load(cls, path: str | Path) -> "SpecStore":
+        raw = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(
+            {
+                machine: {"etag": doc["etag"], "specs": {key: Spec(**spec) for key, spec in doc["specs"].items()}}
+                for machine, doc in raw["machines"].items()
+            }
+        )
+
+    def save(self, path: str | Path) -> None:
+        raw = {
+            "machines": {
+                machine: {"etag": doc["etag"], "specs": {key: asdict(spec) for key, spec in doc["specs"].items()}}
+                for machine, doc in self.machines.items()
+            }
+        }
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(Path(path), json.dumps(raw, separators=(",", ":"), sort_keys=True))
+
+    # querying -------------------------------------------------------------
+    def name(self, machine: str) -> Optional[str]:
+        """The stored spelling of ``machine`` (case and ``.md`` ignored)."""
+        return self._names.get(_machine_key(machine).lower())
+
+    def specs(self, machine: str) -> Optional[dict[str, Spec]]:
+        doc = self.machines.get(self.name(machine) or "")
+        return doc["specs"] if doc is not None else None
+
+    def etag(self, machine: str) -> Optional[str]:
+        doc = self.machines.get(self.name(machine) or "")
+        return doc["etag"] if doc is not None else None
+
+    def lookup(self, machine: str, field: str) -> Optional[Spec]:
+        """The spec of ``machine`` best matching ``field``, or ``None``."""
+        specs = self.specs(machine) or {}
+        exact = specs.get(spec_key(field))
+        if exact is not None:
+            return exact
+        wanted = set(_expand(spec_terms(field)))
+        best, best_score = None, 0.0
+        for key, spec in specs.items():
+            label = set(key.split("_"))
+            overlap = len(wanted & label)
+            score = overlap + overlap / len(label) if overlap else 0.0
+            if score > best_score:
+                best, best_score = spec, score
+        return best
+
+    def answer(self, question: str) -> Optional[tuple[str, Spec]]:
+        """``(machine, spec)`` when ``question`` only asks for one spec of one machine."""
+        words = _TOKEN_RE.findall(question.lower())
+        machines: set[str] = set()
+        rest: list[str] = []
+        position = 0
+        while position < len(words):
+            for name_words, machine in self._by_word.get(words[position], ()):
+                if tuple(words[position : position + len(name_words)]) == name_words:
+                    machines.add(machine)
+                    position += len(name_words)
+                    break
+            else:
+                rest.append(words[position])
+                position += 1
+        if len(machines) != 1:
+            return None
+        machine = machines.pop()
+        asked = spec_terms(" ".join(word for word in rest if word not in _QUESTION_WORDS))
+        if not asked:
+            return None
+        matches = []
+        for key, spec in self.machines[machine]["specs"].items():
+            label = set(key.split("_"))
+            # Every asked word must belong to the label, and the question
+            # must name a fair share of it.
+            if not all(label & set(_expand([term])) for term in asked):
+                continue
+            coverage = len(label & set(_expand(asked))) / len(label)
+            if coverage >= MIN_LABEL_COVERAGE:
+                matches.append((coverage, spec))
+        matches.sort(key=lambda match: -match[0])
+        if not matches or (len(matches) > 1 and matches[0][0] == matches[1][0]):
+            return None
+        return machine, matches[0][1]
+
+
+def _machine_key(machine: str) -> str:
+    machine = machine.strip()
+    return machine[: -len(".md")] if machine.endswith(".md") else machine
+
+
+def _expand(terms: Iterable[str]) -> list[str]:
+    expanded: list[str] = []
+    for term in terms:
+        expanded.extend(_SYNONYMS.get(term, (term,)))
+    return expanded
+
+
+def build_spec_store(
+    sources: Iterable[ManualSource], previous: Optional[SpecStore] = None, stale: Iterable[str] = ()
+) -> tuple[SpecStore, dict[str, int]]:
+    """Extract the specs of ``sources``, reusing ``previous`` for unchanged ETags."""
+    previous = previous or SpecStore()
+    stale = {_machine_key(machine).lower() for machine in stale}
+    stats = {"extracted": 0, "reused": 0, "removed": 0}
+    machines: dict[str, dict] = {}
+    for source in sources:
+        machine = _machine_key(source.machine)
+        kept = previous.machines.get(machine)
+        if kept is not None and machine.lower() not in stale and kept["etag"] == source.etag:
+            machines[machine] = kept
+            stats["reused"] += 1
+            continue
+        text = source.load()
+        if text is None:
+            continue
+        machines[machine] = {"etag": source.etag, "specs": extract_specs(text)}
+        stats["extracted"] += 1
+    stats["removed"] = len(set(previous.machines) - set(machines))
+    return SpecStore(machines), stats
+
+
+def default_specs_path() -> Path:
+    """Store location from ``MANUALS_SPECS_PATH`` or the temp directory."""
+    configured = os.environ.get("MANUALS_SPECS_PATH")
+    if configured:
+        return Path(configured)
+    return Path(tempfile.gettempdir()) / "machine-bot" / "manual-specs.json"
+
+
+_STATE_LOCK = threading.Lock()
+# Serialises rebuilds; lookups only take ``_STATE_LOCK``.
+_BUILD_LOCK = threading.Lock()
+_STATE: dict[str, object] = {"store": None, "path": None, "refreshed_at": 0.0, "refreshing": False}
+
+
+def _refresh_interval() -> float:
+    return float(os.environ.get("MANUALS_SPECS_REFRESH_SECONDS", DEFAULT_REFRESH_SECONDS))
+
+
+def refresh_spec_store(force: bool = False, stale: Iterable[str] = ()) -> Optional[SpecStore]:
+    """Incrementally rebuild the process-wide store when it is due.
+
+    Mirrors :func:`~middleware.manual_search.refresh_manual_index`: refreshed
+    at most every ``MANUALS_SPECS_REFRESH_SECONDS`` unless ``force`` is set,
+    starting from the file an earlier worker left behind.
+    """
+    path = default_specs_path()
+    with _BUILD_LOCK:
+        with _STATE_LOCK:
+            store = _STATE["store"] if _STATE["path"] == path else None
+            if store is not None and not force and time.time() - _STATE["refreshed_at"] < _refresh_interval():
+                return store
+        if store is None:
+            store = _load(path)
+        fresh, _ = build_spec_store(list_manual_sources(), previous=store, stale=stale)
+        try:
+            fresh.save(path)
+        except OSError:
+            pass
+        with _STATE_LOCK:
+            _STATE.update(store=fresh, path=path, refreshed_at=time.time())
+        return fresh
+
+
+def current_spec_store(wait: bool = False) -> Optional[SpecStore]:
+    """The store as last refreshed, without touching blob storage.
+
+    A store that is missing or older than ``MANUALS_SPECS_REFRESH_SECONDS``
+    is refreshed on a background thread, so instances the timer does not run
+    on build their own. With ``wait``, a missing store is built first.
+    """
+    path = default_specs_path()
+    with _STATE_LOCK:
+        store = _STATE["store"] if _STATE["path"] == path else None
+        if store is None:
+            store = _load(path)
+            if store is not None:
+                # Loaded, not refreshed: refreshed below like a stale store.
+                _STATE.update(store=store, path=path, refreshed_at=0.0)
+        due = store is None or time.time() - _STATE["refreshed_at"] >= _refresh_interval()
+        start = due and not (store is None and wait) and not _STATE["refreshing"]
+        if start:
+            _STATE["refreshing"] = True
+    if start:
+        threading.Thread(target=_refresh_in_background, name="manual-specs", daemon=True).start()
+    if store is None and wait:
+        store = refresh_spec_store()
+    return store
+
+
+def _refresh_in_background() -> None:
+    try:
+        refresh_spec_store()
+    except Exception:
+        logging.exception("Refreshing the spec store failed")
+    finally:
+        with _STATE_LOCK:
+            _STATE["refreshing"] = False
+
+
+def spec_store_exists() -> bool:
+    """Whether this worker holds a store or can load one from disk."""
+    with _STATE_LOCK:
+        return _STATE["store"] is not None or default_specs_path().exists()
+
+
+def _load(path: Path) -> Optional[SpecStore]:
+    try:
+        return SpecStore.load(path)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def answer_from_specs(question: str) -> Optional[str]:
+    """Answer ``question`` from the current store, or ``None`` to ask the model."""
+    store = current_spec_store()
+    found = store.answer(question) if store is not None else None
+    if found is None:
+        return None
+    machine, spec = found
+    record_manual_read(machine, store.etag(machine))
+    return f"{spec.label} ({machine}): {spec.value}"
+
+
+def format_spec(machine: str, spec: Spec) -> str:
+    section = f" [section: {spec.section}]" if spec.section else ""
+    return f"{machine} — {spec.label}: {spec.value}{section}"
+
+
+@tool(
+    "machine_spec",
+    description=(
+        "Look up one specification of a machine (e.g. power supply, dimensions, "
+        "weight, a maintenance interval or an error code) without loading its "
+        "manual. Leave field empty to list the available fields."
+    ),
+)
+def machine_spec(machine: str, field: str = "") -> str:
+    store = current_spec_store(wait=True)
+    specs = store.specs(machine) if store is not None else None
+    if specs is None:
+        return f"No specifications found for '{machine}'."
+    machine = store.name(machine)
+    record_manual_read(machine, store.etag(machine))
+    spec = store.lookup(machine, field) if field.strip() else None
+    if spec is None:
+        labels = "\n".join(f"- {spec.label}" for spec in specs.values())
+        prefix = f"No field of '{machine}' matches '{field}'. " if field.strip() else ""
+        return f"{prefix}Available fields:\n{labels}"
+    return format_spec(machine, spec)
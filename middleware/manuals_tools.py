@@ -2,10 +2,27 @@ from __future__ import annotations
 
 """Tools for fetching machine manuals from Azure Blob Storage."""
 
+import asyncio
 import os
+import threading
+import weakref
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
+from .manual_cache import (
+    CachedManual,
+    ManualCache,
+    get_manual_cache,
+    record_manual_read,
+    track_manual_reads,
+)
+from .manual_listing import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, format_listing, get_manual_listing
+from .manual_mirror import DEFAULT_WORKERS as DEFAULT_MIRROR_WORKERS
+from .manual_mirror import get_manual_mirror
+from .manual_names import get_name_index
+from .telemetry import record_bytes, step
+
 try:  # pragma: no cover - exercised in environments without langchain
     from langchain.tools import BaseTool
     from langchain_community.document_loaders.azure_blob_storage_container import (
@@ -34,9 +51,15 @@ except Exception:  # pragma: no cover
     AzureBlobStorageContainerLoader = AzureBlobStorageFileLoader = None  # type: ignore
 
 try:  # pragma: no cover - optional dependency
+    from azure.core import MatchConditions
     from azure.storage.blob import BlobServiceClient
 except Exception:  # pragma: no cover
-    BlobServiceClient = None  # type: ignore[assignment]
+    BlobServiceClient = MatchConditions = None  # type: ignore[assignment]
+
+try:  # pragma: no cover - optional dependency (needs aiohttp at request time)
+    from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+except Exception:  # pragma: no cover
+    AsyncBlobServiceClient = None  # type: ignore[assignment]
 
 try:  # pragma: no cover - pydantic may be absent in minimal envs
     from pydantic import BaseModel, Field, PrivateAttr
@@ -52,6 +75,144 @@ except Exception:  # pragma: no cover
     def PrivateAttr(default=None):
         return default
 
+class ContainerClientPool:
+    """Process-wide, thread-safe cache of blob container clients.
+
+    Service clients are keyed by connection string and container clients by
+    ``(connection_string, container_name)`` so every tool instance reuses the
+    same HTTP pipeline and its pooled keep-alive connections instead of
+    parsing the connection string and opening a new TLS session per call.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._service_clients: dict[str, object] = {}
+        self._container_clients: dict[tuple[str, str], object] = {}
+
+    def get(self, connection_string: Optional[str], container_name: str):
+        """Return a shared container client or ``None`` when unavailable."""
+        if not connection_string or BlobServiceClient is None:
+            return None
+        key = (connection_string, container_name)
+        client = self._container_clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._container_clients.get(key)
+            if client is not None:
+                return client
+            try:
+                service_client = self._service_clients.get(connection_string)
+                if service_client is None:
+                    service_client = BlobServiceClient.from_connection_string(
+                        connection_string
+                    )
+                    self._service_clients[connection_string] = service_client
+                client = service_client.get_container_client(container_name)
+            except Exception:
+                # Failures are not cached so a fixed setting is picked up later.
+                return None
+            self._container_clients[key] = client
+            return client
+
+    def clear(self) -> None:
+        """Drop every pooled client, closing their transports."""
+        with self._lock:
+            service_clients = list(self._service_clients.values())
+            self._service_clients.clear()
+            self._container_clients.clear()
+        for service_client in service_clients:
+            try:
+                service_client.close()
+            except Exception:
+                pass
+
+
+CONTAINER_POOL = ContainerClientPool()
+
+
+def get_container_client(connection_string: Optional[str], container_name: str):
+    """Return the pooled container client for ``connection_string``/``container_name``."""
+    return CONTAINER_POOL.get(connection_string, container_name)
+
+
+class AsyncContainerClientPool:
+    """Cache of ``azure.storage.blob.aio`` container clients per event loop.
+
+    Async clients own an aiohttp session bound to the loop that created it,
+    so each running loop gets its own service and container clients.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loops: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def get(self, connection_string: Optional[str], container_name: str):
+        """Return a container client for the running loop or ``None``."""
+        if not connection_string or AsyncBlobServiceClient is None:
+            return None
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            services, containers = self._loops.setdefault(loop, ({}, {}))
+            key = (connection_string, container_name)
+            client = containers.get(key)
+            if client is not None:
+                return client
+            try:
+                service_client = services.get(connection_string)
+                if service_client is None:
+                    service_client = AsyncBlobServiceClient.from_connection_string(
+                        connection_string
+                    )
+                    services[connection_string] = service_client
+                client = service_client.get_container_client(container_name)
+            except Exception:
+                return None
+            containers[key] = client
+            return client
+
+    async def aclose(self) -> None:
+        """Close the clients of the running loop."""
+        with self._lock:
+            services, _ = self._loops.pop(asyncio.get_running_loop(), ({}, {}))
+        for service_client in services.values():
+            try:
+                await service_client.close()
+            except Exception:
+                pass
+
+
+ASYNC_CONTAINER_POOL = AsyncContainerClientPool()
+
+
+def get_async_container_client(connection_string: Optional[str], container_name: str):
+    """Return the pooled async container client for the running event loop."""
+    return ASYNC_CONTAINER_POOL.get(connection_string, container_name)
+
+
+def _machine_name_from(args: tuple, kwargs: dict) -> str:
+    machine_name = None
+    if "machine_name" in kwargs:
+        machine_name = kwargs.get("machine_name")
+    elif "tool_input" in kwargs:
+        ti = kwargs.get("tool_input")
+        if isinstance(ti, dict):
+            machine_name = ti.get("machine_name")
+        else:
+            machine_name = getattr(ti, "machine_name", None)
+    elif len(args) == 1:
+        arg = args[0]
+        if isinstance(arg, str):
+            machine_name = arg
+        elif isinstance(arg, dict):
+            machine_name = arg.get("machine_name")
+        else:
+            machine_name = getattr(arg, "machine_name", None)
+    if not machine_name:
+        raise TypeError("Missing required argument 'machine_name'")
+    return machine_name
+
+
 class ManualToolInput(BaseModel):
     """Input schema for :class:`ManualsTool`."""
 
@@ -85,78 +246,255 @@ class ManualsTool(BaseTool):
             if fallback_path is not None
             else os.environ.get("MANUALS_MD_PATH", "manuals-md"),
         )
-        if self.connection_string and BlobServiceClient is not None:
-            try:
-                service_client = BlobServiceClient.from_connection_string(
-                    self.connection_string
-                )
-                self._container_client = service_client.get_container_client(
-                    self.container_name
-                )
-            except Exception:
-                self._container_client = None
+        self._container_client = get_container_client(
+            self.connection_string, self.container_name
+        )
 
     def run(self, *args, **kwargs):
         """Flexible run wrapper to support different call signatures."""
-        machine_name = None
-        if "machine_name" in kwargs:
-            machine_name = kwargs.get("machine_name")
-        elif "tool_input" in kwargs:
-            ti = kwargs.get("tool_input")
-            if isinstance(ti, dict):
-                machine_name = ti.get("machine_name")
-            else:
-                machine_name = getattr(ti, "machine_name", None)
-        elif len(args) == 1:
-            arg = args[0]
-            if isinstance(arg, str):
-                machine_name = arg
-            elif isinstance(arg, dict):
-                machine_name = arg.get("machine_name")
-            else:
-                machine_name = getattr(arg, "machine_name", None)
-        if not machine_name:
-            raise TypeError("Missing required argument 'machine_name'")
-        return self._run(machine_name=machine_name)
+        return self._run(machine_name=_machine_name_from(args, kwargs))
+
+    async def arun(self, *args, **kwargs):
+        """Async counterpart of :meth:`run`."""
+        return await self._arun(machine_name=_machine_name_from(args, kwargs))
 
     # pylint: disable=unused-argument
     def _run(self, machine_name: str) -> str:  # type: ignore[override]
-        blob_name = machine_name if machine_name.endswith(".md") else f"{machine_name}.md"
-        
-        # Try Azure Blob Storage directly (without langchain loaders to avoid unstructured dependency)
-        if self.connection_string and BlobServiceClient is not None:
-            try:
-                service_client = BlobServiceClient.from_connection_string(
-                    self.connection_string
-                )
-                container_client = service_client.get_container_client(
-                    self.container_name
-                )
-                blob_client = container_client.get_blob_client(blob_name)
-                if blob_client.exists():
-                    blob_data = blob_client.download_blob()
-                    return blob_data.readall().decode("utf-8")
-            except Exception:
-                pass
-        
-        # Fallback to local file
+        text, resolved = self.find_manual(machine_name)
+        return self._answer(machine_name, text, resolved)
+
+    def not_found_message(self, machine_name: str) -> str:
+        return f"Machine file '{self.fallback_path / self._blob_name(machine_name)}' not found"
+
+    def find_manual(self, machine_name: str) -> tuple[Optional[str], str]:
+        """Return ``(text, machine)`` for ``machine_name`` or the manual it approximates.
+
+        The exact name is tried first, so a correct name costs nothing
+        extra; only a miss consults the name index (see
+        :mod:`middleware.manual_names`).
+        """
+        text = self.load_manual(machine_name)
+        if text is not None:
+            return text, machine_name
+        resolved = self._resolve(machine_name, get_name_index(self))
+        if resolved is None:
+            return None, machine_name
+        return self.load_manual(resolved), resolved
+
+    async def afind_manual(self, machine_name: str) -> tuple[Optional[str], str]:
+        """Async variant of :meth:`find_manual`."""
+        text = await self.aload_manual(machine_name)
+        if text is not None:
+            return text, machine_name
+        index = get_name_index(self, wait=False) or await asyncio.to_thread(get_name_index, self)
+        resolved = self._resolve(machine_name, index)
+        if resolved is None:
+            return None, machine_name
+        return await self.aload_manual(resolved), resolved
+
+    @staticmethod
+    def _resolve(machine_name: str, index) -> Optional[str]:
+        resolved = index.resolve(machine_name) if index is not None else None
+        return resolved if resolved is not None and resolved != machine_name else None
+
+    def _answer(self, machine_name: str, text: Optional[str], resolved: str) -> str:
+        if text is None:
+            return self.not_found_message(machine_name)
+        if resolved != machine_name:
+            # Tell the model which manual it got, so follow-up calls use the real name.
+            return f"Manual for '{resolved}' (requested as '{machine_name}'):\n\n{text}"
+        return text
+
+    def load_manual(self, machine_name: str) -> Optional[str]:
+        """Return the manual text for ``machine_name`` or ``None`` if missing."""
+        blob_name = self._blob_name(machine_name)
+
+        with step("blob", blob_name):
+            # Try Azure Blob Storage directly (without langchain loaders to avoid unstructured dependency)
+            if self._container_client is not None:
+                text = self._read_mirror(blob_name)
+                if text is not None:
+                    return text
+                text = self._fetch_from_blob(blob_name)
+                if text is not None:
+                    self._record_blob_read(blob_name)
+                    return text
+            return self._load_local(blob_name)
+
+    async def aload_manual(self, machine_name: str) -> Optional[str]:
+        """Async variant of :meth:`load_manual` using the ``aio`` blob client."""
+        blob_name = self._blob_name(machine_name)
+        container_client = get_async_container_client(self.connection_string, self.container_name)
+        with step("blob", blob_name):
+            if container_client is not None:
+                text = await asyncio.to_thread(self._read_mirror, blob_name)
+                if text is not None:
+                    return text
+                text = await self._afetch_from_blob(container_client, blob_name)
+                if text is not None:
+                    self._record_blob_read(blob_name)
+                    return text
+            return await asyncio.to_thread(self._load_local, blob_name)
+
+    def _load_local(self, blob_name: str) -> Optional[str]:
         manual_file = self.fallback_path / blob_name
         if manual_file.exists():
+            stat = manual_file.stat()
+            record_manual_read(blob_name, f"{stat.st_mtime_ns}-{stat.st_size}")
+            record_bytes(stat.st_size)
             return manual_file.read_text(encoding="utf-8")
-        return f"Machine file '{manual_file}' not found"
+        record_manual_read(blob_name, None)
+        return None
+
+    def _read_mirror(self, blob_name: str) -> Optional[str]:
+        """Return the manual from this instance's local mirror, syncing it when due."""
+        mirror = get_manual_mirror(self._container_client)
+        if mirror is None:
+            return None
+        mirror.sync_in_background(
+            self._container_client, workers=int(os.environ.get("MANUALS_MIRROR_WORKERS", DEFAULT_MIRROR_WORKERS))
+        )
+        mirrored = mirror.read(blob_name)
+        if mirrored is None:
+            return None
+        text, etag = mirrored
+        record_manual_read(blob_name, etag)
+        record_bytes(len(text.encode("utf-8")))
+        return text
+
+    def _record_blob_read(self, blob_name: str) -> None:
+        entry = get_manual_cache(self.fallback_path).get(f"{self.container_name}/{blob_name}")
+        if entry is not None:
+            record_manual_read(blob_name, entry.etag or entry.last_modified)
+
+    def current_version(self, machine_name: str) -> str:
+        """Return the version tag of the manual, revalidating a stale copy.
+
+        The empty string stands for a missing manual.
+        """
+        with track_manual_reads() as reads:
+            self.load_manual(machine_name)
+        blob_name = self._blob_name(machine_name)
+        return reads.get(blob_name[: -len(".md")], "")
+
+    @staticmethod
+    def _blob_name(machine_name: str) -> str:
+        return machine_name if machine_name.endswith(".md") else f"{machine_name}.md"
+
+    def _fetch_from_blob(self, blob_name: str) -> Optional[str]:
+        """Return the blob text through the manual cache, or ``None`` if absent.
+
+        Fresh entries are served without any request; stale ones are
+        revalidated with a conditional download so an unchanged manual costs
+        a ``304`` instead of a full transfer.
+        """
+        cache, key, entry = self._cache_entry(blob_name)
+        if entry is not None and cache.is_fresh(entry):
+            cache.record("hits")
+            return entry.text
+        try:
+            blob_client = self._container_client.get_blob_client(blob_name)
+            downloader = blob_client.download_blob(**_conditions(entry))
+            data = downloader.readall()
+            record_bytes(len(data))
+            text = data.decode("utf-8")
+        except Exception as exc:
+            return _fetch_failed(cache, key, entry, exc)
+        return _fetched(cache, key, entry, text, downloader.properties)
+
+    async def _afetch_from_blob(self, container_client, blob_name: str) -> Optional[str]:
+        """Async variant of :meth:`_fetch_from_blob` sharing the same cache."""
+        cache, key, entry = self._cache_entry(blob_name)
+        if entry is not None and cache.is_fresh(entry):
+            cache.record("hits")
+            return entry.text
+        try:
+            blob_client = container_client.get_blob_client(blob_name)
+            downloader = await blob_client.download_blob(**_conditions(entry))
+            data = await downloader.readall()
+            record_bytes(len(data))
+            text = data.decode("utf-8")
+        except Exception as exc:
+            return _fetch_failed(cache, key, entry, exc)
+        return _fetched(cache, key, entry, text, downloader.properties)
+
+    def _cache_entry(self, blob_name: str) -> tuple[ManualCache, str, Optional[CachedManual]]:
+        cache = get_manual_cache(self.fallback_path)
+        key = f"{self.container_name}/{blob_name}"
+        entry = cache.get(key)
+        if entry is None:
+            cache.record("misses")
+        return cache, key, entry
 
     async def _arun(self, machine_name: str) -> str:  # type: ignore[override]
-        raise NotImplementedError("ManualsTool does not support async")
+        text, resolved = await self.afind_manual(machine_name)
+        return self._answer(machine_name, text, resolved)
+
+
+def _conditions(entry: Optional[CachedManual]) -> dict:
+    """Conditional-request keyword arguments revalidating ``entry``."""
+    if entry is not None and entry.etag:
+        return {"etag": entry.etag, "match_condition": MatchConditions.IfModified}
+    if entry is not None and entry.last_modified:
+        return {"if_modified_since": datetime.fromisoformat(entry.last_modified)}
+    return {}
+
+
+def _fetch_failed(
+    cache: ManualCache, key: str, entry: Optional[CachedManual], exc: Exception
+) -> Optional[str]:
+    status = getattr(exc, "status_code", None)
+    if status == 304 and entry is not None:
+        cache.mark_validated(key, entry)
+        return entry.text
+    if status == 404:
+        cache.invalidate(key)
+        return None
+    # Transient failure: a stale copy beats no answer at all.
+    return entry.text if entry is not None else None
+
+
+def _fetched(
+    cache: ManualCache, key: str, entry: Optional[CachedManual], text: str, properties
+) -> str:
+    if entry is not None:
+        cache.record("refreshes")
+    last_modified = getattr(properties, "last_modified", None)
+    cache.put(
+        key,
+        CachedManual(
+            text=text,
+            etag=getattr(properties, "etag", None),
+            last_modified=last_modified.isoformat() if last_modified else None,
+        ),
+    )
+    return text
+
+
+class FetchManualsInput(BaseModel):
+    """Input schema for :class:`FetchManualsTool`."""
+
+    filter: str = Field("", description="Only manuals whose name contains this text (any case)")
+    prefix: str = Field("", description="Only manuals whose name starts with this text (any case)")
+    offset: int = Field(0, description="Number of matching manuals to skip")
+    limit: int = Field(DEFAULT_PAGE_SIZE, description=f"Manuals per page (at most {MAX_PAGE_SIZE})")
+    details: bool = Field(False, description="Add size and last-modified time to each name")
 
 
 class FetchManualsTool(BaseTool):
-    """List manuals available in the container."""
+    """List manuals available in the container, from a cached listing.
+
+    See :mod:`middleware.manual_listing`: the container is listed once and
+    refreshed in the background, and each call returns one filtered page.
+    """
 
     name: str = "fetch_manuals"
     description: str = "List the names of manuals stored in the container."
+    args_schema: type[BaseModel] = FetchManualsInput
     connection_string: Optional[str] = None
     container_name: str = "manuals-md"
     fallback_path: Path = Path("manuals-md")
+    _container_client: Optional[object] = PrivateAttr(default=None)
 
     def __init__(
         self,
@@ -174,41 +512,91 @@ class FetchManualsTool(BaseTool):
             if fallback_path is not None
             else os.environ.get("MANUALS_MD_PATH", "manuals-md"),
         )
+        self._container_client = get_container_client(
+            self.connection_string, self.container_name
+        )
 
     def run(self, *args, **kwargs):
-        """Flexible run wrapper for FetchManualsTool (no arguments needed)."""
-        return self._run()
+        """Flexible run wrapper for FetchManualsTool (all arguments optional)."""
+        return self._run(**_listing_args(args, kwargs))
+
+    async def arun(self, *args, **kwargs):
+        """Async counterpart of :meth:`run`."""
+        return await self._arun(**_listing_args(args, kwargs))
 
     # pylint: disable=unused-argument
-    def _run(self) -> str:  # type: ignore[override]
-        names: list[str] = []
-        if self.connection_string and BlobServiceClient is not None:
-            try:
-                service_client = BlobServiceClient.from_connection_string(
-                    self.connection_string,
-                )
-                container_client = service_client.get_container_client(
-                    self.container_name,
-                )
-                for blob in container_client.list_blobs():
-                    names.append(blob.name)
-            except Exception:
-                names = []
-        if not names and self.fallback_path.exists():
-            names = [p.name for p in self.fallback_path.glob("*") if p.is_file()]
-        return "\n".join(names)
+    def _run(  # type: ignore[override]
+        self, filter: str = "", prefix: str = "", offset: int = 0, limit: int = DEFAULT_PAGE_SIZE, details: bool = False
+    ) -> str:
+        return self._page(get_manual_listing(self), filter, prefix, offset, limit, details)
+
+    async def _arun(  # type: ignore[override]
+        self, filter: str = "", prefix: str = "", offset: int = 0, limit: int = DEFAULT_PAGE_SIZE, details: bool = False
+    ) -> str:
+        # Only the first call of a worker lists the container (off the event loop).
+        listing = get_manual_listing(self, wait=False) or await asyncio.to_thread(get_manual_listing, self)
+        return self._page(listing, filter, prefix, offset, limit, details)
+
+    @staticmethod
+    def _page(listing, filter: str, prefix: str, offset: int, limit: int, details: bool) -> str:
+        entries = listing.select(prefix=prefix, contains=filter) if listing is not None else []
+        if not entries and (filter or prefix):
+            return f"No manual matches filter '{filter}' and prefix '{prefix}'."
+        offset = max(0, offset)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        return format_listing(entries, offset, limit, details)
+
+
+def _listing_args(args: tuple, kwargs: dict) -> dict:
+    """Keyword arguments of :class:`FetchManualsTool` from any call signature."""
+    if "tool_input" in kwargs:
+        kwargs = kwargs["tool_input"]
+    elif len(args) == 1 and isinstance(args[0], dict):
+        kwargs = args[0]
+    elif len(args) == 1 and isinstance(args[0], str):
+        kwargs = {"filter": args[0]}
+    if not isinstance(kwargs, dict):
+        kwargs = {}
+    fields = ("filter", "prefix", "offset", "limit", "details")
+    return {name: kwargs[name] for name in fields if kwargs.get(name) is not None}
+
+from langchain_core.tools import StructuredTool
+
+
+def _manuals_tool(machine_name: str) -> str:
+    return ManualsTool().run(machine_name=machine_name)
 
-    async def _arun(self) -> str:  # type: ignore[override]
-        raise NotImplementedError("FetchManualsTool does not support async")
 
-from langchain_core.tools import tool
+async def _amanuals_tool(machine_name: str) -> str:
+    return await ManualsTool().arun(machine_name=machine_name)
 
 
-@tool("manuals_tool", description="Fetch a specific machine manual in markdown format.")
-def manuals_tool(machine_name: str) -> str:
-    return ManualsTool().run(machine_name=machine_name)
+def _fetch_manuals(
+    filter: str = "", prefix: str = "", offset: int = 0, limit: int = DEFAULT_PAGE_SIZE, details: bool = False
+) -> str:
+    return FetchManualsTool().run(filter=filter, prefix=prefix, offset=offset, limit=limit, details=details)
+
+
+async def _afetch_manuals(
+    filter: str = "", prefix: str = "", offset: int = 0, limit: int = DEFAULT_PAGE_SIZE, details: bool = False
+) -> str:
+    return await FetchManualsTool().arun(filter=filter, prefix=prefix, offset=offset, limit=limit, details=details)
 
 
-@tool("fetch_manuals", description="List the names of manuals stored in the container.")
-def fetch_manuals() -> str:
-    return FetchManualsTool().run()
+# Sync and async implementations, so ``graph.ainvoke`` never blocks on blob I/O.
+manuals_tool = StructuredTool.from_function(
+    func=_manuals_tool,
+    coroutine=_amanuals_tool,
+    name="manuals_tool",
+    description="Fetch a specific machine manual in markdown format.",
+)
+fetch_manuals = StructuredTool.from_function(
+    func=_fetch_manuals,
+    coroutine=_afetch_manuals,
+    name="fetch_manuals",
+    description=(
+        "List the names of manuals stored in the container, one page at a time. "
+        "Use filter (part of the name) or prefix to list only the relevant manuals, "
+        "and details for their size and last-modified time."
+    ),
+)
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+"""Per-step timing, token and transfer instrumentation.
+
+A conversation turn is broken into steps: model calls (``llm``), tool calls
+(``tool``) and manual reads (``blob``). Each step records its wall time, the
+agent that ran it, prompt and completion tokens and bytes read from storage.
+
+Steps are collected into the :class:`Timings` of the surrounding
+:func:`track_timings` block, which ``conversationRun`` can return with its
+answer. When the OpenTelemetry API is installed every step is also a span
+and feeds the ``machinebot.step.*`` metrics; ``function_app`` exports both to
+Application Insights when Azure Monitor is configured.
+"""
+
+import contextlib
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, Iterator, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+try:  # optional: spans and metrics need the OpenTelemetry API
+    from opentelemetry import metrics as otel_metrics
+    from opentelemetry import trace as otel_trace
+except ImportError:  # pragma: no cover - depends on the deployment
+    otel_metrics = otel_trace = None
+
+if otel_trace is not None:  # pragma: no cover - depends on the deployment
+    _TRACER = otel_trace.get_tracer("machine-bot")
+    _METER = otel_metrics.get_meter("machine-bot")
+    _DURATION = _METER.create_histogram(
+        "machinebot.step.duration", unit="ms", description="Wall time of one step"
+    )
+    _TOKENS = _METER.create_counter("machinebot.step.tokens", description="LLM tokens used")
+    _BYTES = _METER.create_counter("machinebot.step.bytes", unit="By", description="Bytes read")
+else:
+    _TRACER = None
+
+
+@dataclass
+class Step:
+    """One timed unit of work; unset measurements stay ``None``."""
+
+    kind: str
+    name: str
+    agent: Optional[str] = None
+    start_ms: float = 0.0
+    duration_ms: float = 0.0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cost: Optional[float] = None
+    bytes_fetched: Optional[int] = None
+    error: Optional[str] = None
+
+    def add_usage(self, message: Any, pricing: Optional[dict[str, float]] = None) -> None:
+        """Record the token usage reported on a model response.
+
+        ``pricing`` holds ``prompt_per_1k`` and ``completion_per_1k`` prices.
+        """
+        usage = getattr(message, "usage_metadata", None) or {}
+        if not usage:
+            return
+        self.prompt_tokens = usage.get("input_tokens", 0)
+        self.completion_tokens = usage.get("output_tokens", 0)
+        if pricing:
+            self.cost = round(
+                self.prompt_tokens / 1000 * pricing.get("prompt_per_1k", 0.0)
+                + self.completion_tokens / 1000 * pricing.get("completion_per_1k", 0.0),
+                6,
+            )
+
+    def add_bytes(self, count: int) -> None:
+        self.bytes_fetched = (self.bytes_fetched or 0) + count
+
+    def as_dict(self) -> dict[str, Any]:
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+
+class Timings:
+    """Thread-safe collection of the steps of one request."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.steps: list[Step] = []
+        self._lock = threading.Lock()
+
+    def add(self, step: Step) -> None:
+        with self._lock:
+            self.steps.append(step)
+
+    def summary(self) -> dict[str, Any]:
+        """Steps in start order plus totals per step kind."""
+        with self._lock:
+            steps = sorted(self.steps, key=lambda step: step.start_ms)
+        totals: dict[str, dict[str, float]] = {}
+        for step in steps:
+            total = totals.setdefault(step.kind, {"count": 0, "duration_ms": 0.0})
+            total["count"] += 1
+            total["duration_ms"] = round(total["duration_ms"] + step.duration_ms, 3)
+            for field in ("prompt_tokens", "completion_tokens", "cost", "bytes_fetched"):
+                value = getattr(step, field)
+                if value is not None:
+                    total[field] = round(total.get(field, 0) + value, 6)
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "steps": [step.as_dict() for step in steps],
+            "totals": totals,
+        }
+
+
+_TIMINGS: ContextVar[Optional[Timings]] = ContextVar("request_timings", default=None)
+_CURRENT_STEP: ContextVar[Optional[Step]] = ContextVar("current_step", default=None)
+
+
+@contextlib.contextmanager
+def track_timings() -> Iterator[Timings]:
+    """Collect the steps run inside the block (including worker threads and tasks)."""
+    timings = Timings()
+    token = _TIMINGS.set(timings)
+    try:
+        yield timings
+    finally:
+        _TIMINGS.reset(token)
+
+
+class _StepTimer:
+    """Start and finish a :class:`Step`, its span and its metrics."""
+
+    def __init__(self, step: Step, current: bool) -> None:
+        self.step = step
+        self.timings = _TIMINGS.get()
+        self.started = time.perf_counter()
+        if self.timings is not None:
+            step.start_ms = round((self.started - self.timings.started) * 1000, 3)
+        self._span_scope = None
+        self.span = None
+        if _TRACER is not None:  # pragma: no cover - depends on the deployment
+            name = f"{step.kind} {step.name}"
+            if current:
+                self._span_scope = _TRACER.start_as_current_span(name)
+                self.span = self._span_scope.__enter__()
+            else:
+                self.span = _TRACER.start_span(name)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        step = self.step
+        step.duration_ms = round((time.perf_counter() - self.started) * 1000, 3)
+        if error is not None:
+            step.error = type(error).__name__
+        if self.timings is not None:
+            self.timings.add(step)
+        if self.span is not None:  # pragma: no cover - depends on the deployment
+            _export(step, self.span)
+            if self._span_scope is not None:
+                self._span_scope.__exit__(None, None, None)
+            else:
+                self.span.end()
+
+
+def _export(step: Step, span) -> None:  # pragma: no cover - depends on the deployment
+    attributes = {"kind": step.kind, "name": step.name, "agent": step.agent or ""}
+    for key, value in step.as_dict().items():
+        span.set_attribute(f"machinebot.{key}", value)
+    _DURATION.record(step.duration_ms, attributes)
+    if step.prompt_tokens is not None:
+        _TOKENS.add(step.prompt_tokens, {**attributes, "type": "prompt"})
+        _TOKENS.add(step.completion_tokens or 0, {**attributes, "type": "completion"})
+    if step.bytes_fetched:
+        _BYTES.add(step.bytes_fetched, attributes)
+
+
+@contextlib.contextmanager
+def step(kind: str, name: str, agent: Optional[str] = None) -> Iterator[Step]:
+    """Time the block as one step; nested code may add to it via :func:`current_step`."""
+    timer = _StepTimer(Step(kind, name, agent), current=True)
+    token = _CURRENT_STEP.set(timer.step)
+    try:
+        yield timer.step
+    except BaseException as exc:
+        timer.finish(exc)
+        raise
+    else:
+        timer.finish()
+    finally:
+        _CURRENT_STEP.reset(token)
+
+
+def current_step() -> Optional[Step]:
+    """Return the innermost running step, if any."""
+    return _CURRENT_STEP.get()
+
+
+def record_bytes(count: int) -> None:
+    """Add ``count`` bytes read from storage to the running step."""
+    running = _CURRENT_STEP.get()
+    if running is not None:
+        running.add_bytes(count)
+
+
+class ToolTimer(BaseCallbackHandler):
+    """Callback recording each call of a tool as a ``tool`` step."""
+
+    run_inline = True
+
+    def __init__(self, agent: Optional[str] = None) -> None:
+        self.agent = agent
+        self._running: dict[UUID, _StepTimer] = {}
+
+    def on_tool_start(self, serialized: dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._running[run_id] = _StepTimer(Step("tool", name, self.agent), current=False)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        timer = self._running.pop(run_id, None)
+        if timer is not None:
+            timer.finish()
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        timer = self._running.pop(run_id, None)
+        if timer is not None:
+            timer.finish(error)
+
+
+def instrument_tool(tool: Any, agent: Optional[str] = None) -> Any:
+    """Return a copy of ``tool`` whose calls are recorded as steps of ``agent``."""
+    callbacks = getattr(tool, "callbacks", None)
+    if not hasattr(tool, "model_copy") or not (callbacks is None or isinstance(callbacks, list)):
+        return tool
+    return tool.model_copy(update={"callbacks": [*(callbacks or []), ToolTimer(agent)]})
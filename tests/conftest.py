@@ -1,7 +1,9 @@
+import importlib.util
 import sys
 import warnings
 from pathlib import Path
 
+import pytest
 from pydantic import PydanticDeprecatedSince20
 import types
 
@@ -15,7 +17,7 @@ warnings.filterwarnings("ignore", category=PydanticDeprecatedSince20)
 
 # Provide minimal stubs for optional third-party libraries that are
 # not available in the execution environment.
-if "langgraph" not in sys.modules:  # pragma: no cover - defensive setup
+if importlib.util.find_spec("langgraph") is None:  # pragma: no cover - defensive setup
     graph_stub = types.SimpleNamespace(
         StateGraph=object,
         START=object(),
@@ -78,3 +80,13 @@ if "langgraph" not in sys.modules:  # pragma: no cover - defensive setup
         return handoff
 
     vanilla_agent.create_handoff_tool = _dummy_handoff_tool
+
+
+@pytest.fixture(autouse=True)
+def _fresh_agent_registry():
+    """Agents built with one test's stand-in chat model must not serve the next test."""
+    from agents.registry import get_agent_registry
+
+    get_agent_registry().clear()
+    yield
+    get_agent_registry().clear()
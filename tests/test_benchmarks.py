@@ -0,0 +1,72 @@
+"""Tests for the offline orchestration benchmark harness."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import agents.vanilla_agent as vanilla_agent
+from agents import build_graph
+from benchmarks.bench_orchestration import FLOWS, compare, percentile
+from benchmarks.fake_llm import ScriptedChatModel, answer_text
+from middleware.telemetry import track_timings
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+@pytest.mark.parametrize("flow,tools", [("manual", {"manuals_tool"}), ("maintenance", set())])
+def test_scripted_model_drives_each_flow(monkeypatch, flow, tools):
+    monkeypatch.delenv("MANUALS_MD_CONNECTION_STRING", raising=False)
+    monkeypatch.setenv("MANUALS_MD_PATH", str(DATA_DIR))
+    monkeypatch.setattr(
+        vanilla_agent, "AzureChatOpenAI", lambda **_: ScriptedChatModel(answer_tokens=5)
+    )
+    graph = build_graph(fast_route=False)
+
+    result = graph.invoke({"messages": [HumanMessage(content=FLOWS[flow])]})
+
+    used = {m.name for m in result["messages"] if isinstance(m, ToolMessage)}
+    assert f"transfer_to_{flow}_agent" in used
+    assert used - {f"transfer_to_{flow}_agent"} == tools
+    assert result["messages"][-1].content.endswith(answer_text(5))
+    assert isinstance(result["messages"][-1], AIMessage)
+    # Nodes and hand-offs return deltas; nothing is appended twice.
+    ids = [m.id for m in result["messages"]]
+    assert len(ids) == len(set(ids))
+
+
+def test_compare_flags_p95_regressions():
+    baseline = {"results": {"a": {"p95_ms": 10.0}, "b": {"p95_ms": 10.0}}}
+    results = {"a": {"p95_ms": 12.5}, "b": {"p95_ms": 13.5}, "new": {"p95_ms": 99.0}}
+
+    regressions = compare(results, baseline, tolerance=0.3)
+
+    assert len(regressions) == 1 and regressions[0].startswith("b:")
+    baseline["results"]["a"]["llm_calls"] = 2
+    results["a"]["llm_calls"] = 3
+    assert [r.split(":")[0] for r in compare(results, baseline, tolerance=0.3)] == ["a", "b"]
+    assert percentile([3.0, 1.0, 2.0, 4.0], 50) == 2.0
+    assert percentile([3.0, 1.0, 2.0, 4.0], 99) == 4.0
+
+
+@pytest.mark.parametrize("flow,llm_calls", [("manual", 3), ("maintenance", 2)])
+def test_flat_graph_ends_on_the_specialist_answer(monkeypatch, flow, llm_calls):
+    monkeypatch.delenv("MANUALS_MD_CONNECTION_STRING", raising=False)
+    monkeypatch.setenv("MANUALS_MD_PATH", str(DATA_DIR))
+    monkeypatch.setattr(
+        vanilla_agent, "AzureChatOpenAI", lambda **_: ScriptedChatModel(answer_tokens=5)
+    )
+    graph = build_graph(fast_route=False, flatten=True)
+
+    with track_timings() as timings:
+        result = graph.invoke({"messages": [HumanMessage(content=FLOWS[flow])]})
+
+    # No dispatcher call relaying the specialist's answer.
+    assert timings.summary()["totals"]["llm"]["count"] == llm_calls
+    assert f"transfer_to_{flow}_agent" in {m.name for m in result["messages"] if isinstance(m, ToolMessage)}
+    assert result["messages"][-1].content == answer_text(5)
+    ids = [m.id for m in result["messages"]]
+    assert len(ids) == len(set(ids))
+    assert graph is not build_graph(fast_route=False)
@@ -0,0 +1,86 @@
+"""Tests for the SQLAlchemy-backed LangGraph checkpointer."""
+
+from __future__ import annotations
+
+import json
+
+import azure.functions as func
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, MessagesState, StateGraph
+from sqlalchemy import select
+
+from agents.checkpoint import SqlAlchemySaver
+from functions import http_conversation
+
+
+def _echo_graph(checkpointer):
+    graph = StateGraph(MessagesState)
+    graph.add_node(
+        "llm", lambda state: {"messages": [AIMessage(content=f"seen {len(state['messages'])}")]}
+    )
+    graph.add_edge(START, "llm")
+    graph.add_edge("llm", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+def _message_rows(saver: SqlAlchemySaver):
+    with saver.engine.connect() as conn:
+        return conn.execute(
+            select(saver.blobs.c.base_version, saver.blobs.c.depth).where(
+                saver.blobs.c.channel == "messages"
+            )
+        ).all()
+
+
+def test_history_survives_a_new_saver_instance(tmp_path):
+    url = f"sqlite:///{tmp_path / 'checkpoints.db'}"
+    config = {"configurable": {"thread_id": "t1"}}
+    graph = _echo_graph(SqlAlchemySaver(url))
+    for turn in range(3):
+        graph.invoke({"messages": [HumanMessage(content=f"q{turn}")]}, config)
+
+    result = _echo_graph(SqlAlchemySaver(url)).invoke({"messages": [HumanMessage(content="q3")]}, config)
+    assert [m.content for m in result["messages"]][-3:] == ["seen 5", "q3", "seen 7"]
+    assert len(result["messages"]) == 8
+
+
+def test_message_channel_is_stored_as_deltas(tmp_path):
+    saver = SqlAlchemySaver(f"sqlite:///{tmp_path / 'checkpoints.db'}", snapshot_every=4)
+    graph = _echo_graph(saver)
+    config = {"configurable": {"thread_id": "t1"}}
+    for turn in range(4):
+        graph.invoke({"messages": [HumanMessage(content=f"q{turn}")]}, config)
+
+    rows = _message_rows(saver)
+    deltas = [row for row in rows if row.base_version is not None]
+    assert deltas, "appended messages should be written as deltas"
+    assert max(row.depth for row in rows) < 4
+    state = graph.get_state(config).values
+    assert [m.content for m in state["messages"]][-2:] == ["q3", "seen 7"]
+
+
+def test_delete_thread_removes_state(tmp_path):
+    saver = SqlAlchemySaver(f"sqlite:///{tmp_path / 'checkpoints.db'}")
+    graph = _echo_graph(saver)
+    config = {"configurable": {"thread_id": "t1"}}
+    graph.invoke({"messages": [HumanMessage(content="hi")]}, config)
+    saver.delete_thread("t1")
+    assert saver.get_tuple(config) is None
+    assert _message_rows(saver) == []
+
+
+def test_conversation_run_sends_only_new_turn(monkeypatch, tmp_path):
+    saver = SqlAlchemySaver(f"sqlite:///{tmp_path / 'checkpoints.db'}")
+    monkeypatch.setattr(http_conversation, "_get_checkpointer", lambda: saver)
+    monkeypatch.setattr(http_conversation, "_checkpointed_graph", _echo_graph(saver))
+    for _ in range(2):
+        req = func.HttpRequest(
+            method="POST",
+            url="/api/conversationRun",
+            headers={"Content-Type": "application/json"},
+            params={},
+            route_params={},
+            body=json.dumps({"input": "hi", "session_id": "s1"}).encode(),
+        )
+        resp = http_conversation.conversation_run(req)
+    assert json.loads(resp.get_body()) == {"output": "seen 3"}
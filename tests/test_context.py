@@ -0,0 +1,139 @@
+"""Tests for the token-budgeted context window."""
+
+from __future__ import annotations
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from agents.context import ContextWindow, OpenAIMessageCache
+
+
+def count(text: str) -> int:
+    return len(text) // 4
+
+
+SYSTEM = SystemMessage(content="You are a helpful assistant.")
+
+
+def tool_turn(question: str, manual: str, answer: str, call_id: str) -> list:
+    return [
+        HumanMessage(content=question),
+        AIMessage(content="", tool_calls=[{"name": "manuals_tool", "args": {}, "id": call_id}]),
+        ToolMessage(content=manual, tool_call_id=call_id, name="manuals_tool"),
+        AIMessage(content=answer),
+    ]
+
+
+def test_history_within_budget_is_unchanged():
+    window = ContextWindow(1000, count_tokens=count)
+    messages = [HumanMessage(content="hi"), AIMessage(content="hello")]
+    assert window.fit(SYSTEM, messages) == [SYSTEM, *messages]
+
+
+def test_old_tool_outputs_are_elided_first():
+    window = ContextWindow(400, count_tokens=count)
+    history = tool_turn("pump?", "P" * 4000, "see manual", "c1") + [HumanMessage(content="next")]
+
+    fitted = window.fit(SYSTEM, history)
+
+    assert len(fitted) == len(history) + 1
+    tool_message = fitted[3]
+    assert tool_message.tool_call_id == "c1"
+    assert "elided" in tool_message.content
+    assert window.total(fitted) <= 400
+
+
+def test_old_turns_are_folded_into_cached_summary():
+    calls = []
+
+    def summarizer(messages, previous):
+        calls.append(len(messages))
+        return (previous + " " + " ".join(str(m.content)[:12] for m in messages))[-80:]
+
+    window = ContextWindow(80, count_tokens=count, summarizer=summarizer)
+    history = []
+    for i in range(6):
+        history += [HumanMessage(content=f"question {i} " * 5), AIMessage(content=f"answer {i} " * 5)]
+
+    fitted = window.fit(SYSTEM, history)
+    assert fitted[0] is SYSTEM
+    assert fitted[1].content.startswith("Summary of the earlier conversation")
+    assert fitted[-1] is history[-1]
+    assert window.total(fitted) <= 80
+
+    calls.clear()
+    assert window.fit(SYSTEM, history) == fitted
+    assert calls == []
+
+    # A new turn only summarises the newly folded messages.
+    history += [HumanMessage(content="question 6 " * 5), AIMessage(content="answer 6 " * 5)]
+    window.fit(SYSTEM, history)
+    assert calls and max(calls) <= 4
+
+
+def test_current_turn_tool_output_is_truncated():
+    window = ContextWindow(200, count_tokens=count)
+    turn = tool_turn("pump?", "M" * 8000, "", "c1")[:3]
+
+    fitted = window.fit(SYSTEM, turn)
+
+    assert fitted[-1].content.endswith("[… truncated to fit the context window]")
+    assert window.total(fitted) <= 200
+
+
+def test_long_history_is_counted_once_per_message():
+    counted = []
+
+    def counting(text: str) -> int:
+        counted.append(text)
+        return count(text)
+
+    window = ContextWindow(2000, count_tokens=counting)
+    history = []
+    for i in range(500):
+        history += [HumanMessage(content=f"question {i} " * 5), AIMessage(content=f"answer {i} " * 5)]
+
+    fitted = window.fit(SYSTEM, history)
+    assert window.total(fitted) <= 2000
+    # Linear in the history: each message once, plus the system message and
+    # the few summaries tried once the rest nearly fits.
+    assert len(counted) < len(history) + 50
+    counted.clear()
+    window.fit(SYSTEM, history)
+    assert len(counted) <= 1
+
+
+def test_openai_conversion_is_reused_for_the_unchanged_prefix(monkeypatch):
+    import langchain_core.messages.utils as utils
+
+    converted = []
+    original = utils.convert_to_openai_messages
+    monkeypatch.setattr(
+        utils, "convert_to_openai_messages", lambda messages: converted.extend(messages) or original(messages)
+    )
+    cache = OpenAIMessageCache()
+    history = [HumanMessage(content="hi"), AIMessage(content="hello")]
+
+    first = cache.convert(history)
+    history.append(HumanMessage(content="pump X?"))
+    second = cache.convert(history)
+
+    assert second[:2] == first and second[2] == {"role": "user", "content": "pump X?"}
+    assert len(converted) == 3
+
+
+def test_message_caches_do_not_keep_messages_alive():
+    import gc
+    import weakref
+
+    window = ContextWindow(1000)
+    cache = OpenAIMessageCache()
+    history = [HumanMessage(content=f"question {i}") for i in range(3)]
+    window.fit(SYSTEM, history)
+    cache.convert(history)
+    alive = weakref.ref(history[0])
+
+    del history
+    gc.collect()
+    assert alive() is None
+    assert len(window._message_tokens) == 1  # only the system message is still referenced
+    assert len(cache._converted) == 0
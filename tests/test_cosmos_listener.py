@@ -0,0 +1,74 @@
+"""Tests for change-feed driven cache and index invalidation."""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from agents.response_cache import ResponseCache, set_response_cache
+from functions import cosmos_listener
+from middleware import manual_search, manual_specs
+from middleware.manual_cache import CachedManual, clear_manual_caches, get_manual_cache
+
+MANUAL = "# Machine007 Manual\n\n## 1. Cooling\nPrime the coolant pump weekly.\n"
+
+
+@pytest.fixture
+def manuals(monkeypatch, tmp_path):
+    monkeypatch.setenv("MANUALS_MD_PATH", str(tmp_path))
+    monkeypatch.setenv("MANUALS_MD_CONNECTION_STRING", "")
+    monkeypatch.setenv("MANUALS_INDEX_PATH", str(tmp_path / "index" / "manuals.idx"))
+    monkeypatch.setattr(
+        manual_search, "_STATE", {"index": None, "path": None, "refreshed_at": 0.0, "refreshing": False}
+    )
+    monkeypatch.setenv("MANUALS_SPECS_PATH", str(tmp_path / "index" / "specs.json"))
+    monkeypatch.setattr(
+        manual_specs, "_STATE", {"store": None, "path": None, "refreshed_at": 0.0, "refreshing": False}
+    )
+    cache = ResponseCache(version_of=lambda machine: "v1")
+    set_response_cache(cache)
+    clear_manual_caches()
+    yield tmp_path, cache
+    set_response_cache(None)
+    clear_manual_caches()
+
+
+def test_machine_of_reads_known_fields():
+    assert cosmos_listener.machine_of({"id": "1", "machine": "machine001"}) == "machine001"
+    assert cosmos_listener.machine_of({"id": "2", "manual": "machine002.md"}) == "machine002"
+    assert cosmos_listener.machine_of({"id": "3", "kind": "other"}) is None
+
+
+def test_change_invalidates_caches_and_reindexes(manuals):
+    root, responses = manuals
+    manual = root / "machine007.md"
+    manual.write_text(MANUAL, encoding="utf-8")
+    assert manual_search.refresh_manual_index(force=True).search("coolant")[0].machine == "machine007"
+    responses.put("How do I cool machine007?", "manual_agent", "Prime it.", {"machine007": "v1"})
+    responses.put("How do I cool machine008?", "manual_agent", "Prime it.", {"machine008": "v1"})
+    cache = get_manual_cache(root)
+    cache.put("manuals-md/machine007.md", CachedManual(text=MANUAL, etag='"1"'))
+
+    # Same size and mtime: the ETag-based rebuild alone would miss this edit.
+    stat = manual.stat()
+    manual.write_text(MANUAL.replace("coolant", "glycols"), encoding="utf-8")
+    os.utime(manual, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    stats = cosmos_listener.apply_changes([{"id": "a", "machine": "machine007"}, {"id": "b"}])
+
+    assert stats == {"machines": 1, "reindexed": True, "specs": False}
+    assert len(responses) == 1
+    assert cache.get("manuals-md/machine007.md") is None
+    index = manual_search.refresh_manual_index()
+    assert index.search("glycols")[0].machine == "machine007"
+    assert index.search("coolant") == []
+
+
+def test_failed_handler_fails_the_batch(manuals, monkeypatch):
+    def broken(machine):
+        raise RuntimeError("cache unavailable")
+
+    monkeypatch.setattr(cosmos_listener, "_HANDLERS", [broken])
+    with pytest.raises(RuntimeError):
+        cosmos_listener.apply_changes([{"id": "a", "machine": "machine007"}])
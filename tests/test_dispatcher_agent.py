@@ -1,6 +1,8 @@
 """Basic tests for dispatcher and maintenance agents."""
 from __future__ import annotations
 
+import asyncio
+
 import agents.vanilla_agent as vanilla_agent
 from agents.dispatcher_agent import DispatcherAgent
 from agents.maintenance_agent import MaintenanceAgent
@@ -17,6 +19,9 @@ class FakeListChatModel:
     def invoke(self, messages):  # pragma: no cover
         return self._responses.pop(0)
 
+    async def ainvoke(self, messages):
+        return self._responses.pop(0)
+
 
 def test_dispatcher_agent_basic_response(monkeypatch):
     model = FakeListChatModel([AIMessage(content="dispatch ok")])
@@ -32,3 +37,11 @@ def test_maintenance_agent_basic_response(monkeypatch):
     agent = MaintenanceAgent()
     result = agent.invoke({"input": "check"})
     assert result["messages"][-1].content == "maintenance ok"
+
+
+def test_maintenance_agent_async_response(monkeypatch):
+    model = FakeListChatModel([AIMessage(content="maintenance ok")])
+    monkeypatch.setattr(vanilla_agent, "AzureChatOpenAI", lambda **_: model)
+    agent = MaintenanceAgent()
+    result = asyncio.run(agent.ainvoke({"input": "check", "session_id": "async"}))
+    assert result["messages"][-1].content == "maintenance ok"
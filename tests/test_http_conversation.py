@@ -1,13 +1,26 @@
 """Tests for the HTTP conversation Azure Function."""
 from __future__ import annotations
 
+import asyncio
 import json
+import subprocess
+import sys
+from pathlib import Path
 
 import azure.functions as func
+import pytest
 from langchain_core.messages import AIMessage, HumanMessage
 
 from functions import http_conversation
-from agents import VanillaAgent
+from agents.memory import SessionMemoryStore, set_memory_store
+from agents.response_cache import ResponseCache, set_response_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_response_cache():
+    set_response_cache(ResponseCache(version_of=lambda machine: "v1"))
+    yield
+    set_response_cache(None)
 
 
 class DummyGraph:
@@ -18,6 +31,26 @@ class DummyGraph:
         return self._result
 
 
+class EchoGraph:
+    """Graph stub replying with the number of messages it received."""
+
+    def __init__(self):
+        self.seen = []
+
+    def invoke(self, state):
+        messages = list(state["messages"])
+        self.seen.append(messages)
+        return {"messages": messages + [AIMessage(content=f"{len(messages)} messages")]}
+
+
+class AsyncEchoGraph(EchoGraph):
+    """Echo graph whose ``ainvoke`` waits like a model call would."""
+
+    async def ainvoke(self, state):
+        await asyncio.sleep(0.05)
+        return self.invoke(state)
+
+
 def _make_request(body: dict) -> func.HttpRequest:
     return func.HttpRequest(
         method="POST",
@@ -34,7 +67,6 @@ def test_conversation_run_plain_text(monkeypatch):
         "messages": [HumanMessage(content="hello"), AIMessage(content="text response")]
     }
     monkeypatch.setattr(http_conversation, "_graph", DummyGraph(result))
-    VanillaAgent.MEMORY = []
     req = _make_request({"input": "hello"})
     resp = http_conversation.conversation_run(req)
     assert resp.status_code == 200
@@ -57,7 +89,6 @@ def test_conversation_run_multimodal(monkeypatch):
         ]
     }
     monkeypatch.setattr(http_conversation, "_graph", DummyGraph(result))
-    VanillaAgent.MEMORY = []
     body = {
         "input": [
             {"type": "text", "text": "describe"},
@@ -68,3 +99,89 @@ def test_conversation_run_multimodal(monkeypatch):
     resp = http_conversation.conversation_run(req)
     assert resp.status_code == 200
     assert json.loads(resp.get_body()) == {"output": "image response"}
+
+
+def test_conversation_run_keeps_sessions_apart(monkeypatch):
+    graph = EchoGraph()
+    monkeypatch.setattr(http_conversation, "_graph", graph)
+    set_memory_store(SessionMemoryStore())
+    try:
+        for session_id in ("alice", "bob", "alice"):
+            resp = http_conversation.conversation_run(
+                _make_request({"input": f"hi from {session_id}", "session_id": session_id})
+            )
+            assert resp.status_code == 200
+        assert json.loads(resp.get_body()) == {"output": "3 messages"}
+        assert [m.content for m in graph.seen[2]] == ["hi from alice", "1 messages", "hi from alice"]
+        assert len(graph.seen[1]) == 1
+    finally:
+        set_memory_store(None)
+
+
+def test_conversation_run_rejects_non_string_session_id(monkeypatch):
+    monkeypatch.setattr(http_conversation, "_graph", EchoGraph())
+    resp = http_conversation.conversation_run(_make_request({"input": "hi", "session_id": 42}))
+    assert resp.status_code == 400
+    resp = http_conversation.conversation_run(_make_request({"input": "hi", "session_id": "s" * 129}))
+    assert resp.status_code == 400
+
+
+def test_conversation_run_serves_repeated_questions_from_cache(monkeypatch):
+    graph = EchoGraph()
+    monkeypatch.setattr(http_conversation, "_graph", graph)
+    for text in ("How do I reset machine001?", "how do i reset machine001"):
+        resp = http_conversation.conversation_run(_make_request({"input": text}))
+        assert json.loads(resp.get_body()) == {"output": "1 messages"}
+    assert len(graph.seen) == 1
+
+
+def test_conversation_run_async_serves_requests_concurrently(monkeypatch):
+    graph = AsyncEchoGraph()
+    monkeypatch.setattr(http_conversation, "_graph", graph)
+    set_memory_store(SessionMemoryStore())
+
+    async def main():
+        requests = [
+            _make_request({"input": f"question {i}", "session_id": f"s{i % 2}"}) for i in range(4)
+        ]
+        return await asyncio.gather(*map(http_conversation.conversation_run_async, requests))
+
+    try:
+        responses = asyncio.run(main())
+    finally:
+        set_memory_store(None)
+    assert all(resp.status_code == 200 for resp in responses)
+    outputs = sorted(json.loads(resp.get_body())["output"] for resp in responses)
+    assert outputs == ["1 messages", "1 messages", "3 messages", "3 messages"]
+
+
+def test_conversation_run_async_validates_body(monkeypatch):
+    monkeypatch.setattr(http_conversation, "_graph", AsyncEchoGraph())
+    resp = asyncio.run(http_conversation.conversation_run_async(_make_request({"session_id": "x"})))
+    assert resp.status_code == 400
+
+
+def test_indexing_the_app_defers_the_agent_stack():
+    code = (
+        "import sys, function_app; "
+        "print(sorted(m for m in ('langgraph', 'langchain_openai', 'agents.vanilla_agent') if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=Path(__file__).parent.parent, capture_output=True, text=True, check=True
+    ).stdout
+    assert out.strip() == "[]"
+
+
+def test_warm_up_builds_the_graph_once(monkeypatch):
+    import agents
+
+    built = []
+    monkeypatch.setattr(agents, "build_graph", lambda **kwargs: built.append(kwargs) or EchoGraph(), raising=False)
+    monkeypatch.setattr(http_conversation, "_graph", None)
+    monkeypatch.setattr(http_conversation, "_get_checkpointer", lambda: None)
+
+    http_conversation.warm_up()
+    resp = http_conversation.conversation_run(_make_request({"input": "hello"}))
+
+    assert json.loads(resp.get_body()) == {"output": "1 messages"}
+    assert built == [{}]
@@ -0,0 +1,101 @@
+"""Tests for conversation turns queued through ``queue_worker``."""
+
+from __future__ import annotations
+
+import json
+
+import azure.functions as func
+import pytest
+from langchain_core.messages import AIMessage
+
+from agents.jobs import FAILED, QUEUED, SUCCEEDED, InMemoryJobStore, set_job_store
+from agents.response_cache import ResponseCache, set_response_cache
+from functions import http_conversation, queue_worker
+
+
+class FakeOut:
+    def __init__(self):
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+
+
+class ReplyGraph:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def invoke(self, state):
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return {"messages": list(state["messages"]) + [AIMessage(content="queued answer")]}
+
+
+@pytest.fixture
+def store():
+    set_response_cache(ResponseCache(version_of=lambda machine: "v1"))
+    jobs = InMemoryJobStore()
+    set_job_store(jobs)
+    yield jobs
+    set_job_store(None)
+    set_response_cache(None)
+
+
+def _request(url, body=None, route_params=None, method="POST"):
+    return func.HttpRequest(
+        method=method,
+        url=url,
+        headers={"Content-Type": "application/json"},
+        params={},
+        route_params=route_params or {},
+        body=json.dumps(body).encode() if body is not None else b"",
+    )
+
+
+def _enqueue(text="How do I reset pump X?"):
+    out = FakeOut()
+    resp = http_conversation.conversation_run(_request("/api/conversationRun", {"input": text, "queue": True}), out)
+    assert resp.status_code == 202
+    return json.loads(resp.get_body()), json.loads(out.value)
+
+
+def _result(job_id):
+    return http_conversation.conversation_result(
+        _request(f"/api/conversationResult/{job_id}", route_params={"job_id": job_id}, method="GET")
+    )
+
+
+def test_queued_turn_is_answered_by_the_worker(store, monkeypatch):
+    monkeypatch.setattr(http_conversation, "_graph", ReplyGraph())
+    accepted, message = _enqueue()
+    assert accepted["status"] == QUEUED and message["job_id"] == accepted["job_id"]
+    assert json.loads(_result(accepted["job_id"]).get_body())["status"] == QUEUED
+
+    queue_worker.queue_worker(func.QueueMessage(id="1", body=json.dumps(message).encode()))
+
+    job = json.loads(_result(accepted["job_id"]).get_body())
+    assert job["status"] == SUCCEEDED and job["output"] == "queued answer"
+    assert _result("missing").status_code == 404
+
+
+def test_failed_turn_is_retried_then_marked_failed(store, monkeypatch):
+    monkeypatch.setattr(http_conversation, "_graph", ReplyGraph(fail=True))
+    accepted, message = _enqueue()
+
+    with pytest.raises(RuntimeError):
+        queue_worker.run_conversation_job(message, dequeue_count=1)
+    assert store.get(accepted["job_id"])["status"] == QUEUED
+
+    queue_worker.run_conversation_job(message, dequeue_count=queue_worker.MAX_DEQUEUE_COUNT)
+    job = store.get(accepted["job_id"])
+    assert job["status"] == FAILED and "model unavailable" in job["error"]
+
+    # A redelivered message does not run a finished job again.
+    monkeypatch.setattr(http_conversation, "_graph", ReplyGraph())
+    queue_worker.run_conversation_job(message, dequeue_count=1)
+    assert store.get(accepted["job_id"])["status"] == FAILED
+
+
+def test_queueing_without_an_output_binding_is_unavailable(store):
+    resp = http_conversation.conversation_run(_request("/api/conversationRun", {"input": "hi", "queue": True}))
+    assert resp.status_code == 503
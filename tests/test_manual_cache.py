@@ -0,0 +1,86 @@
+"""Tests for the two-tier manual cache and its use by ``ManualsTool``."""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+
+import pytest
+
+from benchmarks.fake_blob_server import FakeBlobServer
+from middleware.manual_cache import (
+    CachedManual,
+    ManualCache,
+    clear_manual_caches,
+    manual_cache_stats,
+)
+from middleware.manuals_tools import CONTAINER_POOL, ManualsTool
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+@pytest.fixture
+def blob_server(monkeypatch):
+    # These tests count blob requests; keep them off the shared default mirror.
+    monkeypatch.setenv("MANUALS_MIRROR", "0")
+    clear_manual_caches()
+    CONTAINER_POOL.clear()
+    with FakeBlobServer() as server:
+        server.put_blob("manuals-md", "machine001.md", (DATA_DIR / "machine001.md").read_bytes())
+        yield server
+    CONTAINER_POOL.clear()
+    clear_manual_caches()
+
+
+def _tool(server: FakeBlobServer, fallback_path: str = "/__does_not_exist__") -> ManualsTool:
+    return ManualsTool(connection_string=server.connection_string, fallback_path=fallback_path)
+
+
+def test_lru_evicts_by_byte_budget():
+    cache = ManualCache(max_bytes=10, ttl=60)
+    cache.put("a", CachedManual(text="aaaa"))
+    cache.put("b", CachedManual(text="bbbb"))
+    cache.get("a")
+    cache.put("c", CachedManual(text="cccc"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 8
+
+
+def test_fresh_entries_skip_the_network(monkeypatch, blob_server):
+    monkeypatch.setenv("MANUALS_MD_CACHE_TTL", "60")
+    first = _tool(blob_server).run(machine_name="machine001")
+    requests = blob_server.requests
+    second = _tool(blob_server).run(machine_name="machine001")
+    assert first == second
+    assert blob_server.requests == requests
+    stats = manual_cache_stats()
+    assert stats["misses"] == 1 and stats["hits"] == 1
+
+
+def test_stale_entries_are_revalidated_with_etag(monkeypatch, blob_server, caplog):
+    monkeypatch.setenv("MANUALS_MD_CACHE_TTL", "0")
+    _tool(blob_server).run(machine_name="machine001")
+    with caplog.at_level(logging.WARNING, logger="azure"):
+        assert "Machine001" in _tool(blob_server).run(machine_name="machine001")
+    assert manual_cache_stats()["revalidations"] == 1
+    # The 304 carries the service headers, so the SDK decodes it quietly.
+    assert not caplog.records
+
+    blob_server.put_blob("manuals-md", "machine001.md", "# Machine001 rev B")
+    assert _tool(blob_server).run(machine_name="machine001") == "# Machine001 rev B"
+    assert manual_cache_stats()["refreshes"] == 1
+
+
+def test_disk_tier_survives_memory_reset(monkeypatch, blob_server, tmp_path):
+    monkeypatch.setenv("MANUALS_MD_CACHE_TTL", "60")
+    monkeypatch.setenv("MANUALS_MD_DISK_CACHE", "1")
+    _tool(blob_server, str(tmp_path)).run(machine_name="machine001")
+    assert (tmp_path / ".manuals-cache" / "manuals-md__machine001.md").exists()
+
+    clear_manual_caches()
+    requests = blob_server.requests
+    assert "Machine001" in _tool(blob_server, str(tmp_path)).run(machine_name="machine001")
+    assert blob_server.requests == requests
+    assert manual_cache_stats()["disk_hits"] == 1
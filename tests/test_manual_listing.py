@@ -0,0 +1,57 @@
+"""Tests for the cached, paginated ``fetch_manuals`` listing."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.fake_blob_server import FakeBlobServer
+from middleware.manual_listing import clear_manual_listings, expire_manual_listings, get_manual_listing
+from middleware.manuals_tools import CONTAINER_POOL, FetchManualsTool
+
+
+@pytest.fixture
+def blob_server(monkeypatch):
+    clear_manual_listings()
+    CONTAINER_POOL.clear()
+    monkeypatch.setenv("MANUALS_MD_PATH", "/__does_not_exist__")
+    with FakeBlobServer() as server:
+        monkeypatch.setenv("MANUALS_MD_CONNECTION_STRING", server.connection_string)
+        for i in range(1, 121):
+            server.put_blob("manuals-md", f"machine{i:03d}.md", f"# Machine{i:03d}")
+        server.put_blob("manuals-md", "press-07.md", "# Press 07 manual")
+        yield server
+    CONTAINER_POOL.clear()
+    clear_manual_listings()
+
+
+def test_pages_through_a_cached_filtered_listing(blob_server):
+    first = FetchManualsTool().run()
+    requests = blob_server.requests
+
+    assert first.splitlines()[:2] == ["machine001.md", "machine002.md"]
+    assert first.splitlines()[-1] == "(manuals 1-50 of 121; call again with offset=50 for more)"
+    second = FetchManualsTool().run(offset=100, limit=50)
+    assert second.splitlines()[-1] == "press-07.md" and len(second.splitlines()) == 21
+    assert FetchManualsTool().run(prefix="MACHINE11").splitlines() == [f"machine{i}.md" for i in range(110, 120)]
+    assert asyncio.run(FetchManualsTool().arun(filter="press")) == "press-07.md"
+    name, size, modified = FetchManualsTool().run(filter="press", details=True).split("\t")
+    assert (name, size) == ("press-07.md", "17 B") and modified.startswith("20")
+    assert FetchManualsTool().run(filter="lathe").startswith("No manual matches")
+    assert blob_server.requests == requests
+
+
+def test_listing_refreshes_in_the_background(blob_server, monkeypatch):
+    tool_impl = FetchManualsTool()
+    assert len(get_manual_listing(tool_impl)) == 121
+    blob_server.put_blob("manuals-md", "lathe-01.md", "# Lathe")
+    assert "No manual matches" in tool_impl.run(filter="lathe")
+
+    expire_manual_listings()  # what a change-feed event does
+    assert len(get_manual_listing(tool_impl)) == 121  # served at once, refresh started
+    deadline = time.monotonic() + 2
+    while len(get_manual_listing(tool_impl)) == 121 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert tool_impl.run(filter="lathe") == "lathe-01.md"
@@ -0,0 +1,129 @@
+"""Tests for the local manual mirror synced by ``timer_cleanup``."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from benchmarks.fake_blob_server import FakeBlobServer
+from middleware.manual_cache import clear_manual_caches, track_manual_reads
+from middleware.manual_mirror import ManualMirror, get_manual_mirror, sync_manual_mirror
+from middleware.manuals_tools import CONTAINER_POOL, ManualsTool
+
+MACHINE001 = "# Machine001 Manual\n\nVoltage: 230 V\n"
+MACHINE002 = "# Machine002 Manual\n\nVoltage: 400 V\n"
+
+
+@pytest.fixture
+def blob_server(monkeypatch, tmp_path):
+    clear_manual_caches()
+    CONTAINER_POOL.clear()
+    monkeypatch.setenv("MANUALS_MIRROR_PATH", str(tmp_path / "mirror"))
+    monkeypatch.setenv("MANUALS_MD_PATH", "/__does_not_exist__")
+    with FakeBlobServer() as server:
+        monkeypatch.setenv("MANUALS_MD_CONNECTION_STRING", server.connection_string)
+        server.put_blob("manuals-md", "machine001.md", MACHINE001)
+        server.put_blob("manuals-md", "machine002.md", MACHINE002)
+        yield server
+    CONTAINER_POOL.clear()
+    clear_manual_caches()
+
+
+def _mirror(server: FakeBlobServer) -> ManualMirror:
+    return get_manual_mirror(ManualsTool(connection_string=server.connection_string)._container_client)
+
+
+def test_reads_are_served_from_the_mirror(blob_server):
+    assert sync_manual_mirror() == {"downloaded": 2, "unchanged": 0, "removed": 0, "failed": 0}
+    requests = blob_server.requests
+
+    with track_manual_reads() as reads:
+        assert ManualsTool().load_manual("machine001") == MACHINE001
+    assert blob_server.requests == requests
+    assert reads == {"machine001": blob_server.get_blob("manuals-md", "machine001.md").etag.strip('"')}
+
+
+def test_sync_only_downloads_changes_and_swaps_them_in(blob_server):
+    sync_manual_mirror()
+    mirror = _mirror(blob_server)
+    blob_server.put_blob("manuals-md", "machine001.md", MACHINE001.replace("230", "240"))
+    blob_server.delete_blob("manuals-md", "machine002.md")
+
+    assert sync_manual_mirror() == {"downloaded": 1, "unchanged": 0, "removed": 1, "failed": 0}
+    assert "240 V" in mirror.read("machine001.md")[0]
+    assert mirror.read("machine002.md") is None
+    assert sorted(path.name for path in mirror.root.glob("*.md")) == [mirror.manifest()["machine001.md"]["file"]]
+    assert sync_manual_mirror()["unchanged"] == 1
+
+
+def test_dropped_manual_falls_back_to_blob_storage(blob_server):
+    sync_manual_mirror()
+    _mirror(blob_server).drop("machine002.md")
+    requests = blob_server.requests
+
+    assert ManualsTool().load_manual("machine002") == MACHINE002
+    assert blob_server.requests > requests
+
+
+def test_instances_without_the_timer_sync_on_first_read(blob_server):
+    mirror = _mirror(blob_server)
+    assert mirror.manifest() == {}
+
+    # Served from blob storage while the sync runs.
+    assert ManualsTool().load_manual("machine001") == MACHINE001
+    deadline = time.monotonic() + 5
+    while len(mirror.manifest()) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sorted(mirror.manifest()) == ["machine001.md", "machine002.md"]
+    assert not mirror.sync_in_background(None)  # fresh: nothing to do
+
+
+def test_drop_during_a_sync_is_not_undone(blob_server):
+    sync_manual_mirror()
+    mirror = _mirror(blob_server)
+    tool = ManualsTool()
+    listed = threading.Event()
+    release = threading.Event()
+    list_blobs = tool._container_client.list_blobs
+
+    def slow_list_blobs():
+        blobs = list(list_blobs())
+        listed.set()
+        release.wait(5)
+        return blobs
+
+    tool._container_client.list_blobs = slow_list_blobs
+    syncing = threading.Thread(target=mirror.sync, args=(tool._container_client,))
+    syncing.start()
+    assert listed.wait(5)
+    started = time.monotonic()
+    mirror.drop("machine002.md")
+    assert time.monotonic() - started < 1  # did not wait for the sync
+    release.set()
+    syncing.join(5)
+
+    assert mirror.read("machine002.md") is None
+    assert mirror.read("machine001.md") is not None
+
+
+def test_each_storage_account_gets_its_own_mirror(blob_server, monkeypatch):
+    sync_manual_mirror()
+    with FakeBlobServer() as other:
+        other.put_blob("manuals-md", "machine001.md", MACHINE001.replace("230", "110"))
+        monkeypatch.setenv("MANUALS_MD_CONNECTION_STRING", other.connection_string)
+
+        assert _mirror(other).root != _mirror(blob_server).root
+        assert "110 V" in ManualsTool().load_manual("machine001")
+
+
+def test_a_mirror_left_by_another_process_is_not_served_before_a_sync(blob_server):
+    sync_manual_mirror()
+    blob_server.put_blob("manuals-md", "machine001.md", MACHINE001.replace("230", "240"))
+    restarted = ManualMirror(_mirror(blob_server).root)
+
+    assert "machine001.md" in restarted.manifest()
+    assert restarted.read("machine001.md") is None
+    restarted.sync(ManualsTool()._container_client)
+    assert "240 V" in restarted.read("machine001.md")[0]
@@ -0,0 +1,71 @@
+"""Tests for approximate machine-name resolution in ``manuals_tool``."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from benchmarks.fake_blob_server import FakeBlobServer
+from middleware.manual_cache import clear_manual_caches
+from middleware.manual_listing import clear_manual_listings
+from middleware.manual_names import MachineNameIndex, get_name_index
+from middleware.manuals_tools import CONTAINER_POOL, ManualsTool
+
+NAMES = ["machine001.md", "machine002.md", "mixer001.md", "Conveyor-Press.md"]
+
+
+@pytest.mark.parametrize(
+    "name,resolved",
+    [
+        ("Machine 1", "machine001"),
+        ("machine-001", "machine001"),
+        ("MACHINE002.md", "machine002"),
+        ("mach 2", "machine002"),
+        ("conveyer pres", "Conveyor-Press"),
+        ("M001", None),  # machine001 or mixer001
+        ("machine999", None),
+        ("press", None),
+    ],
+)
+def test_resolves_approximate_names(name, resolved):
+    assert MachineNameIndex(NAMES).resolve(name) == resolved
+
+
+@pytest.fixture
+def blob_server(monkeypatch):
+    clear_manual_caches()
+    clear_manual_listings()
+    CONTAINER_POOL.clear()
+    monkeypatch.setenv("MANUALS_MIRROR", "0")
+    monkeypatch.setenv("MANUALS_MD_PATH", "/__does_not_exist__")
+    with FakeBlobServer() as server:
+        monkeypatch.setenv("MANUALS_MD_CONNECTION_STRING", server.connection_string)
+        server.put_blob("manuals-md", "machine001.md", "# Machine001")
+        yield server
+    CONTAINER_POOL.clear()
+    clear_manual_listings()
+    clear_manual_caches()
+
+
+def test_tool_resolves_in_one_call(blob_server):
+    assert ManualsTool().run(machine_name="machine001") == "# Machine001"
+    assert get_name_index(ManualsTool(), wait=False) is None  # exact names never list
+
+    answer = ManualsTool().run(machine_name="Machine 1")
+
+    assert answer == "Manual for 'machine001' (requested as 'Machine 1'):\n\n# Machine001"
+    assert "not found" in ManualsTool().run(machine_name="machine999")
+
+
+def test_index_refreshes_in_the_background(blob_server, monkeypatch):
+    monkeypatch.setenv("MANUALS_LISTING_TTL", "0")
+    tool_impl = ManualsTool()
+    assert "machine002" not in get_name_index(tool_impl)
+    blob_server.put_blob("manuals-md", "machine002.md", "# Machine002")
+
+    assert "machine002" not in get_name_index(tool_impl)  # stale copy, refresh started
+    deadline = time.monotonic() + 2
+    while "machine002" not in get_name_index(tool_impl, wait=False) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert ManualsTool().run(machine_name="Machine-2").endswith("# Machine002")
@@ -0,0 +1,139 @@
+"""Tests for the persistent cross-manual search index."""
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import pytest
+
+from benchmarks.fake_blob_server import FakeBlobServer
+from middleware import manual_search
+from middleware.manual_cache import clear_manual_caches
+from middleware.manual_search import (
+    ManualIndex,
+    ManualSource,
+    build_index,
+    list_manual_sources,
+    search_manuals,
+)
+from middleware.manuals_tools import CONTAINER_POOL, ManualsTool
+
+DATA_DIR = Path(__file__).parent / "data"
+MACHINE002 = "# Machine002 Manual\n\n## 1. Cooling\nThe coolant pump must be primed weekly.\n"
+
+
+def _source(machine: str, etag: str, text: str, calls: list[str]) -> ManualSource:
+    def load() -> str:
+        calls.append(machine)
+        return text
+
+    return ManualSource(machine, etag, load)
+
+
+def test_search_returns_machine_section_and_snippet(tmp_path):
+    calls: list[str] = []
+    manual = (DATA_DIR / "machine001.md").read_text(encoding="utf-8")
+    build_index(
+        tmp_path / "manuals.idx",
+        [_source("machine001", "1", manual, calls), _source("machine002", "1", MACHINE002, calls)],
+    )
+    index = ManualIndex(tmp_path / "manuals.idx")
+    hits = index.search("coolant pump")
+    assert hits[0].machine == "machine002"
+    assert hits[0].section == "1. Cooling"
+    assert "coolant pump" in hits[0].snippet
+    assert index.search("error code E101")[0].section == "7. Troubleshooting"
+    assert index.search("nonexistentterm") == []
+
+
+def test_very_long_tokens_are_left_out_of_the_index(tmp_path):
+    blob = "a1" * 40_000  # one 80,000-character token
+    text = f"# Machine003 Manual\n\n## 1. Firmware\nImage {blob} flashes the pump controller.\n"
+    build_index(tmp_path / "manuals.idx", [_source("machine003", "1", text, [])])
+    index = ManualIndex(tmp_path / "manuals.idx")
+
+    assert index.search("pump controller")[0].section == "1. Firmware"
+    assert index.search(blob) == []
+
+
+def test_incremental_build_only_reloads_changed_etags(tmp_path):
+    path = tmp_path / "manuals.idx"
+    calls: list[str] = []
+    manual = (DATA_DIR / "machine001.md").read_text(encoding="utf-8")
+    build_index(path, [_source("machine001", "1", manual, calls), _source("machine002", "1", MACHINE002, calls)])
+    previous = ManualIndex(path)
+    calls.clear()
+
+    updated = MACHINE002.replace("coolant pump", "hydraulic valve")
+    stats = build_index(
+        path, [_source("machine001", "1", manual, calls), _source("machine002", "2", updated, calls)], previous
+    )
+    assert calls == ["machine002"]
+    assert stats == {"reindexed": 1, "reused": 1, "removed": 0}
+    index = ManualIndex(path)
+    assert index.search("hydraulic valve")[0].machine == "machine002"
+    assert index.search("coolant") == []
+    assert index.search("E101")[0].machine == "machine001"
+
+
+def test_unchanged_manuals_leave_the_file_alone(tmp_path):
+    path = tmp_path / "manuals.idx"
+    calls: list[str] = []
+    heading = "é" * 40_000  # 80,000 bytes: more than the length field holds
+    build_index(path, [_source("machine002", "1", f"## {heading}\nThe coolant pump.\n", calls)])
+    written = path.stat().st_mtime_ns
+    previous = ManualIndex(path)
+    assert len(previous.sections_of("machine002")[0][0].encode("utf-8")) <= 0xFFFF
+    calls.clear()
+
+    stats = build_index(path, [_source("machine002", "1", "unused", calls)], previous)
+    assert stats == {"reindexed": 0, "reused": 1, "removed": 0}
+    assert calls == []
+    assert path.stat().st_mtime_ns == written
+
+
+def test_sources_come_from_blob_etags():
+    clear_manual_caches()
+    CONTAINER_POOL.clear()
+    with FakeBlobServer() as server:
+        server.put_blob("manuals-md", "machine002.md", MACHINE002)
+        server.put_blob("manuals-md", "notes.txt", "ignored")
+        tool_impl = ManualsTool(connection_string=server.connection_string, fallback_path="/__does_not_exist__")
+        sources = list_manual_sources(tool_impl)
+        assert [s.machine for s in sources] == ["machine002"]
+        assert sources[0].etag == server.get_blob("manuals-md", "machine002.md").etag
+        assert "coolant" in sources[0].load()
+    CONTAINER_POOL.clear()
+
+
+@pytest.mark.parametrize("limit", [1, 5])
+def test_search_manuals_tool_uses_local_manuals(monkeypatch, tmp_path, limit):
+    monkeypatch.setenv("MANUALS_MD_PATH", str(DATA_DIR))
+    monkeypatch.setenv("MANUALS_MD_CONNECTION_STRING", "")
+    monkeypatch.setenv("MANUALS_INDEX_PATH", str(tmp_path / "manuals.idx"))
+    result = search_manuals.invoke({"query": "lubricate moving parts", "limit": limit})
+    assert result.startswith("1. machine001 — 6. Maintenance")
+    assert len(result.splitlines()) <= limit
+
+
+def test_due_refresh_runs_in_the_background(monkeypatch, tmp_path):
+    monkeypatch.setenv("MANUALS_MD_PATH", str(DATA_DIR))
+    monkeypatch.setenv("MANUALS_MD_CONNECTION_STRING", "")
+    monkeypatch.setenv("MANUALS_INDEX_PATH", str(tmp_path / "manuals.idx"))
+    search_manuals.invoke({"query": "lubricate"})
+
+    monkeypatch.setenv("MANUALS_INDEX_REFRESH_SECONDS", "0")
+    listing, release = threading.Event(), threading.Event()
+    sources = manual_search.list_manual_sources
+
+    def slow_sources(*args):
+        listing.set()
+        release.wait(5)
+        return sources(*args)
+
+    monkeypatch.setattr(manual_search, "list_manual_sources", slow_sources)
+    result = search_manuals.invoke({"query": "lubricate moving parts"})
+    assert result.startswith("1. machine001")
+    assert listing.wait(5)
+    release.set()
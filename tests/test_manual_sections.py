@@ -0,0 +1,60 @@
+"""Tests for section-level manual retrieval."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from middleware.manual_sections import (
+    MAX_RESULT_CHARS,
+    BM25Index,
+    format_sections,
+    manual_sections,
+    split_sections,
+)
+
+DATA_DIR = Path(__file__).parent / "data"
+MANUAL = (DATA_DIR / "machine001.md").read_text(encoding="utf-8")
+
+
+def test_split_sections_uses_level_two_headings():
+    headings = [section.heading for section in split_sections(MANUAL)]
+    assert headings[1] == "1. Introduction"
+    assert "7. Troubleshooting" in headings
+
+
+def test_split_sections_keeps_deeper_headings_inside_parent():
+    sections = split_sections("## A\nintro\n### A.1\ndetail\n## B\nother")
+    assert [s.heading for s in sections] == ["A", "B"]
+    assert "### A.1" in sections[0].text
+
+
+def test_bm25_ranks_relevant_section_first():
+    index = BM25Index(split_sections(MANUAL))
+    hits = index.search("error code E101", top_k=2)
+    assert hits[0][0].heading == "7. Troubleshooting"
+
+
+def test_tool_returns_only_relevant_sections(monkeypatch):
+    monkeypatch.setenv("MANUALS_MD_PATH", str(DATA_DIR))
+    monkeypatch.setenv("MANUALS_MD_CONNECTION_STRING", "")
+    result = manual_sections.invoke(
+        {"machine_name": "machine001", "query": "lubricate moving parts", "top_k": 1}
+    )
+    assert "## 6. Maintenance" in result
+    assert "## 2. Safety Precautions" not in result
+    assert len(result) < len(MANUAL)
+
+
+def test_tool_lists_sections_when_nothing_matches(monkeypatch):
+    monkeypatch.setenv("MANUALS_MD_PATH", str(DATA_DIR))
+    monkeypatch.setenv("MANUALS_MD_CONNECTION_STRING", "")
+    result = manual_sections.invoke({"machine_name": "machine001", "query": "zzz"})
+    assert "Available sections" in result and "- 6. Maintenance" in result
+
+
+def test_section_list_is_capped_when_nothing_matches():
+    manual = "".join(f"## Section {i} {'x' * 60}\nbody\n" for i in range(500))
+    index = BM25Index(split_sections(manual))
+    result = format_sections("big", "zzz", [], index)
+    assert len(result) <= MAX_RESULT_CHARS
+    assert result.endswith("more")
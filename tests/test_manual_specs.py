@@ -0,0 +1,100 @@
+"""Tests for spec extraction, the ``machine_spec`` tool and spec answers."""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+import agents.vanilla_agent as vanilla_agent
+from agents.graph import _compile_graph
+from agents.registry import get_agent_registry
+from benchmarks.fake_llm import ScriptedChatModel
+from middleware import manual_specs
+from middleware.manual_cache import track_manual_reads
+from middleware.manual_specs import SpecStore, extract_specs, machine_spec
+from middleware.telemetry import track_timings
+
+DATA_DIR = Path(__file__).parent / "data"
+MANUAL = (DATA_DIR / "machine001.md").read_text(encoding="utf-8")
+
+
+@pytest.fixture
+def spec_store(monkeypatch, tmp_path):
+    monkeypatch.setenv("MANUALS_MD_PATH", str(DATA_DIR))
+    monkeypatch.setenv("MANUALS_MD_CONNECTION_STRING", "")
+    monkeypatch.setenv("MANUALS_SPECS_PATH", str(tmp_path / "specs.json"))
+    monkeypatch.setattr(
+        manual_specs, "_STATE", {"store": None, "path": None, "refreshed_at": 0.0, "refreshing": False}
+    )
+    return manual_specs.refresh_spec_store(force=True)
+
+
+def test_extracts_fields_and_table_rows():
+    specs = extract_specs(MANUAL)
+
+    assert specs["power_supply"].value == "230V AC, 50Hz"
+    assert specs["power_supply"].section == "Machine Overview"
+    assert specs["weight"].value == "350 kg"
+    assert specs["lubricate_moving_part"].value == "Frequency: Monthly"
+    e101 = SpecStore({"machine001": {"etag": "1", "specs": specs}}).lookup("machine001", "error E101")
+    assert e101.value == "Possible Cause: Sensor malfunction; Solution: Reset or replace sensor"
+
+
+def test_machine_spec_tool_answers_one_field(spec_store):
+    with track_manual_reads() as reads:
+        answer = machine_spec.invoke({"machine": "Machine001.md", "field": "voltage"})
+
+    assert answer == "machine001 — Power Supply: 230V AC, 50Hz [section: Machine Overview]"
+    assert reads == {"machine001": spec_store.etag("machine001")}
+    assert "- Weight" in machine_spec.invoke({"machine": "machine001", "field": ""})
+    assert machine_spec.invoke({"machine": "machine999", "field": "weight"}).startswith("No specifications")
+
+
+def test_instances_without_a_store_build_one_in_the_background(monkeypatch, tmp_path):
+    monkeypatch.setenv("MANUALS_MD_PATH", str(DATA_DIR))
+    monkeypatch.setenv("MANUALS_MD_CONNECTION_STRING", "")
+    monkeypatch.setenv("MANUALS_SPECS_PATH", str(tmp_path / "specs.json"))
+    monkeypatch.setattr(
+        manual_specs, "_STATE", {"store": None, "path": None, "refreshed_at": 0.0, "refreshing": False}
+    )
+    question = "What voltage does machine001 use?"
+
+    # No timer ran here: the first question goes to the model ...
+    assert manual_specs.answer_from_specs(question) is None
+    deadline = time.monotonic() + 5
+    while manual_specs._STATE["refreshing"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # ... and starts the build that answers the next one.
+    assert manual_specs.answer_from_specs(question) == "Power Supply (machine001): 230V AC, 50Hz"
+
+
+@pytest.mark.parametrize(
+    "question,answer",
+    [
+        ("What voltage does machine001 use?", "Power Supply (machine001): 230V AC, 50Hz"),
+        (
+            "How often should I lubricate the moving parts of Machine001?",
+            "Lubricate moving parts (machine001): Frequency: Monthly",
+        ),
+        ("What type of oil does machine001 use?", None),
+        ("What does the manual of machine001 say about the reset procedure?", None),
+    ],
+)
+def test_spec_answers_skip_the_llm(spec_store, monkeypatch, question, answer):
+    monkeypatch.setattr(vanilla_agent, "AzureChatOpenAI", lambda **_: ScriptedChatModel(answer_tokens=5))
+    agents = get_agent_registry().agents("dispatcher_agent")
+    monkeypatch.setitem(agents["dispatcher_agent"].config, "spec_answers", True)
+    graph = _compile_graph("dispatcher_agent", agents, None, fast_route=False).graph
+
+    with track_timings() as timings:
+        result = graph.invoke({"messages": [HumanMessage(content=question)]})
+
+    llm_calls = timings.summary()["totals"].get("llm", {}).get("count", 0)
+    if answer is None:
+        assert llm_calls > 0
+    else:
+        assert llm_calls == 0
+        assert result["messages"][-1].content == answer
@@ -1,8 +1,14 @@
 """Unit tests for manuals tools using local fallback data."""
 
+import asyncio
 from pathlib import Path
 
-from middleware.manuals_tools import ManualsTool, FetchManualsTool
+from middleware.manuals_tools import (
+    CONTAINER_POOL,
+    FetchManualsTool,
+    ManualsTool,
+    get_container_client,
+)
 
 DATA_FILE = Path(__file__).parent / "data" / "machine001.md"
 
@@ -29,3 +35,59 @@ def test_fetch_manuals_lists_files():
     tool = FetchManualsTool(connection_string=None, container_name="manuals-md", fallback_path=str(DATA_FILE.parent))
     result = tool.run()
     assert "machine001.md" in result.splitlines()
+
+
+FAKE_CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=a2V5;BlobEndpoint=http://127.0.0.1:1/devstoreaccount1;"
+)
+
+
+def test_container_pool_shares_client_between_tools():
+    CONTAINER_POOL.clear()
+    manuals = ManualsTool(connection_string=FAKE_CONNECTION_STRING, fallback_path=str(DATA_FILE.parent))
+    listing = FetchManualsTool(connection_string=FAKE_CONNECTION_STRING, fallback_path=str(DATA_FILE.parent))
+    assert manuals._container_client is not None
+    assert manuals._container_client is listing._container_client
+    assert get_container_client(FAKE_CONNECTION_STRING, "other") is not manuals._container_client
+    CONTAINER_POOL.clear()
+
+
+def test_container_pool_without_connection_string():
+    assert get_container_client(None, "manuals-md") is None
+    assert get_container_client("not a connection string", "manuals-md") is None
+
+
+def test_async_run_uses_aio_client_and_manual_cache(monkeypatch):
+    from benchmarks.fake_blob_server import FakeBlobServer
+    from middleware.manual_cache import clear_manual_caches
+    from middleware.manuals_tools import ASYNC_CONTAINER_POOL
+
+    monkeypatch.setenv("MANUALS_MD_CACHE_TTL", "0")
+    clear_manual_caches()
+
+    async def run(connection_string):
+        manuals = ManualsTool(connection_string=connection_string, fallback_path="/__missing__")
+        listing = FetchManualsTool(connection_string=connection_string, fallback_path="/__missing__")
+        try:
+            first = await manuals.arun(machine_name="machine001")
+            second = await manuals.arun(machine_name="machine001")
+            missing = await manuals.arun("machine999")
+            return first, second, missing, await listing.arun()
+        finally:
+            await ASYNC_CONTAINER_POOL.aclose()
+
+    with FakeBlobServer() as server:
+        server.put_blob("manuals-md", "machine001.md", DATA_FILE.read_bytes())
+        first, second, missing, names = asyncio.run(run(server.connection_string))
+    assert first == second == DATA_FILE.read_text(encoding="utf-8")
+    assert "not found" in missing
+    assert names == "machine001.md"
+    clear_manual_caches()
+
+
+def test_async_run_falls_back_to_local_files():
+    manuals = ManualsTool(connection_string=None, fallback_path=str(DATA_FILE.parent))
+    listing = FetchManualsTool(connection_string=None, fallback_path=str(DATA_FILE.parent))
+    assert asyncio.run(manuals.arun("machine001")) == DATA_FILE.read_text(encoding="utf-8")
+    assert "machine001.md" in asyncio.run(listing.arun()).splitlines()
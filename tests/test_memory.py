@@ -0,0 +1,95 @@
+"""Tests for the per-session conversation memory store."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agents.memory import SessionMemoryStore, SqlAlchemyMemoryBackend
+
+
+def test_sessions_are_isolated():
+    store = SessionMemoryStore()
+    with store.session("a") as session:
+        session.update([HumanMessage(content="from a")])
+    assert store.get("b") == []
+    assert [m.content for m in store.get("a")] == ["from a"]
+
+
+def test_lru_and_idle_eviction():
+    store = SessionMemoryStore(max_sessions=2, idle_ttl=0.05)
+    for session_id in ("a", "b", "c"):
+        store.get(session_id)
+    assert len(store) == 2
+    time.sleep(0.06)
+    store.get("d")
+    assert len(store) == 1
+
+
+def test_sqlite_backend_persists_only_new_messages(tmp_path):
+    backend = SqlAlchemyMemoryBackend(f"sqlite:///{tmp_path / 'conversations.db'}")
+    store = SessionMemoryStore(backend=backend)
+    with store.session("s1") as session:
+        session.update([HumanMessage(content="hello"), AIMessage(content="hi")])
+    with store.session("s1") as session:
+        session.update([*session.messages, HumanMessage(content="again")])
+
+    reloaded = SessionMemoryStore(backend=backend)
+    messages = reloaded.get("s1")
+    assert [m.content for m in messages] == ["hello", "hi", "again"]
+    assert isinstance(messages[1], AIMessage)
+
+    reloaded.delete("s1")
+    assert SessionMemoryStore(backend=backend).get("s1") == []
+
+
+def test_async_sessions_serialise_turns_of_one_session():
+    store = SessionMemoryStore()
+
+    async def turn(text):
+        async with store.asession("s1") as session:
+            messages = list(session.messages)
+            await asyncio.sleep(0.01)
+            session.update([*messages, HumanMessage(content=text)])
+
+    async def main():
+        await asyncio.gather(turn("one"), turn("two"), turn("three"))
+
+    asyncio.run(main())
+    assert len(store.get("s1")) == 3
+
+
+def test_cancelled_async_wait_does_not_keep_the_lock():
+    store = SessionMemoryStore()
+
+    async def main():
+        async with store.asession("s1"):
+            waiting = asyncio.create_task(store.asession("s1").__aenter__())
+            await asyncio.sleep(0.05)
+            waiting.cancel()
+            await asyncio.gather(waiting, return_exceptions=True)
+        await asyncio.sleep(0.05)
+        async with store.asession("s1") as session:
+            return session
+
+    assert asyncio.run(asyncio.wait_for(main(), 2)).session_id == "s1"
+
+
+def test_sessions_in_use_are_not_evicted():
+    store = SessionMemoryStore(max_sessions=1, idle_ttl=0.05)
+    with store.session("a") as held:
+        held.update([HumanMessage(content="kept")])
+        time.sleep(0.06)
+        # Neither the idle sweep nor the size bound may drop ``a`` mid-turn.
+        store.get("b")
+        assert "a" in store._sessions and store._sessions["a"] is held
+    store.get("c")
+    assert len(store) == 1
+
+
+def test_overlong_session_ids_are_rejected():
+    with pytest.raises(ValueError):
+        SessionMemoryStore().get("s" * 129)
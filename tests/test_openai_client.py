@@ -0,0 +1,93 @@
+"""Tests for the shared Azure OpenAI HTTP clients and rate limiter."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from agents.openai_client import (
+    AsyncRateLimitedTransport,
+    DeploymentLimits,
+    RateLimitedTransport,
+    RateLimiter,
+    TokenBucket,
+    estimate_tokens,
+    retry_after,
+)
+
+URL = "https://example.openai.azure.com/openai/deployments/gpt-4.1/chat/completions"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _chat_request(content="x" * 400, max_tokens=100):
+    body = {"messages": [{"role": "user", "content": content}], "max_tokens": max_tokens}
+    return httpx.Request("POST", URL, content=json.dumps(body).encode())
+
+
+def test_token_bucket_queues_callers_behind_each_other():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)  # one token per second
+
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    assert bucket.reserve(1) == pytest.approx(2.0)
+    clock.now = 10.0
+    assert bucket.reserve(1) == 0.0
+    assert bucket.reserve(1000) == pytest.approx(53.0)  # capped at one full bucket
+
+
+def test_limiter_follows_headers_and_throttling():
+    clock = FakeClock()
+    limiter = RateLimiter(tpm=6000, rpm=60, clock=clock)
+    assert limiter.reserve(100) == 0.0
+
+    limiter.observe(httpx.Response(200, headers={"x-ratelimit-remaining-tokens": "0"}))
+    assert limiter.reserve(100) == pytest.approx(1.0)
+
+    limiter.observe(httpx.Response(429, headers={"retry-after-ms": "5000"}))
+    assert limiter.throttled == 1
+    assert limiter.reserve(1) >= 5.0
+
+
+def test_request_estimates_and_retry_after():
+    assert estimate_tokens(_chat_request()) == 101 + 100
+    assert estimate_tokens(httpx.Request("GET", URL)) == 0
+    assert retry_after(httpx.Headers({"retry-after": "3"})) == 3.0
+    assert retry_after(httpx.Headers({"retry-after-ms": "250", "retry-after": "3"})) == 0.25
+    assert retry_after(httpx.Headers({})) == 1.0
+
+
+def test_transports_wait_after_a_429(monkeypatch):
+    statuses = iter([429, 200])
+
+    def handler(request):
+        return httpx.Response(next(statuses), headers={"retry-after-ms": "40"}, json={})
+
+    limits = DeploymentLimits(tpm=100_000, rpm=600)
+    client = httpx.Client(transport=RateLimitedTransport(httpx.MockTransport(handler), limits))
+    slept = []
+    monkeypatch.setattr("agents.openai_client.time.sleep", slept.append)
+
+    assert client.send(_chat_request()).status_code == 429
+    assert client.send(_chat_request()).status_code == 200
+    assert len(slept) == 1 and 0 < slept[0] <= 0.04
+
+    async def send_async():
+        async def ahandler(request):
+            return httpx.Response(200, json={})
+
+        transport = AsyncRateLimitedTransport(httpx.MockTransport(ahandler), DeploymentLimits(None, 600))
+        async with httpx.AsyncClient(transport=transport) as aclient:
+            return (await aclient.send(_chat_request())).status_code
+
+    assert asyncio.run(send_async()) == 200
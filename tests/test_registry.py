@@ -0,0 +1,99 @@
+"""Tests for the memoized agent registry."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import AIMessage
+
+import agents.registry as registry_module
+import agents.vanilla_agent as vanilla_agent
+from agents import build_graph
+from agents.registry import AgentRegistry, config_fingerprint, set_agent_registry
+from agents.router import predict_route
+
+
+class FakeListChatModel:
+    def __init__(self, responses):
+        self._responses = list(responses)
+
+    def bind_tools(self, tools):
+        return self
+
+    def invoke(self, messages):  # pragma: no cover - graphs are not run here
+        return self._responses.pop(0)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(vanilla_agent, "AzureChatOpenAI", lambda **_: FakeListChatModel([AIMessage("ok")]))
+    fresh = AgentRegistry()
+    set_agent_registry(fresh)
+    yield fresh
+    set_agent_registry(None)
+
+
+def test_graphs_and_agents_are_built_once(registry):
+    graph = build_graph()
+    assert build_graph() is graph
+    plain = build_graph(fast_route=False)
+    assert plain is not graph
+    build_graph(entry_id="manual_agent")
+
+    stats = registry.stats()
+    assert stats["agent_builds"] == 3
+    assert stats["graph_builds"] == 3 and stats["graph_hits"] == 1
+    # A cache hit re-activates the router of the graph it returns.
+    build_graph()
+    assert predict_route("Open the manual of pump X") == "manual_agent"
+
+
+def test_config_change_rebuilds(registry, monkeypatch):
+    version = ["a"]
+    monkeypatch.setattr(registry_module, "config_fingerprint", lambda root: version[0])
+    graph = build_graph()
+    version[0] = "b"
+
+    assert build_graph() is not graph
+    assert registry.stats()["agent_builds"] == 6
+    assert registry.stats()["reloads"] == 1
+
+
+def test_config_fingerprint_tracks_file_contents(tmp_path):
+    (tmp_path / "a_agent").mkdir()
+    config = tmp_path / "a_agent" / "config.json"
+    config.write_text('{"id": "a_agent"}')
+    (tmp_path / "a_agent" / "instructions.md").write_text("Be brief.")
+    before = config_fingerprint(tmp_path)
+    assert config_fingerprint(tmp_path) == before
+    config.write_text('{"id": "a_agent", "model": "x"}')
+    assert config_fingerprint(tmp_path) != before
+
+
+def test_config_fingerprint_skips_unchanged_files(tmp_path, monkeypatch):
+    (tmp_path / "a_agent").mkdir()
+    (tmp_path / "a_agent" / "config.json").write_text('{"id": "a_agent"}')
+    before = config_fingerprint(tmp_path)
+    read = []
+    original = Path.read_bytes
+    monkeypatch.setattr(Path, "read_bytes", lambda self: read.append(self) or original(self))
+
+    assert config_fingerprint(tmp_path) == before
+    assert read == []
+
+
+def test_clear_picks_up_a_new_chat_model(registry, monkeypatch):
+    first = build_graph()
+    monkeypatch.setattr(vanilla_agent, "AzureChatOpenAI", lambda **_: FakeListChatModel([AIMessage("other")]))
+    assert build_graph() is first  # the model class is not part of the stamp
+
+    registry.clear()
+    assert build_graph() is not first
+
+
+def test_tools_are_resolved_once():
+    first = vanilla_agent.VanillaAgent._resolve_tool("manuals_tool")
+    assert vanilla_agent.VanillaAgent._resolve_tool("manuals_tool") is first
+    with pytest.raises(ValueError):
+        vanilla_agent.VanillaAgent._resolve_tool("no_such_tool")
@@ -0,0 +1,63 @@
+"""Tests for the response cache and manual read tracking."""
+
+from __future__ import annotations
+
+import os
+import time
+
+from agents.response_cache import ResponseCache, normalize_input
+from middleware.manual_cache import track_manual_reads
+from middleware.manuals_tools import ManualsTool
+
+
+def test_normalized_inputs_share_an_entry():
+    cache = ResponseCache(version_of=lambda machine: "v1")
+    cache.put("How do I reset machine001?", "manual_agent", "Hold RESET.", {"machine001": "v1"})
+
+    assert normalize_input("  how do I   RESET machine001 ") == "how do i reset machine001"
+    assert cache.get("how do i reset MACHINE001", "manual_agent") == "Hold RESET."
+    assert cache.get("how do i reset machine001", "maintenance_agent") is None
+
+
+def test_changed_manual_version_drops_entry():
+    versions = {"machine001": "v1"}
+    cache = ResponseCache(version_of=versions.__getitem__)
+    cache.put("reset machine001", "manual_agent", "Hold RESET.", dict(versions))
+
+    versions["machine001"] = "v2"
+    assert cache.get("reset machine001", "manual_agent") is None
+    assert len(cache) == 0
+    assert cache.stats()["invalidated"] == 1
+
+
+def test_ttl_lru_and_explicit_invalidation():
+    cache = ResponseCache(max_entries=2, ttl=0.05, version_of=lambda machine: "v1")
+    cache.put("a", "r", "A", {"m1": "v1"})
+    cache.put("b", "r", "B", {"m2": "v1"})
+    cache.put("c", "r", "C", {"m2": "v1"})
+    assert cache.get("a", "r") is None
+    assert cache.invalidate_manual("m2.md") == 2
+
+    cache.put("d", "r", "D", {})
+    time.sleep(0.06)
+    assert cache.get("d", "r") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_manual_reads_are_tracked_with_versions(tmp_path):
+    manual = tmp_path / "machine001.md"
+    manual.write_text("# Machine 001", encoding="utf-8")
+    tool = ManualsTool(connection_string="", fallback_path=str(tmp_path))
+
+    with track_manual_reads() as reads:
+        tool.load_manual("machine001")
+        tool.load_manual("missing")
+    assert set(reads) == {"machine001", "missing"}
+    assert reads["missing"] == ""
+
+    before = tool.current_version("machine001")
+    assert before == reads["machine001"]
+    manual.write_text("# Machine 001, revised", encoding="utf-8")
+    stat = manual.stat()
+    os.utime(manual, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert tool.current_version("machine001") != before
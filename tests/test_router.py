@@ -0,0 +1,88 @@
+"""Tests for local intent routing in front of the dispatcher."""
+
+from __future__ import annotations
+
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+import agents.vanilla_agent as vanilla_agent
+from agents import build_graph
+from agents.router import AgentProfile, IntentRouter
+
+
+class FakeListChatModel:
+    def __init__(self, responses):
+        self._responses = list(responses)
+        self.calls = 0
+
+    def bind_tools(self, tools):
+        return self
+
+    def invoke(self, messages):
+        self.calls += 1
+        return self._responses.pop(0)
+
+
+def make_router(threshold=0.6):
+    return IntentRouter(
+        [
+            AgentProfile("manual_agent", "Answers from manuals", ["manual", "datasheet"]),
+            AgentProfile("maintenance_agent", "Handles maintenance", ["repair", "broken"]),
+        ],
+        threshold=threshold,
+    )
+
+
+def test_router_picks_specialist_or_falls_back():
+    router = make_router()
+    assert router.route("Open the manual of pump P-100").agent_id == "manual_agent"
+    assert router.route("The conveyor is broken").agent_id == "maintenance_agent"
+    assert router.route("hello there").agent_id is None
+    ambiguous = router.route("manual repair steps")
+    assert ambiguous.agent_id is None
+    assert ambiguous.scores["manual_agent"] == ambiguous.scores["maintenance_agent"]
+
+
+def test_router_learns_from_handoffs():
+    router = make_router()
+    assert router.route("torque for flange bolts").agent_id is None
+    for _ in range(5):
+        router.learn("torque for flange bolts", "maintenance_agent")
+    assert router.route("flange bolt torque").agent_id == "maintenance_agent"
+
+
+def test_fast_path_skips_dispatcher(monkeypatch):
+    model = FakeListChatModel([AIMessage(content="from the manual")])
+    monkeypatch.setattr(vanilla_agent, "AzureChatOpenAI", lambda **_: model)
+    graph = build_graph()
+
+    result = graph.invoke({"messages": [HumanMessage(content="Show me the manual for pump X")]})
+
+    assert result["messages"][-1].content == "from the manual"
+    assert model.calls == 1
+
+
+def test_unclear_input_goes_through_dispatcher(monkeypatch):
+    handoff = AIMessage(
+        content="",
+        additional_kwargs={
+            "tool_calls": [
+                {
+                    "id": "call_1",
+                    "type": "function",
+                    "function": {"name": "transfer_to_maintenance_agent", "arguments": json.dumps({})},
+                }
+            ]
+        },
+    )
+    model = FakeListChatModel(
+        [handoff, AIMessage(content="scheduled"), AIMessage(content="Maintenance: scheduled")]
+    )
+    monkeypatch.setattr(vanilla_agent, "AzureChatOpenAI", lambda **_: model)
+    graph = build_graph()
+
+    result = graph.invoke({"messages": [HumanMessage(content="torque for flange bolts")]})
+
+    assert result["messages"][-1].content == "Maintenance: scheduled"
+    assert model.calls == 3
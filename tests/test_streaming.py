@@ -0,0 +1,144 @@
+"""Tests for streaming conversation events."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Iterator
+
+import azure.functions as func
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import agents.vanilla_agent as vanilla_agent
+from agents import build_graph
+from agents.memory import SessionMemoryStore, get_memory_store, set_memory_store
+from agents.response_cache import ResponseCache, set_response_cache
+from agents.streaming import ConversationStream, format_sse
+from functions import http_conversation
+
+
+class StreamingFakeModel(BaseChatModel):
+    """Chat model replaying scripted messages, streamed word by word."""
+
+    responses: list
+
+    @property
+    def _llm_type(self) -> str:
+        return "streaming-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self.responses.pop(0))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        message = self.responses.pop(0)
+        if message.tool_calls:
+            chunks = [
+                AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                        for i, c in enumerate(message.tool_calls)
+                    ],
+                )
+            ]
+        else:
+            words = message.content.split(" ")
+            chunks = [AIMessageChunk(content=w if i == 0 else f" {w}") for i, w in enumerate(words)]
+        for chunk in chunks:
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+
+def _manual_script():
+    return [
+        AIMessage(
+            content="",
+            tool_calls=[{"name": "manuals_tool", "args": {"machine_name": "machine001"}, "id": "c1"}],
+        ),
+        AIMessage(content="Hold reset for five seconds."),
+    ]
+
+
+@pytest.fixture
+def streaming_graph(monkeypatch):
+    monkeypatch.setenv("MANUALS_MD_PATH", "tests/data")
+    model = StreamingFakeModel(responses=_manual_script())
+    monkeypatch.setattr(vanilla_agent, "AzureChatOpenAI", lambda **_: model)
+    return build_graph()
+
+
+def test_stream_reports_progress_and_tokens(streaming_graph):
+    stream = ConversationStream(
+        streaming_graph,
+        {"messages": [HumanMessage(content="What does the manual of machine001 say?")]},
+        agent_ids=vanilla_agent.VanillaAgent.REGISTRY,
+        route="manual_agent",
+    )
+
+    async def collect():
+        return [event async for event in stream]
+
+    events = asyncio.run(collect())
+    kinds = [event["event"] for event in events]
+    assert kinds[:4] == ["route", "agent", "tool_start", "tool_end"]
+    assert kinds[4] == "message_start" and kinds[-1] == "done"
+    tokens = "".join(e["data"]["text"] for e in events if e["event"] == "token")
+    assert tokens == "Hold reset for five seconds."
+    assert events[-1]["data"]["output"] == tokens
+    assert isinstance(stream.messages[-1], AIMessage)
+
+
+def test_stream_events_serve_repeats_from_cache(streaming_graph, monkeypatch):
+    monkeypatch.setattr(http_conversation, "_graph", streaming_graph)
+    set_response_cache(ResponseCache())
+
+    async def frames():
+        return [
+            frame
+            async for frame in http_conversation._stream_events(
+                "What does the manual of machine001 say?", None
+            )
+        ]
+
+    try:
+        first = asyncio.run(frames())
+        again = asyncio.run(frames())
+    finally:
+        set_response_cache(None)
+    assert first[-1] == format_sse({"event": "done", "data": {"output": "Hold reset for five seconds."}})
+    assert again[0] == format_sse({"event": "route", "data": {"agent": "manual_agent", "via": "cache"}})
+    assert again[-1] == first[-1]
+
+
+@pytest.mark.skipif(
+    http_conversation.StreamingResponse is not None, reason="buffered fallback only"
+)
+def test_buffered_stream_route(streaming_graph, monkeypatch):
+    monkeypatch.setattr(http_conversation, "_graph", streaming_graph)
+    set_memory_store(SessionMemoryStore())
+    try:
+        req = func.HttpRequest(
+            method="POST",
+            url="/api/conversationStream",
+            headers={"Content-Type": "application/json"},
+            params={},
+            route_params={},
+            body=json.dumps({"input": "manual for machine001", "session_id": "s1"}).encode(),
+        )
+        resp = asyncio.run(http_conversation.conversation_stream(req))
+        history = get_memory_store().get("s1")
+    finally:
+        set_memory_store(None)
+    assert resp.mimetype == "text/event-stream"
+    assert resp.get_body().decode().endswith(
+        format_sse({"event": "done", "data": {"output": "Hold reset for five seconds."}})
+    )
+    assert [type(m).__name__ for m in history][0] == "HumanMessage"
+    assert history[-1].content == "Hold reset for five seconds."
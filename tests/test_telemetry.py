@@ -0,0 +1,88 @@
+"""Tests for per-step timing, token and transfer instrumentation."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import azure.functions as func
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+import agents.vanilla_agent as vanilla_agent
+from agents import build_graph
+import agents.response_cache as response_cache
+from benchmarks.fake_llm import ScriptedChatModel
+from functions import http_conversation
+from middleware.telemetry import record_bytes, step, track_timings
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+def test_steps_are_collected_with_totals():
+    with track_timings() as timings:
+        with step("blob", "machine001.md"):
+            record_bytes(100)
+            record_bytes(20)
+        with pytest.raises(RuntimeError):
+            with step("llm", "manual_agent", agent="Manuals Agent") as llm:
+                llm.add_usage(
+                    AIMessage(content="", usage_metadata={"input_tokens": 1000, "output_tokens": 500, "total_tokens": 1500}),
+                    {"prompt_per_1k": 0.01, "completion_per_1k": 0.03},
+                )
+                raise RuntimeError("model down")
+    record_bytes(5)  # outside any step: ignored
+
+    summary = timings.summary()
+    blob, llm = summary["steps"]
+    assert blob["bytes_fetched"] == 120 and "agent" not in blob
+    assert llm["agent"] == "Manuals Agent" and llm["error"] == "RuntimeError"
+    assert llm["cost"] == pytest.approx(0.025)
+    assert summary["totals"]["llm"]["prompt_tokens"] == 1000
+    assert summary["totals"]["blob"]["count"] == 1
+
+
+def test_graph_run_breaks_down_by_agent_and_tool(monkeypatch):
+    monkeypatch.delenv("MANUALS_MD_CONNECTION_STRING", raising=False)
+    monkeypatch.setenv("MANUALS_MD_PATH", str(DATA_DIR))
+    monkeypatch.setattr(vanilla_agent, "AzureChatOpenAI", lambda **_: ScriptedChatModel())
+    graph = build_graph(fast_route=False)
+
+    with track_timings() as timings:
+        graph.invoke({"messages": [HumanMessage(content="What does the manual of machine001 say?")]})
+
+    steps = timings.summary()["steps"]
+    llm_agents = [s["agent"] for s in steps if s["kind"] == "llm"]
+    assert llm_agents == ["Dispatcher Agent", "Manuals Agent", "Manuals Agent", "Dispatcher Agent"]
+    assert all(s["prompt_tokens"] > 0 for s in steps if s["kind"] == "llm")
+    tools = [(s["name"], s["agent"]) for s in steps if s["kind"] == "tool"]
+    assert tools == [("transfer_to_manual_agent", "Dispatcher Agent"), ("manuals_tool", "Manuals Agent")]
+    (blob,) = [s for s in steps if s["kind"] == "blob"]
+    assert blob["bytes_fetched"] == (DATA_DIR / "machine001.md").stat().st_size
+
+
+def test_conversation_run_returns_timings_on_request(monkeypatch):
+    monkeypatch.delenv("MANUALS_MD_CONNECTION_STRING", raising=False)
+    monkeypatch.setenv("MANUALS_MD_PATH", str(DATA_DIR))
+    monkeypatch.setattr(response_cache, "_CACHE", response_cache.ResponseCache(ttl=0))
+    monkeypatch.setattr(vanilla_agent, "AzureChatOpenAI", lambda **_: ScriptedChatModel())
+    monkeypatch.setattr(http_conversation, "_graph", build_graph())
+
+    def run(body, params=None):
+        req = func.HttpRequest(
+            method="POST",
+            url="/api/conversationRun",
+            headers={"Content-Type": "application/json"},
+            params=params or {},
+            route_params={},
+            body=json.dumps(body).encode(),
+        )
+        return json.loads(http_conversation.conversation_run(req).get_body())
+
+    plain = run({"input": "Open the manual of machine001"})
+    assert "timings" not in plain
+
+    timed = run({"input": "Open the manual of machine001", "timings": True})
+    assert timed["output"] == plain["output"]
+    assert set(timed["timings"]["totals"]) == {"llm", "tool", "blob"}
+    assert run({"input": "Open the manual of machine001"}, {"timings": "1"})["timings"]["steps"]
@@ -0,0 +1,118 @@
+"""Tests for concurrent, time-limited tool calls."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.tools import StructuredTool
+from langgraph.graph import END, START, MessagesState, StateGraph
+from langgraph.prebuilt import ToolNode
+
+from agents.tool_calls import ToolCallPolicy, abandoned_tool_calls, get_tool_pool, set_tool_pool
+from benchmarks.fake_blob_server import FakeBlobServer
+from middleware.manual_cache import clear_manual_caches
+from middleware.manuals_tools import CONTAINER_POOL, manuals_tool
+
+
+def _sleeper(name: str, seconds: float) -> StructuredTool:
+    def run(text: str) -> str:
+        time.sleep(seconds)
+        return f"{name}:{text}"
+
+    async def arun(text: str) -> str:
+        await asyncio.sleep(seconds)
+        return f"{name}:{text}"
+
+    return StructuredTool.from_function(func=run, coroutine=arun, name=name, description=name)
+
+
+def _calls(*names: str) -> dict:
+    calls = [{"name": name, "args": {"text": str(i)}, "id": f"call_{i}"} for i, name in enumerate(names)]
+    return {"messages": [AIMessage(content="", tool_calls=calls)]}
+
+
+def _graph(tools, policy: ToolCallPolicy):
+    graph = StateGraph(MessagesState)
+    graph.add_node("tools", ToolNode(policy.apply(tools)))
+    graph.add_edge(START, "tools")
+    graph.add_edge("tools", END)
+    return graph.compile()
+
+
+@pytest.fixture
+def tool_graph():
+    policy = ToolCallPolicy({"stuck": 0.05}, default=1.0)
+    return _graph([_sleeper("slow", 0.2), _sleeper("fast", 0.01), _sleeper("stuck", 0.5)], policy)
+
+
+def test_calls_run_concurrently_in_call_order(tool_graph):
+    started = time.perf_counter()
+    messages = tool_graph.invoke(_calls("slow", "fast", "slow", "stuck"))["messages"][1:]
+    elapsed = time.perf_counter() - started
+
+    assert [m.tool_call_id for m in messages] == ["call_0", "call_1", "call_2", "call_3"]
+    assert [m.content for m in messages[:3]] == ["slow:0", "fast:1", "slow:2"]
+    assert messages[3].status == "error" and "0.05 seconds" in messages[3].content
+    assert elapsed < 0.35
+
+
+def test_async_calls_share_the_policy(tool_graph):
+    started = time.perf_counter()
+    messages = asyncio.run(tool_graph.ainvoke(_calls("slow", "slow", "stuck")))["messages"][1:]
+
+    assert [m.content for m in messages[:2]] == ["slow:0", "slow:1"]
+    assert messages[2].status == "error"
+    assert time.perf_counter() - started < 0.35
+
+
+def test_two_manuals_cost_one_round_trip(monkeypatch):
+    monkeypatch.setenv("MANUALS_MIRROR", "0")
+    clear_manual_caches()
+    CONTAINER_POOL.clear()
+    with FakeBlobServer(request_latency=0.2) as server:
+        monkeypatch.setenv("MANUALS_MD_CONNECTION_STRING", server.connection_string)
+        server.put_blob("manuals-md", "machine001.md", "# Machine001")
+        server.put_blob("manuals-md", "machine002.md", "# Machine002")
+        graph = _graph([manuals_tool], ToolCallPolicy())
+        calls = [
+            {"name": "manuals_tool", "args": {"machine_name": name}, "id": name}
+            for name in ("machine001", "machine002")
+        ]
+        started = time.perf_counter()
+        messages = graph.invoke({"messages": [AIMessage(content="", tool_calls=calls)]})["messages"][1:]
+        elapsed = time.perf_counter() - started
+    CONTAINER_POOL.clear()
+    clear_manual_caches()
+
+    assert [m.content for m in messages] == ["# Machine001", "# Machine002"]
+    assert elapsed < 0.35
+
+
+def test_deadline_starts_when_the_call_runs():
+    set_tool_pool(ThreadPoolExecutor(max_workers=1))
+    try:
+        graph = _graph([_sleeper("slow", 0.2)], ToolCallPolicy(default=0.3))
+        messages = graph.invoke(_calls("slow", "slow"))["messages"][1:]
+    finally:
+        set_tool_pool(None)
+
+    # The second call waited 0.2s for the only worker but ran within 0.3s.
+    assert [m.content for m in messages] == ["slow:0", "slow:1"]
+
+
+def test_abandoned_calls_retire_the_pool():
+    pool = ThreadPoolExecutor(max_workers=2)
+    set_tool_pool(pool)
+    try:
+        graph = _graph([_sleeper("stuck", 0.3)], ToolCallPolicy(default=0.05))
+        assert graph.invoke(_calls("stuck"))["messages"][1].status == "error"
+        assert abandoned_tool_calls() == 1
+        assert get_tool_pool() is not pool
+        pool.shutdown(wait=True)
+        assert abandoned_tool_calls() == 0
+    finally:
+        set_tool_pool(None)